@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from app.services import profiling
+
+router = APIRouter(prefix="/admin")
+
+
+def _authorize(x_profile_token: str = Header(None)) -> None:
+    if not profiling.authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+
+@router.post("/profile", dependencies=[Depends(_authorize)])
+def start_profiling(seconds: float = 30.0, hz: float = profiling.PROFILE_SAMPLE_HZ):
+    """
+    Sample every thread's stack for `seconds` (at most PROFILE_MAX_SECONDS) and
+    record torch.profiler traces of encoder calls; download the result from
+    /admin/profiles/{id} once it completes.
+    """
+    try:
+        session = profiling.start_window(seconds, hz)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"id": session.id, "status": "running", "download": f"/admin/profiles/{session.id}"}
+
+
+@router.get("/profiles", dependencies=[Depends(_authorize)])
+def list_profiles():
+    return {"profiles": profiling.list_profiles()}
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(_authorize)])
+def download_profile(profile_id: str):
+    data = profiling.archive(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="No such profile")
+    return Response(
+        content=data,
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.zip"'},
+    )
@@ -1,35 +1,49 @@
-from fastapi import APIRouter, UploadFile, File
-from app.services.embedding import generate_embedding_from_bytes
-from app.services.gcp_vector_store import identify_speaker
-from app.services.gcs_storage import upload_match_audio
+import logging
+import os
+from fastapi import APIRouter, Request, UploadFile, File
+from app.services.ingest import read_upload, decode_speech, AudioRejected
+from app.services.embedding import generate_embedding_async
+from app.services.embedding_cache import embedding_cache
+from app.services.executor import run_stage, StageOverloaded
+from app.services.store import identify_topk
+from app.services.audit_sink import audit_match_audio
+
+log = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/voice")
 
-THRESHOLD = 0.45
+# Runner-up speakers returned alongside the decision
+MATCH_TOP_K = int(os.getenv("MATCH_TOP_K", "3"))
 
 
 @router.post("/match")
-async def match_voice(audio: UploadFile = File(...)):
+async def match_voice(request: Request, audio: UploadFile = File(...)):
     try:
-        audio_bytes = await audio.read()
+        audio_bytes, key = await read_upload(audio)
 
-        # Upload to GCS for audit trail (non-fatal)
-        try:
-            upload_match_audio(audio_bytes)
-        except Exception as e:
-            print(f"[WARN] GCS upload failed (non-fatal): {e}")
+        # Retried / re-submitted clips skip both decode and inference
+        embedding, decoded = embedding_cache.get(key), None
+        if embedding is None:
+            decoded = await run_stage("decode", decode_speech, audio_bytes)
+            embedding = await run_stage("embedding", generate_embedding_async, decoded, key)
 
-        embedding = generate_embedding_from_bytes(audio_bytes)
-        name, score = identify_speaker(embedding)
+        # Queued for the GCS audit trail; encoding and upload happen in the background
+        stored = audit_match_audio(audio_bytes, key, decoded, request.state.request_id)
 
-        if not name:
-            return {"match": "NOT_FOUND", "confidence": score}
+        ranked, threshold = await run_stage("vector_search", identify_topk, embedding, MATCH_TOP_K)
+        candidates = [{"person_name": n, "confidence": s} for n, s in ranked]
 
-        if score < THRESHOLD:
-            return {"match": "LOW_CONFIDENCE", "person_name": name, "confidence": score}
+        if not ranked:
+            return {"match": "NOT_FOUND", "confidence": 0.0, "candidates": candidates, "audio_stored": stored}
 
-        return {"match": "SUCCESS", "person_name": name, "confidence": score}
+        name, score = ranked[0]
+        if score < threshold:
+            return {"match": "LOW_CONFIDENCE", "person_name": name, "confidence": score, "candidates": candidates, "audio_stored": stored}
 
+        return {"match": "SUCCESS", "person_name": name, "confidence": score, "candidates": candidates, "audio_stored": stored}
+
+    except (StageOverloaded, AudioRejected):
+        raise
     except Exception as e:
-        print("❌ MATCH API ERROR:", e)
+        log.exception("Match failed: %s", e)
         return {"match": "ERROR", "message": str(e)}
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from app.services.embedding import generate_embedding_from_bytes
-from app.services.gcp_vector_store import add_embedding
-from app.services.gcs_storage import upload_registration_audio
+import asyncio
+from fastapi import APIRouter, Request, UploadFile, File, Form
+from app.services.ingest import read_upload, decode_speech
+from app.services.embedding import generate_embedding_async
+from app.services.embedding_cache import embedding_cache
+from app.services.executor import run_stage
+from app.services.store import add_embeddings
+from app.services.audit_sink import audit_registration_audio
 
 router = APIRouter(prefix="/voice")
 
 
+async def _embed(audio_bytes: bytes, key: str) -> tuple:
+    """(embedding, decoded clip or None when the embedding was cached)."""
+    cached = embedding_cache.get(key)
+    if cached is not None:
+        return cached, None
+    decoded = await run_stage("decode", decode_speech, audio_bytes)
+    return await run_stage("embedding", generate_embedding_async, decoded, key), decoded
+
+
 @router.post("/register-multi")
 async def register_voice_multi(
+    request: Request,
     person_name: str = Form(...),
     audio1: UploadFile = File(...),
     audio2: UploadFile = File(...),
@@ -18,29 +32,27 @@ async def register_voice_multi(
     Stores each of the 3 voice samples individually so the centroid
     is computed from 3 real vectors for maximum accuracy.
     """
-    audio_bytes1 = await audio1.read()
-    audio_bytes2 = await audio2.read()
-    audio_bytes3 = await audio3.read()
-
-    # Upload to GCS for audit trail (non-fatal)
-    for audio_bytes in [audio_bytes1, audio_bytes2, audio_bytes3]:
-        try:
-            upload_registration_audio(audio_bytes, person_name)
-        except Exception as e:
-            print(f"[WARN] GCS upload failed (non-fatal): {e}")
-
-    # Store each embedding individually — centroid auto-computed after each upsert
-    emb1 = generate_embedding_from_bytes(audio_bytes1)
-    emb2 = generate_embedding_from_bytes(audio_bytes2)
-    emb3 = generate_embedding_from_bytes(audio_bytes3)
-
-    add_embedding(emb1, person_name)
-    add_embedding(emb2, person_name)
-    add_embedding(emb3, person_name)
+    # Every sample is validated (size, format) before anything is uploaded or embedded
+    uploads = [await read_upload(a) for a in (audio1, audio2, audio3)]
+    samples = [b for b, _ in uploads]
+    keys = [k for _, k in uploads]
+
+    # The three samples are decoded and embedded concurrently (and land in the
+    # same encoder batch), then written together with their centroid in one
+    # vector upsert and one Firestore batch.
+    results = await asyncio.gather(*(_embed(b, k) for b, k in zip(samples, keys)))
+    await run_stage("firestore", add_embeddings, [e for e, _ in results], person_name)
+
+    # Queued for the GCS audit trail; encoding and upload happen in the background
+    stored = [
+        audit_registration_audio(b, person_name, k, decoded, request.state.request_id)
+        for b, k, (_, decoded) in zip(samples, keys, results)
+    ]
 
     return {
         "status": "registered",
         "person_name": person_name,
         "samples_used": 3,
-        "method": "individual_embeddings_with_centroid"
+        "method": "individual_embeddings_with_centroid",
+        "audio_stored": stored
     }
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import time
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.services.audio import TARGET_SR
+from app.services.embedding import generate_embedding_async
+from app.services.executor import run_stage, StageOverloaded
+from app.services.store import identify_topk, verify_speaker
+from app.services.scoring import THRESHOLD
+from app.services.streaming import (
+    StreamSession, ENCODINGS, STREAM_WINDOW_SECONDS, STREAM_HOP_SECONDS, STREAM_IDLE_TIMEOUT,
+    STREAM_MAX_WALL_SECONDS,
+)
+from app.services.ingest import MIN_SPEECH_SECONDS
+from app.api.match import MATCH_TOP_K
+
+log = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/voice")
+
+# Streams cut off by a cap end with NO_MATCH rather than a score of whatever was collected
+_LIMIT_REASONS = {"max_received", "max_session"}
+
+
+async def _score(samples, person_name: str = None) -> dict:
+    """Embed a window of speech and score it against the store, as /match and /verify-transaction do."""
+    embedding = await run_stage("embedding", generate_embedding_async, samples)
+    if person_name:
+        confidence, registered, threshold = await run_stage("vector_search", verify_speaker, embedding, person_name)
+        return {
+            "person_name": person_name.lower(),
+            "registered": registered,
+            "confidence": round(confidence, 4),
+            "threshold": threshold,
+            "accepted": registered and confidence >= threshold,
+        }
+
+    ranked, threshold = await run_stage("vector_search", identify_topk, embedding, MATCH_TOP_K)
+    name, confidence = ranked[0] if ranked else (None, 0.0)
+    return {
+        "person_name": name,
+        "confidence": round(confidence, 4),
+        "candidates": [{"person_name": n, "confidence": round(s, 4)} for n, s in ranked],
+        "threshold": threshold,
+        "accepted": bool(name) and confidence >= threshold,
+    }
+
+
+def _decision(result: dict, person_name: str = None) -> str:
+    if result["accepted"]:
+        return "SUCCESS"
+    if person_name and not result["registered"]:
+        return "NOT_REGISTERED"
+    if not person_name and not result["person_name"]:
+        return "NOT_FOUND"
+    return "LOW_CONFIDENCE"
+
+
+@router.websocket("/stream")
+async def stream_voice(websocket: WebSocket, person_name: str = None,
+                       sample_rate: int = TARGET_SR, encoding: str = "pcm16"):
+    """
+    Streaming identification (or verification with `person_name`).
+
+    The client sends binary messages of mono little-endian PCM at 16 kHz
+    (`encoding=pcm16` or `f32`) as it is recorded, and optionally a text
+    message {"event": "end"} when recording stops. Every STREAM_HOP_SECONDS
+    of new speech the server embeds the last STREAM_WINDOW_SECONDS and sends
+    {"type": "interim", ...}. It sends {"type": "final", ...} and closes as
+    soon as an interim score reaches its threshold, or scores the whole
+    utterance once the speaker stops (end-of-speech VAD), the client ends,
+    or the speech buffer is full. A stream that reaches STREAM_MAX_SECONDS of
+    received audio or STREAM_MAX_WALL_SECONDS open without a match gets a
+    final "NO_MATCH" and is closed.
+    """
+    await websocket.accept()
+    if sample_rate != TARGET_SR or encoding not in ENCODINGS:
+        await websocket.send_json({
+            "type": "error", "error": "unsupported_format",
+            "message": f"Expected {TARGET_SR} Hz mono PCM with encoding in {sorted(ENCODINGS)}",
+        })
+        await websocket.close(code=1003)
+        return
+
+    session = StreamSession(encoding)
+    await websocket.send_json({
+        "type": "ready", "sample_rate": TARGET_SR, "encoding": encoding,
+        "window_s": STREAM_WINDOW_SECONDS, "hop_s": STREAM_HOP_SECONDS, "threshold": THRESHOLD,
+    })
+
+    async def finish(result: dict, started: float, match: str = None) -> None:
+        await websocket.send_json({
+            "type": "final",
+            "match": match or (_decision(result, person_name) if result else "NO_SPEECH"),
+            "reason": session.end_reason,
+            **(result or {}),
+            **session.stats(),
+            "finalize_ms": round((time.perf_counter() - started) * 1000.0, 2),
+        })
+        await websocket.close()
+
+    last = None
+    deadline = time.monotonic() + STREAM_MAX_WALL_SECONDS
+    try:
+        while not session.ended:
+            remaining = deadline - time.monotonic()
+            try:
+                message = await asyncio.wait_for(websocket.receive(), min(STREAM_IDLE_TIMEOUT, max(remaining, 0)))
+            except asyncio.TimeoutError:
+                session.end("idle_timeout" if remaining > STREAM_IDLE_TIMEOUT else "max_session")
+                break
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes") is not None:
+                session.feed_bytes(message["bytes"])
+            elif message.get("text"):
+                try:
+                    event = json.loads(message["text"]).get("event")
+                except (ValueError, AttributeError):
+                    event = None
+                if event == "end":
+                    session.end("client_end")
+
+            if session.due():
+                started = time.perf_counter()
+                last = await _score(session.window_samples(), person_name)
+                await websocket.send_json({"type": "interim", **last, **session.stats()})
+                if last["accepted"]:
+                    session.end("threshold")
+                    await finish(last, started)
+                    return
+            if time.monotonic() >= deadline:
+                session.end("max_session")
+
+        # The speaker stopped (or the client ended): score the whole utterance
+        started = time.perf_counter()
+        if session.end_reason in _LIMIT_REASONS:
+            await finish(last, started, match="NO_MATCH")
+            return
+        if session.speech_seconds < MIN_SPEECH_SECONDS:
+            await finish(None, started)
+            return
+        if last is None or not session.last_window_was_full_utterance():
+            last = await _score(session.speech(), person_name)
+        await finish(last, started)
+
+    except WebSocketDisconnect:
+        return
+    except StageOverloaded as e:
+        await websocket.send_json({"type": "error", "error": "overloaded", "stage": e.stage, "message": str(e)})
+        await websocket.close(code=1013)
+    except Exception as e:
+        log.exception("Stream failed: %s", e)
+        try:
+            await websocket.send_json({"type": "error", "error": "internal", "message": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
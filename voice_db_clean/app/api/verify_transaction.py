@@ -1,17 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from app.services.embedding import generate_embedding_from_bytes
-from app.services.gcp_vector_store import identify_speaker, verify_speaker, check_name_exists
+import asyncio
+from fastapi import APIRouter, Request, UploadFile, File, Form, Response
+from app.services.ingest import read_upload, decode_speech
+from app.services.embedding import generate_embedding_async
+from app.services.embedding_cache import embedding_cache
+from app.services.executor import run_stage
+from app.services.store import identify_speaker, verify_speaker, check_name_exists
 from app.services.stt import speech_to_text
 from app.services.nlp import extract_transaction_info
-from app.services.gcs_storage import upload_transaction_audio
+from app.services.audit_sink import audit_transaction_audio
+from app.services.pipeline import Pipeline
 
 router = APIRouter(prefix="/voice")
 
-THRESHOLD = 0.45
+FIRST_PERSON = {"i", "me", "my", "myself", "mine"}
 
 
 @router.post("/verify-transaction")
 async def verify_transaction(
+    request: Request,
+    response: Response,
     audio: UploadFile = File(...),
     person_name: str = Form(None)
 ):
@@ -21,57 +28,87 @@ async def verify_transaction(
     - With person_name: targeted verification — confirms the audio belongs to that
       specific registered person before processing the transaction.
     - Without person_name: blind speaker identification (original behaviour).
+
+    The upload is read in chunks (rejected early if oversized or not audio),
+    decoded once with silence trimmed, and shared by both branches and the audit
+    sink (which encodes and uploads in the background). The voice branch
+    (embed → verify/identify) runs concurrently with the STT → NLP branch, so latency is roughly
+    decode + max(voice, STT + NLP).
+    Per-stage timings are returned in `timings_ms` and the Server-Timing header.
     """
-    audio_bytes = await audio.read()
-
-    # Upload audio to GCS for audit trail (non-fatal)
-    gcs_uri = None
-    try:
-        gcs_uri = upload_transaction_audio(audio_bytes)
-    except Exception as e:
-        print(f"[WARN] GCS upload failed (non-fatal): {e}")
-
-    # 1. Speaker recognition
-    embedding = generate_embedding_from_bytes(audio_bytes)
-
-    if person_name:
-        confidence, is_registered = verify_speaker(embedding, person_name)
-        if not is_registered:
-            voice_matched = False
-            speaker = "unknown"
-            confidence = 0.0
-        elif confidence >= THRESHOLD:
-            voice_matched = True
-            speaker = person_name.lower()
-        else:
-            voice_matched = False
-            speaker = "unknown"
-    else:
-        speaker, confidence = identify_speaker(embedding)
-        if not speaker or confidence < THRESHOLD:
-            voice_matched = False
-            speaker = "unknown"
-        else:
-            voice_matched = True
-
-    # 2. Speech-to-text
-    transcript = speech_to_text(audio_bytes)
-
-    # 3. Extract entities from speech
-    info = extract_transaction_info(transcript)
-
-    # 4. Extract sender and receiver from NLP, then check each in DB
-    sender_name = info["sender"]
-
-    # If user said "I"/"me"/"my" instead of their name, use the biometric speaker
-    FIRST_PERSON = {"i", "me", "my", "myself", "mine"}
-    if sender_name in FIRST_PERSON and voice_matched:
-        sender_name = speaker
-
-    sender_found, sender_matched = check_name_exists(sender_name)
-
-    receiver_name = info["receiver"]
-    receiver_found, receiver_matched = check_name_exists(receiver_name)
+    audio_bytes, key = await read_upload(audio)
+
+    async def decode():
+        return await run_stage("decode", decode_speech, audio_bytes)
+
+    async def audit(decode):
+        # The object name is derived from the content, so the URI is known without
+        # waiting for the (non-fatal) audit upload, and a re-submitted clip maps to
+        # the same object and cached embedding.
+        return audit_transaction_audio(audio_bytes, key, decode, request.state.request_id)
+
+    async def embed(decode):
+        cached = embedding_cache.get(key)
+        if cached is not None:
+            return cached
+        return await run_stage("embedding", generate_embedding_async, decode, key)
+
+    async def voice(embed):
+        # 1. Speaker recognition
+        if person_name:
+            confidence, is_registered, threshold = await run_stage("vector_search", verify_speaker, embed, person_name)
+            if not is_registered:
+                return False, "unknown", 0.0
+            if confidence >= threshold:
+                return True, person_name.lower(), confidence
+            return False, "unknown", confidence
+
+        speaker, confidence, threshold = await run_stage("vector_search", identify_speaker, embed)
+        if not speaker or confidence < threshold:
+            return False, "unknown", confidence
+        return True, speaker, confidence
+
+    async def stt(decode):
+        # 2. Speech-to-text (reuses the waveform decoded for the voice branch)
+        return await run_stage("stt", speech_to_text, decode)
+
+    async def nlp(stt):
+        # 3. Extract entities from speech
+        return await run_stage("nlp", extract_transaction_info, stt)
+
+    async def lookup(voice, nlp):
+        # 4. Extract sender and receiver from NLP, then check each in DB
+        voice_matched, speaker, _ = voice
+        sender_name = nlp["sender"]
+
+        # If user said "I"/"me"/"my" instead of their name, use the biometric speaker
+        if sender_name in FIRST_PERSON and voice_matched:
+            sender_name = speaker
+
+        receiver_name = nlp["receiver"]
+        # Usually an in-memory lookup, but a cold or stale directory scans Firestore
+        sender, receiver = await asyncio.gather(
+            run_stage("firestore", check_name_exists, sender_name),
+            run_stage("firestore", check_name_exists, receiver_name),
+        )
+        return sender_name, sender, receiver_name, receiver
+
+    pipeline = Pipeline()
+    pipeline.add("decode", decode)
+    pipeline.add("audit", audit, deps=("decode",))
+    pipeline.add("embed", embed, deps=("decode",))
+    pipeline.add("voice", voice, deps=("embed",))
+    pipeline.add("stt", stt, deps=("decode",))
+    pipeline.add("nlp", nlp, deps=("stt",))
+    pipeline.add("lookup", lookup, deps=("voice", "nlp"))
+    results = await pipeline.run()
+
+    voice_matched, speaker, confidence = results["voice"]
+    transcript = results["stt"]
+    info = results["nlp"]
+    sender_name, (sender_found, sender_matched), receiver_name, (receiver_found, receiver_matched) = results["lookup"]
+
+    response.headers["Server-Timing"] = pipeline.server_timing()
 
     return {
         "voice_status": "MATCHED" if voice_matched else "NOT_MATCHED",
@@ -89,5 +126,8 @@ async def verify_transaction(
         },
         "amount": info["amount"],
         "transcript": transcript,
-        "audio_stored": gcs_uri
+        "nlp_source": info.get("source"),
+        "audio_stored": results["audit"],
+        "audio": results["decode"].stats,
+        "timings_ms": pipeline.timings
     }
@@ -1,41 +1,127 @@
-import os
+import asyncio
+import time
+import uuid
+_import_start = time.perf_counter()
+
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
+from app.utils.logs import configure_logging
+configure_logging()
+
 from app.utils.windows_symlink_fix import apply_windows_symlink_fix
 apply_windows_symlink_fix()
 
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from google.cloud import aiplatform
 
 from app.api.register import router as register_router
 from app.api.match import router as match_router
 from app.api.verify_transaction import router as verify_transaction_router
-from app.services.gcp_vector_store import init_gcp
+from app.api.stream import router as stream_router
+from app.api.admin import router as admin_router
+from app.services.executor import StageOverloaded, shutdown_pools
+from app.services.ingest import AudioRejected, RequestSizeLimit
+from app.services.embedding_cache import embedding_cache
+from app.services.audit_sink import audit_sink
+from app.services import lifecycle, metrics, nlp, profiling, stt
+
+lifecycle.record("import", time.perf_counter() - _import_start)
 
 
 app = FastAPI(title="Voice Matching System")
+app.add_middleware(RequestSizeLimit)
 
 
 @app.on_event("startup")
-def startup():
-    project_id = os.getenv("GCP_PROJECT_ID", "").strip()
-    if not project_id:
-        index_resource = os.getenv("GCP_INDEX_ID", "")
-        parts = index_resource.split("/")
-        if len(parts) >= 2:
-            project_id = parts[1]
-    region = os.getenv("GCP_REGION", "us-central1").strip()
-    aiplatform.init(project=project_id, location=region)
-    print(f"[OK] Vertex AI initialized: project={project_id}, region={region}")
-    try:
-        init_gcp()
-    except Exception as e:
-        print(f"[WARN] GCP initialization failed: {e}")
-        print("[WARN] Server started in degraded mode — GCP-dependent endpoints will not work.")
+async def startup():
+    # Store init and model warm-up run in the background; /readyz reports when done
+    lifecycle.begin()
+    # Audit workers; audio spooled to disk before a restart is re-uploaded first
+    audit_sink.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stt.aclose()
+    # Queued audit uploads get AUDIT_DRAIN_TIMEOUT to finish; the rest is spooled
+    await asyncio.to_thread(audit_sink.close)
+    shutdown_pools()
+
+
+@app.middleware("http")
+async def request_id(request: Request, call_next):
+    # Honour a caller-supplied id so audit objects can be traced back to client logs
+    request.state.request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request.state.request_id
+    return response
+
+
+if profiling.enabled:
+    # Only installed with PROFILE_TOKEN set, so unprofiled deployments pay nothing
+    @app.middleware("http")
+    async def profile_request(request: Request, call_next):
+        flag = request.headers.get("x-profile") or request.query_params.get("profile")
+        if not profiling.authorized(flag):
+            return await call_next(request)
+
+        session, state = profiling.begin_request(f"{request.method} {request.url.path}")
+        try:
+            response = await call_next(request)
+        finally:
+            profiling.end_request(session, state)
+            await asyncio.to_thread(session.finish, request_id=getattr(request.state, "request_id", None))
+        response.headers["X-Profile-Id"] = session.id
+        return response
+
 
+@app.exception_handler(StageOverloaded)
+async def stage_overloaded_handler(request: Request, exc: StageOverloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": "overloaded", "stage": exc.stage, "message": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(AudioRejected)
+async def audio_rejected_handler(request: Request, exc: AudioRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": "invalid_audio", "message": str(exc)},
+    )
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: model warmed up and vector store initialized."""
+    return JSONResponse(status_code=200 if lifecycle.is_ready() else 503, content=lifecycle.report())
+
+
+@app.get("/stats")
+def stats():
+    """Embedding and NLP cache hit rates (NLP also reports the Gemini latency saved); STT retry / hedge and audit queue counters."""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "nlp": nlp.stats(),
+        "stt": stt.stats(),
+        "audit": audit_sink.stats(),
+    }
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus exposition: stage latency histograms, cache and orphan counters, queue and gallery gauges."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -47,3 +133,7 @@ def read_index():
 app.include_router(register_router)
 app.include_router(match_router)
 app.include_router(verify_transaction_router)
+app.include_router(stream_router)
+
+if profiling.enabled:
+    app.include_router(admin_router)
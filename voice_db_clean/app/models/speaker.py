@@ -1,15 +1,183 @@
-from speechbrain.inference import EncoderClassifier
+import logging
+import os
+import numpy as np
 import torch
 
+log = logging.getLogger(__name__)
+
+SPEAKER_MODEL_SOURCE = os.getenv("SPEAKER_MODEL_SOURCE", "speechbrain/spkrec-ecapa-voxceleb")
+# Pre-exported model artifact (hyperparams.yaml + checkpoints). When present
+# the model loads from here with no Hugging Face hub access; otherwise it is
+# downloaded from SPEAKER_MODEL_SOURCE into this directory on first run.
+SPEAKER_MODEL_DIR    = os.getenv("SPEAKER_MODEL_DIR", "pretrained_models/ecapa_voxceleb")
+
+# eager       — SpeechBrain EncoderClassifier in eager PyTorch
+# torchscript — traced Fbank + ECAPA graph (scripts/export_encoder.py)
+# onnx        — Fbank in TorchScript, ECAPA network in ONNX Runtime (CPU EP)
+SPEAKER_ENCODER_BACKEND = os.getenv("SPEAKER_ENCODER_BACKEND", "eager").lower()
+SPEAKER_EXPORT_DIR      = os.getenv("SPEAKER_EXPORT_DIR", "exported_models/ecapa")
+# Use the int8 (dynamically quantized) ONNX model
+SPEAKER_ENCODER_INT8    = os.getenv("SPEAKER_ENCODER_INT8", "false").lower() == "true"
+# Intra-op threads per worker process (0 = library default); roughly CPUs / workers
+TORCH_NUM_THREADS       = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+
+def export_paths(export_dir: str = SPEAKER_EXPORT_DIR) -> dict:
+    return {
+        "torchscript": os.path.join(export_dir, "encoder.ts"),
+        "features":    os.path.join(export_dir, "features.ts"),
+        "onnx":        os.path.join(export_dir, "embedding.onnx"),
+        "onnx-int8":   os.path.join(export_dir, "embedding.int8.onnx"),
+    }
+
+
+def _pad(waveforms) -> tuple:
+    """Zero-pad 1-D waveforms into a (N, max_len) batch plus relative lengths."""
+    waveforms = [np.asarray(w, dtype=np.float32).reshape(-1) for w in waveforms]
+    lengths = [len(w) for w in waveforms]
+    max_len = max(lengths)
+
+    batch = np.zeros((len(waveforms), max_len), dtype=np.float32)
+    for i, w in enumerate(waveforms):
+        batch[i, :len(w)] = w
+    wav_lens = np.asarray([n / max_len for n in lengths], dtype=np.float32)
+    return batch, wav_lens
+
+
 class SpeakerEncoder:
     def __init__(self):
-        self.model = EncoderClassifier.from_hparams(
-            source="speechbrain/spkrec-ecapa-voxceleb",
-            savedir="pretrained_models/ecapa_voxceleb",
-            run_opts={"device": "cpu"}
-        )
+        from speechbrain.inference import EncoderClassifier
+        from speechbrain.utils.fetching import LocalStrategy
+
+        if os.path.isfile(os.path.join(SPEAKER_MODEL_DIR, "hyperparams.yaml")):
+            self.model = EncoderClassifier.from_hparams(
+                source=SPEAKER_MODEL_DIR,
+                savedir=SPEAKER_MODEL_DIR,
+                local_strategy=LocalStrategy.NO_LINK,
+                run_opts={"device": "cpu"}
+            )
+        else:
+            self.model = EncoderClassifier.from_hparams(
+                source=SPEAKER_MODEL_SOURCE,
+                savedir=SPEAKER_MODEL_DIR,
+                run_opts={"device": "cpu"}
+            )
 
     def encode(self, waveform):
+        if not torch.is_tensor(waveform):
+            waveform = torch.from_numpy(np.ascontiguousarray(waveform, dtype=np.float32))
         with torch.no_grad():
-            emb = self.model.encode_batch(torch.tensor(waveform))
+            emb = self.model.encode_batch(waveform)
         return emb.squeeze().numpy()
+
+    def encode_batch(self, waveforms):
+        """
+        Encode a list of 1-D waveforms of different lengths in one forward pass.
+        Shorter clips are zero-padded and masked through relative `wav_lens`
+        so their embeddings match what `encode` would return for each clip alone.
+        Returns an (N, 192) array in input order.
+        """
+        batch, wav_lens = _pad(waveforms)
+        with torch.no_grad():
+            emb = self.model.encode_batch(torch.from_numpy(batch), wav_lens=torch.from_numpy(wav_lens))
+        return emb.squeeze(1).numpy()
+
+
+class EmbeddingPipeline(torch.nn.Module):
+    """
+    The EncoderClassifier forward pass (Fbank → per-utterance mean
+    normalization → ECAPA-TDNN) as one export-friendly module. SpeechBrain's
+    InputNormalization loops over the batch in Python; here the same masked
+    mean is computed with tensor ops so the graph works for any batch size.
+    With `features=False` the module takes precomputed Fbank features.
+    """
+
+    def __init__(self, classifier, features: bool = True):
+        super().__init__()
+        norm = classifier.mods.mean_var_norm
+        if getattr(norm, "norm_type", "sentence") != "sentence" or getattr(norm, "std_norm", False):
+            raise ValueError("EmbeddingPipeline only supports sentence-level mean normalization")
+        self.features = features
+        self.compute_features = classifier.mods.compute_features
+        self.embedding_model = classifier.mods.embedding_model
+
+    def forward(self, x, wav_lens):
+        feats = self.compute_features(x) if self.features else x
+        frames = torch.round(wav_lens * feats.shape[1])
+        positions = torch.arange(feats.shape[1], device=feats.device, dtype=feats.dtype)
+        mask = (positions.unsqueeze(0) < frames.unsqueeze(1)).to(feats.dtype).unsqueeze(-1)
+        mean = (feats * mask).sum(dim=1) / frames.clamp(min=1).unsqueeze(-1)
+        feats = feats - mean.unsqueeze(1)
+        return self.embedding_model(feats, wav_lens).squeeze(1)
+
+
+class TorchScriptSpeakerEncoder:
+    """Runs the traced EmbeddingPipeline written by scripts/export_encoder.py."""
+
+    def __init__(self, path: str):
+        self.model = torch.jit.load(path, map_location="cpu")
+        self.model.eval()
+
+    def encode(self, waveform):
+        return self.encode_batch([np.asarray(waveform)])[0]
+
+    def encode_batch(self, waveforms):
+        batch, wav_lens = _pad(waveforms)
+        with torch.inference_mode():
+            return self.model(torch.from_numpy(batch), torch.from_numpy(wav_lens)).numpy()
+
+
+class OnnxSpeakerEncoder:
+    """
+    Fbank features from the TorchScript frontend (ONNX cannot export its
+    complex STFT), then the ECAPA network in ONNX Runtime on the CPU EP.
+    """
+
+    def __init__(self, model_path: str, features_path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if TORCH_NUM_THREADS:
+            options.intra_op_num_threads = TORCH_NUM_THREADS
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.features = torch.jit.load(features_path, map_location="cpu")
+        self.features.eval()
+
+    def encode(self, waveform):
+        return self.encode_batch([np.asarray(waveform)])[0]
+
+    def encode_batch(self, waveforms):
+        batch, wav_lens = _pad(waveforms)
+        with torch.inference_mode():
+            feats = self.features(torch.from_numpy(batch)).numpy()
+        return self.session.run(["embedding"], {"feats": feats, "wav_lens": wav_lens})[0]
+
+
+def load_encoder(backend: str = None, int8: bool = None, export_dir: str = SPEAKER_EXPORT_DIR):
+    """Build the encoder selected by SPEAKER_ENCODER_BACKEND (or the arguments)."""
+    backend = (backend or SPEAKER_ENCODER_BACKEND).lower()
+    int8 = SPEAKER_ENCODER_INT8 if int8 is None else int8
+    if TORCH_NUM_THREADS:
+        torch.set_num_threads(TORCH_NUM_THREADS)
+
+    if backend == "eager":
+        return SpeakerEncoder()
+
+    paths = export_paths(export_dir)
+    if backend == "torchscript":
+        required = [paths["torchscript"]]
+    elif backend == "onnx":
+        required = [paths["onnx-int8" if int8 else "onnx"], paths["features"]]
+    else:
+        raise ValueError(f"Unknown SPEAKER_ENCODER_BACKEND '{backend}' (expected eager, torchscript or onnx)")
+
+    missing = [p for p in required if not os.path.isfile(p)]
+    if missing:
+        raise FileNotFoundError(f"Exported encoder not found ({', '.join(missing)}); "
+                                f"run `python -m scripts.export_encoder` first")
+
+    log.info("Speaker encoder backend: %s%s", backend, ' int8' if int8 and backend == 'onnx' else '')
+    if backend == "torchscript":
+        return TorchScriptSpeakerEncoder(*required)
+    return OnnxSpeakerEncoder(*required)
@@ -1,15 +1,108 @@
-import librosa
+import soundfile
 import io
 import numpy as np
 
 TARGET_SR = 16000
 
-def load_audio_from_bytes(audio_bytes: bytes):
-    audio, sr = librosa.load(
-        io.BytesIO(audio_bytes),
-        sr=TARGET_SR,
-        mono=True
-    )
+# Compact encodings for stored audio: format -> (container, subtype, content type, extension)
+STORAGE_FORMATS = {
+    "wav":  ("WAV",  "PCM_16", "audio/wav",  "wav"),
+    "flac": ("FLAC", "PCM_16", "audio/flac", "flac"),  # lossless, roughly 0.5-0.7x of 16-bit WAV
+    "opus": ("OGG",  "OPUS",   "audio/ogg",  "opus"),  # lossy, ~0.1x, but ~100x the encode CPU of FLAC
+}
+
+
+class DecodedAudio:
+    """
+    A request-scoped clip decoded once to 16 kHz mono float32.
+
+    The same buffer feeds SpeakerEncoder (`batch()` / `tensor()`) and STT
+    (`wav_bytes()`); derived forms are produced lazily and cached.
+    """
+
+    def __init__(self, samples: np.ndarray, wav_bytes: bytes = None):
+        self.samples = samples
+        self._wav_bytes = wav_bytes
+        self._tensor = None
+        self.stats = {}
+
+    @classmethod
+    def from_bytes(cls, audio_bytes: bytes) -> "DecodedAudio":
+        fast = _read_16k_wav(audio_bytes)
+        if fast is not None:
+            return fast
+
+        # Imported here: librosa (and numba) is slow to import and only needed off the fast path
+        import librosa
+        audio, _ = librosa.load(
+            io.BytesIO(audio_bytes),
+            sr=TARGET_SR,
+            mono=True
+        )
+        return cls(audio)
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / TARGET_SR
+
+    def batch(self) -> np.ndarray:
+        # SpeechBrain expects (batch, time); this is a view, not a copy
+        return self.samples[np.newaxis, :]
+
+    def tensor(self):
+        if self._tensor is None:
+            import torch
+            self._tensor = torch.from_numpy(self.batch())
+        return self._tensor
+
+    def wav_bytes(self) -> bytes:
+        if self._wav_bytes is None:
+            wav_io = io.BytesIO()
+            soundfile.write(wav_io, self.samples, TARGET_SR, format="WAV", subtype="PCM_16")
+            self._wav_bytes = wav_io.getvalue()
+        return self._wav_bytes
 
+    def encode(self, encoding: str) -> bytes:
+        """The clip in one of STORAGE_FORMATS; not cached (used once, off the request path)."""
+        if encoding == "wav":
+            return self.wav_bytes()
+        container, subtype, _, _ = STORAGE_FORMATS[encoding]
+        out = io.BytesIO()
+        soundfile.write(out, self.samples, TARGET_SR, format=container, subtype=subtype)
+        return out.getvalue()
+
+
+def _read_16k_wav(audio_bytes: bytes):
+    """
+    Fast path for uploads that are already 16 kHz PCM/float WAV: read straight
+    through soundfile and skip librosa's resampler. io.BytesIO over an
+    immutable bytes object shares its buffer, so the upload is not copied.
+    A 16 kHz mono PCM_16 upload is also reused verbatim as the STT payload.
+    """
+    try:
+        stream = io.BytesIO(audio_bytes)
+        info = soundfile.info(stream)
+        if info.format != "WAV" or info.samplerate != TARGET_SR:
+            return None
+        if not (info.subtype.startswith("PCM") or info.subtype in ("FLOAT", "DOUBLE")):
+            return None
+
+        stream.seek(0)
+        audio, _ = soundfile.read(stream, dtype="float32", always_2d=False)
+    except Exception:
+        return None
+
+    if audio.ndim > 1:
+        audio = np.ascontiguousarray(audio.mean(axis=1, dtype=np.float32))
+
+    reusable = info.channels == 1 and info.subtype == "PCM_16"
+    return DecodedAudio(audio, wav_bytes=audio_bytes if reusable else None)
+
+
+def decode_audio(audio_bytes: bytes) -> DecodedAudio:
+    return DecodedAudio.from_bytes(audio_bytes)
+
+
+def load_audio_from_bytes(audio_bytes: bytes):
     # SpeechBrain expects (batch, time)
-    return np.expand_dims(audio, axis=0)
+    return DecodedAudio.from_bytes(audio_bytes).batch()
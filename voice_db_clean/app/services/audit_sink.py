@@ -0,0 +1,374 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from dotenv import load_dotenv
+
+from app.services.audio import DecodedAudio, STORAGE_FORMATS, TARGET_SR
+from app.services.metrics import QUEUE_DEPTH, gauge
+from app.services.gcs_storage import (
+    upload_audio, is_uploaded, object_uri, content_filename, registration_folder,
+    sniff_format, AUDIT_ENCODING,
+)
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+AUDIT_WORKERS        = int(os.getenv("AUDIT_WORKERS", "4"))
+# Items held in memory; beyond this, audio is written to the spool instead
+AUDIT_QUEUE_SIZE     = int(os.getenv("AUDIT_QUEUE_SIZE", "256"))
+AUDIT_MAX_RETRIES    = int(os.getenv("AUDIT_MAX_RETRIES", "3"))
+AUDIT_UPLOAD_TIMEOUT = float(os.getenv("AUDIT_UPLOAD_TIMEOUT", "8"))
+AUDIT_SPOOL_DIR      = os.getenv("AUDIT_SPOOL_DIR", "data/audit_spool")
+# Seconds between attempts to re-upload spooled audio
+AUDIT_SPOOL_INTERVAL = float(os.getenv("AUDIT_SPOOL_INTERVAL", "30"))
+# Seconds shutdown waits for queued uploads before spooling the rest
+AUDIT_DRAIN_TIMEOUT  = float(os.getenv("AUDIT_DRAIN_TIMEOUT", "10"))
+
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP  = 8.0
+
+
+class AuditSink:
+    """
+    Fire-and-forget audit storage for request audio.
+
+    `submit` returns the object's final gs:// URI at once (object names are
+    deterministic) and hands the upload to a pool of worker threads. Workers
+    retry with jittered backoff; audio that still fails, or that arrives while
+    the queue is full (GCS slow or down), is written to a local spool
+    directory by a spooler thread (never on the caller's thread) and
+    re-uploaded later, including after a restart. `close` drains the queue on
+    shutdown and spools whatever is left, uploads still in flight included.
+
+    With `encoding` set to one of STORAGE_FORMATS, the workers (not the
+    request) encode the whole upload at 16 kHz before uploading it, reusing
+    the request's decoded clip only when nothing was trimmed or capped from
+    it; "original" stores the uploaded bytes as received.
+    """
+
+    def __init__(self, uploader=upload_audio, workers: int = AUDIT_WORKERS,
+                 queue_size: int = AUDIT_QUEUE_SIZE, max_retries: int = AUDIT_MAX_RETRIES,
+                 spool_dir: str = AUDIT_SPOOL_DIR, spool_interval: float = AUDIT_SPOOL_INTERVAL,
+                 encoding: str = AUDIT_ENCODING):
+        if encoding != "original" and encoding not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown AUDIT_ENCODING '{encoding}' (expected original or one of {sorted(STORAGE_FORMATS)})")
+        self.uploader = uploader
+        self.encoding = encoding
+        self.workers = workers
+        self.max_retries = max_retries
+        self.spool_dir = spool_dir
+        self.spool_interval = spool_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        # Overflow waiting for the spooler thread to write it to disk
+        self._overflow = queue.Queue()
+        self._in_flight = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._spool_queued = set()
+        self.counters = {"submitted": 0, "deduped": 0, "uploaded": 0, "retries": 0,
+                         "spooled": 0, "unspooled": 0, "dropped": 0,
+                         "encoded": 0, "source_bytes": 0, "stored_bytes": 0, "encode_ms": 0.0}
+
+    def _count(self, name: str, amount=1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def start(self) -> None:
+        """Start the workers and the spool flusher (idempotent)."""
+        with self._lock:
+            if self._threads or self._closed:
+                return
+            for i in range(self.workers):
+                self._threads.append(threading.Thread(target=self._work, name=f"audit-{i}", daemon=True))
+            self._threads.append(threading.Thread(target=self._flush_loop, name="audit-spool", daemon=True))
+            self._threads.append(threading.Thread(target=self._spool_loop, name="audit-spooler", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, audio_bytes: bytes, folder: str, key: str, decoded: DecodedAudio = None,
+               request_id: str = None) -> str:
+        """
+        Queue `audio_bytes` (content hash `key`) for storage under `folder` and
+        return its gs:// URI. `decoded` is the request's already-decoded clip,
+        reused for encoding if it is the complete upload; otherwise the worker
+        decodes the bytes itself.
+        """
+        if self.encoding == "original":
+            content_type, extension = sniff_format(audio_bytes)
+        else:
+            _, _, content_type, extension = STORAGE_FORMATS[self.encoding]
+        filename = content_filename(key, extension)
+        uri = object_uri(folder, filename)
+        if is_uploaded(folder, filename):
+            self._count("deduped")
+            return uri
+
+        self.start()
+        self._count("submitted")
+        metadata = {"request_id": request_id} if request_id else {}
+        item = {"audio": audio_bytes, "folder": folder, "filename": filename,
+                "content_type": content_type, "metadata": metadata,
+                "encoded": self.encoding == "original", "decoded": decoded}
+        try:
+            if self._closed:
+                raise queue.Full
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self._threads:
+                self._overflow.put(item)
+            else:
+                self._spool(item)  # closed before it ever started: no spooler thread
+        return uri
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                with self._lock:
+                    self._in_flight[id(item)] = item
+                try:
+                    self._upload(item)
+                finally:
+                    with self._lock:
+                        self._in_flight.pop(id(item), None)
+            finally:
+                self._queue.task_done()
+
+    def _spool_loop(self) -> None:
+        while True:
+            item = self._overflow.get()
+            try:
+                if item is None:
+                    return
+                self._spool(item)
+            finally:
+                self._overflow.task_done()
+
+    def _prepare(self, item: dict) -> None:
+        """Encode the item's clip in `self.encoding` (unless stored as received) and describe it in the metadata."""
+        decoded = item.pop("decoded", None)
+        metadata = item["metadata"]
+        source_bytes = len(item["audio"])
+        if item["encoded"]:
+            if decoded is not None and "source_s" in decoded.stats:
+                metadata["duration_s"] = decoded.stats["source_s"]
+            metadata["encoding"] = "original"
+            self._count("source_bytes", source_bytes)
+            self._count("stored_bytes", source_bytes)
+            return
+
+        start = time.perf_counter()
+        try:
+            # decode_speech drops silence and caps the length; the audit copy keeps everything
+            if decoded is None or not decoded.stats.get("complete"):
+                from app.services.ingest import decode_full
+                decoded = decode_full(item["audio"])
+            data = decoded.encode(self.encoding)
+        except Exception as e:
+            # Keep the bytes as received rather than losing the audit copy
+            log.warning("Audit encoding of %s/%s failed, storing original: %s", item['folder'], item['filename'], e)
+            item["content_type"], _ = sniff_format(item["audio"])
+            metadata["encoding"] = "original"
+            item["encoded"] = True
+            return
+        encode_ms = (time.perf_counter() - start) * 1000.0
+
+        metadata.update({
+            "encoding": self.encoding,
+            "duration_s": round(decoded.duration, 3),
+            "sample_rate": TARGET_SR,
+            "source_bytes": source_bytes,
+        })
+        if "source_s" in decoded.stats:
+            metadata["source_duration_s"] = decoded.stats["source_s"]
+        item.update(audio=data, encoded=True)
+        self._count("encoded")
+        self._count("source_bytes", source_bytes)
+        self._count("stored_bytes", len(data))
+        self._count("encode_ms", encode_ms)
+
+    def _upload(self, item: dict) -> None:
+        if not item["encoded"] or "decoded" in item:
+            self._prepare(item)
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.uploader(item["audio"], item["folder"], item["filename"],
+                              content_type=item["content_type"], metadata=item["metadata"],
+                              timeout=AUDIT_UPLOAD_TIMEOUT)
+                self._count("uploaded")
+                if "spool_id" in item:
+                    self._unspool(item["spool_id"])
+                return
+            except Exception as e:
+                error = e
+                # While draining for shutdown, fail fast to the spool instead of sleeping
+                if attempt == self.max_retries or self._stop.is_set():
+                    break
+                self._count("retries")
+                time.sleep(random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt)))
+
+        log.warning("Audit upload %s/%s failed: %s", item['folder'], item['filename'], error)
+        if "spool_id" in item:
+            with self._lock:
+                self._spool_queued.discard(item["spool_id"])  # retried on the next flush
+        else:
+            self._spool(item)
+
+    # ---- Disk spool: <id>.audio holds the bytes, <id>.json (written last) marks it complete
+
+    def _spool(self, item: dict) -> None:
+        spool_id = hashlib.sha1(f"{item['folder']}/{item['filename']}".encode()).hexdigest()
+        base = os.path.join(self.spool_dir, spool_id)
+        # Read once: a worker may still be encoding this item (close() spools in-flight uploads)
+        audio, encoded = item["audio"], item["encoded"]
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            with open(base + ".audio.tmp", "wb") as f:
+                f.write(audio)
+            os.replace(base + ".audio.tmp", base + ".audio")
+            # The decoded clip is not spooled; unencoded audio is decoded again when re-queued
+            meta = {k: item[k] for k in ("folder", "filename", "content_type", "metadata")}
+            meta["encoded"] = encoded
+            with open(base + ".json.tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(base + ".json.tmp", base + ".json")
+            self._count("spooled")
+        except Exception as e:
+            self._count("dropped")
+            log.error("Audit spool write failed, audio for %s/%s dropped: %s", item['folder'], item['filename'], e)
+
+    def _unspool(self, spool_id: str) -> None:
+        base = os.path.join(self.spool_dir, spool_id)
+        for path in (base + ".json", base + ".audio"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._spool_queued.discard(spool_id)
+        self._count("unspooled")
+
+    def spooled_ids(self) -> list:
+        try:
+            names = [n for n in os.listdir(self.spool_dir) if n.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        paths = sorted((os.path.join(self.spool_dir, n) for n in names), key=os.path.getmtime)
+        return [os.path.basename(p)[:-len(".json")] for p in paths]
+
+    def flush_spool(self) -> int:
+        """Queue spooled audio for upload while the queue has room; returns how many were queued."""
+        queued = 0
+        for spool_id in self.spooled_ids():
+            # Leave half the queue for live traffic
+            if self._closed or self._queue.qsize() >= self._queue.maxsize // 2:
+                break
+            with self._lock:
+                if spool_id in self._spool_queued:
+                    continue
+            base = os.path.join(self.spool_dir, spool_id)
+            try:
+                with open(base + ".json") as f:
+                    item = json.load(f)
+                item.setdefault("encoded", True)
+                with open(base + ".audio", "rb") as f:
+                    item["audio"] = f.read()
+            except (OSError, ValueError) as e:
+                log.warning("Unreadable audit spool entry %s: %s", spool_id, e)
+                continue
+            item["spool_id"] = spool_id
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                break
+            with self._lock:
+                self._spool_queued.add(spool_id)
+            queued += 1
+        return queued
+
+    def _flush_loop(self) -> None:
+        # First pass right away: uploads spooled before a restart go out first
+        while not self._stop.is_set():
+            try:
+                queued = self.flush_spool()
+                if queued:
+                    log.info("Re-queued %s spooled audit upload(s)", queued)
+            except Exception as e:
+                log.warning("Audit spool flush failed: %s", e)
+            self._stop.wait(self.spool_interval)
+
+    def close(self, timeout: float = AUDIT_DRAIN_TIMEOUT) -> None:
+        """
+        Stop accepting work, let queued uploads finish within `timeout`, spool
+        the rest: items still queued and uploads still in flight (the object
+        name is deterministic, so one that completes anyway is uploaded twice,
+        never lost).
+        """
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+
+        with self._lock:
+            in_flight = [item for item in self._in_flight.values() if "spool_id" not in item]
+        for item in in_flight:
+            self._spool(item)
+        left = len(in_flight)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and "spool_id" not in item:
+                self._spool(item)
+                left += 1
+            self._queue.task_done()
+        for _ in range(self.workers):
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        # Overflow handed to the spooler thread reaches the disk before shutdown
+        if self._threads:
+            self._overflow.join()
+        if left:
+            log.warning("Audit sink closed with %s upload(s) spooled to %s", left, self.spool_dir)
+
+    def pending(self) -> int:
+        """Uploads waiting in memory (spooled files are reported by stats())."""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["encode_ms"] = round(counters["encode_ms"], 1)
+        return {**counters, "encoding": self.encoding, "queued": self._queue.qsize(),
+                "spool_files": len(self.spooled_ids())}
+
+
+audit_sink = AuditSink()
+gauge(QUEUE_DEPTH, audit_sink.pending, queue="audit")
+
+
+def audit_registration_audio(audio_bytes: bytes, person_name: str, key: str,
+                             decoded: DecodedAudio = None, request_id: str = None) -> str:
+    return audit_sink.submit(audio_bytes, registration_folder(person_name), key, decoded, request_id)
+
+
+def audit_match_audio(audio_bytes: bytes, key: str, decoded: DecodedAudio = None, request_id: str = None) -> str:
+    return audit_sink.submit(audio_bytes, "matches", key, decoded, request_id)
+
+
+def audit_transaction_audio(audio_bytes: bytes, key: str, decoded: DecodedAudio = None, request_id: str = None) -> str:
+    return audit_sink.submit(audio_bytes, "transactions", key, decoded, request_id)
@@ -0,0 +1,118 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+from dotenv import load_dotenv
+
+from app.services import profiling
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+EMBED_BATCH_MAX_SIZE    = int(os.getenv("EMBED_BATCH_MAX_SIZE", "8"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    """
+    Dynamic micro-batcher in front of SpeakerEncoder.
+
+    Callers on any thread hand in one waveform and block on a Future. A single
+    worker thread collects whatever arrives within `max_wait_ms` of the first
+    waveform (up to `max_batch_size`) and runs one padded forward pass for all
+    of them.
+    """
+
+    def __init__(self, encoder, max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+                 max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.encoder = encoder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, waveform: np.ndarray) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((np.asarray(waveform, dtype=np.float32).reshape(-1), future))
+        return future
+
+    def pending(self) -> int:
+        """Waveforms waiting for the next batch."""
+        return self._queue.qsize()
+
+    def encode(self, waveform: np.ndarray) -> np.ndarray:
+        if self.max_batch_size == 1:
+            if profiling.torch_active:
+                return profiling.run_encoder(self.encoder.encode, waveform)
+            return self.encoder.encode(waveform)
+        return self.submit(waveform).result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._run_batch(self._collect())
+            except Exception as e:
+                # One bad batch must not take the only worker down with it
+                log.exception("Embedding batch failed: %s", e)
+
+    def _run_batch(self, batch: list) -> None:
+        # Waiters that gave up (a cancelled request) are dropped before the forward pass
+        batch = [(w, future) for w, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        waveforms = [w for w, _ in batch]
+        try:
+            if profiling.torch_active:
+                embeddings = profiling.run_encoder(self.encoder.encode_batch, waveforms)
+            else:
+                embeddings = self.encoder.encode_batch(waveforms)
+        except Exception as e:
+            log.error("Batched embedding failed for %s clip(s): %s", len(batch), e)
+            for _, future in batch:
+                _settle(future, exception=e)
+            return
+
+        for (_, future), emb in zip(batch, embeddings):
+            _settle(future, result=emb)
+
+
+def _settle(future: Future, result=None, exception: BaseException = None) -> None:
+    """Resolve a running Future; one already resolved elsewhere is left alone."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
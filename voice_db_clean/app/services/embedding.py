@@ -1,9 +1,109 @@
-from app.services.audio import load_audio_from_bytes
-from app.models.speaker import SpeakerEncoder
+import asyncio
+import logging
+import os
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
 
-encoder = SpeakerEncoder()
+from app.services.audio import DecodedAudio, TARGET_SR
+from app.services.batcher import EmbeddingBatcher
+from app.services.embedding_cache import embedding_cache, content_key
+from app.services.metrics import QUEUE_DEPTH, gauge, timed
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+WARMUP_SECONDS = float(os.getenv("WARMUP_SECONDS", "2.0"))
+
+# The encoder (and torch/SpeechBrain with it) is loaded on first use or by
+# warm_up() at startup, not when the routers are imported.
+_encoder = None
+_batcher = None
+_load_lock = threading.Lock()
+
+gauge(QUEUE_DEPTH, lambda: _batcher.pending() if _batcher is not None else 0, queue="embedding_batch")
+
+
+def get_encoder():
+    global _encoder, _batcher
+    if _encoder is None:
+        with _load_lock:
+            if _encoder is None:
+                from app.models.speaker import load_encoder
+                start = time.perf_counter()
+                encoder = load_encoder()
+                _batcher = EmbeddingBatcher(encoder)
+                _encoder = encoder
+                log.info("Speaker encoder loaded in %.2fs", time.perf_counter() - start)
+    return _encoder
+
+
+def get_batcher() -> EmbeddingBatcher:
+    get_encoder()
+    return _batcher
+
+
+def warm_up() -> dict:
+    """
+    Load the encoder and run inference on dummy audio so the first request does
+    not pay for torch's lazy initialisation. Returns the load/warm-up seconds.
+    """
+    start = time.perf_counter()
+    encoder = get_encoder()
+    loaded = time.perf_counter()
+
+    rng = np.random.default_rng(0)
+    n = max(int(WARMUP_SECONDS * TARGET_SR), TARGET_SR // 2)
+    noise = (0.01 * rng.standard_normal(n)).astype(np.float32)
+    encoder.encode(noise)
+    # Also exercise the padded batch path used by the micro-batcher
+    encoder.encode_batch([noise, noise[: n // 2]])
+    get_batcher().encode(noise)
+    done = time.perf_counter()
+
+    log.info("Speaker encoder warmed up in %.2fs", done - loaded)
+    return {"model_load": loaded - start, "warmup": done - loaded}
+
+
+@timed("embedding")
+def generate_embedding(audio, key: str = None):
+    """
+    Embed a DecodedAudio clip or a raw 16 kHz waveform. With a content `key`
+    (see embedding_cache.content_key) the result is stored in the embedding cache.
+    """
+    return _embed(audio, key)
+
+
+@timed("embedding")
+async def generate_embedding_async(audio, key: str = None):
+    """
+    generate_embedding for the event loop. The clip is handed to the
+    micro-batcher and its Future awaited, so no pool thread sits blocked while
+    it waits for a batch; the "embedding" stage's semaphore alone bounds how
+    many clips are in flight. Unbatched, the forward pass runs on a thread.
+    """
+    batcher = _batcher if _batcher is not None else await asyncio.to_thread(get_batcher)
+    if batcher.max_batch_size == 1:
+        return await asyncio.to_thread(_embed, audio, key)
+    samples = audio.samples if isinstance(audio, DecodedAudio) else audio
+    embedding = await asyncio.wrap_future(batcher.submit(samples))
+    embedding_cache.set(key, embedding)
+    return embedding
+
+
+def _embed(audio, key: str = None):
+    batcher = get_batcher()
+    if isinstance(audio, DecodedAudio):
+        audio = audio.tensor() if batcher.max_batch_size == 1 else audio.samples
+    embedding = batcher.encode(audio)
+    embedding_cache.set(key, embedding)
+    return embedding
 
 def generate_embedding_from_bytes(audio_bytes: bytes):
-    waveform = load_audio_from_bytes(audio_bytes)
-    embedding = encoder.encode(waveform)
+    key = content_key(audio_bytes)
+    embedding = embedding_cache.get(key)
+    if embedding is None:
+        embedding = generate_embedding(DecodedAudio.from_bytes(audio_bytes), key)
     return embedding
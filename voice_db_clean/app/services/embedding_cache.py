@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+from app.utils.lru import LRUCache
+from app.services import ingest
+from app.services.audio import TARGET_SR
+from app.services.metrics import CACHE_LOOKUPS
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))        # 0 disables the cache
+EMBED_CACHE_TTL  = float(os.getenv("EMBED_CACHE_TTL", "86400"))      # seconds, 0 = no expiry
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")                 # sqlite file for the disk tier
+# Label of every key; a fingerprint of the model and preprocessing settings is
+# appended (see pipeline_namespace), so changing either never serves old vectors
+EMBED_CACHE_NAMESPACE = os.getenv("EMBED_CACHE_NAMESPACE", "ecapa-voxceleb")
+
+
+_HIT  = CACHE_LOOKUPS.labels(cache="embedding", result="hit")
+_MISS = CACHE_LOOKUPS.labels(cache="embedding", result="miss")
+
+
+def pipeline_namespace(label: str = EMBED_CACHE_NAMESPACE) -> str:
+    """
+    `label` plus a hash of everything between the upload bytes and the vector:
+    encoder model, backend and quantization, and the decode / VAD settings.
+    The encoder settings are read from the environment like app.models.speaker
+    does, so the cache does not have to import torch.
+    """
+    backend = os.getenv("SPEAKER_ENCODER_BACKEND", "eager").lower()
+    config = {
+        "model": os.getenv("SPEAKER_MODEL_SOURCE", "speechbrain/spkrec-ecapa-voxceleb"),
+        "backend": backend,
+        "int8": backend == "onnx" and os.getenv("SPEAKER_ENCODER_INT8", "false").lower() == "true",
+        "sample_rate": TARGET_SR,
+        "max_seconds": ingest.MAX_AUDIO_SECONDS,
+        "vad": [ingest.VAD_FRAME_MS, ingest.VAD_RANGE_DB, ingest.VAD_FLOOR_DB, ingest.VAD_PAD_MS]
+               if ingest.VAD_ENABLED else None,
+    }
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return f"{label}-{digest}"
+
+
+def content_key(audio_bytes: bytes) -> str:
+    """SHA-256 of the raw upload; identical audio maps to the same key."""
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache: audio content key → float32 embedding.
+
+    Memory tier: a bounded LRU. Disk tier (optional): one sqlite table shared by
+    worker processes and kept across restarts; disk hits are promoted to memory.
+    Both tiers honour `ttl`. Cached vectors are read-only arrays.
+    """
+
+    def __init__(self, maxsize: int = EMBED_CACHE_SIZE, ttl: float = EMBED_CACHE_TTL,
+                 path: str = EMBED_CACHE_PATH, namespace: str = None):
+        self.enabled = maxsize > 0
+        self.ttl = ttl or None
+        self.namespace = namespace or pipeline_namespace()
+        self._memory = LRUCache(max(maxsize, 1), ttl=self.ttl)
+        self.disk_hits = 0
+        self._db = None
+        self._db_lock = threading.Lock()
+        if self.enabled and path:
+            self._open(path)
+
+    def _open(self, path: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db = db
+            removed = self.purge_expired()
+            log.info("Embedding cache disk tier: %s (%s expired entr(ies) purged)", path, removed)
+        except Exception as e:
+            log.warning("Embedding cache disk tier unavailable (%s), memory only", e)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    @property
+    def hits(self) -> int:
+        return self._memory.hits + self.disk_hits
+
+    @property
+    def misses(self) -> int:
+        # A disk hit was first counted as a memory miss
+        return self._memory.misses - self.disk_hits
+
+    def get(self, key: str):
+        if not self.enabled or key is None:
+            return None
+        key = self._key(key)
+        vector = self._memory.get(key)
+        if vector is None and self._db is not None:
+            vector = self._disk_get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._memory.set(key, vector)
+        (_MISS if vector is None else _HIT).inc()
+        return vector
+
+    def set(self, key: str, vector) -> None:
+        if not self.enabled or key is None:
+            return
+        vector = np.array(vector, dtype=np.float32).reshape(-1)
+        vector.flags.writeable = False
+        key = self._key(key)
+        self._memory.set(key, vector)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                        (key, vector.tobytes(), time.time())
+                    )
+            except Exception as e:
+                log.warning("Embedding cache disk write failed: %s", e)
+
+    def _disk_get(self, key: str):
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        except Exception as e:
+            log.warning("Embedding cache disk read failed: %s", e)
+            return None
+        if row is None:
+            return None
+        if self.ttl and time.time() - row[1] > self.ttl:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def purge_expired(self) -> int:
+        """Delete expired disk entries; returns how many were removed."""
+        if self._db is None or not self.ttl:
+            return 0
+        with self._db_lock:
+            cursor = self._db.execute(
+                "DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._memory),
+            "memory_hits": self._memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache()
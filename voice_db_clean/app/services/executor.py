@@ -0,0 +1,99 @@
+import asyncio
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+
+from app.services import profiling
+from app.services.batcher import EMBED_BATCH_MAX_SIZE
+from app.services.metrics import STAGE_PENDING, gauge
+
+load_dotenv()
+
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 2)))
+IO_POOL_WORKERS  = int(os.getenv("IO_POOL_WORKERS", "32"))
+
+# CPU work (librosa, torch) runs in threads rather than processes: both release
+# the GIL in their hot loops and the ECAPA model only has to live in one process.
+_cpu_pool = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="cpu")
+_io_pool  = ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix="io")
+
+
+class StageOverloaded(Exception):
+    """Raised when a stage already has its maximum number of calls running and queued."""
+
+    def __init__(self, stage: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(f"Stage '{stage}' is at capacity")
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class Stage:
+    """
+    A named pipeline stage with its own concurrency limit and bounded wait queue.
+    Calls beyond `max_concurrency + max_queue` are rejected immediately instead
+    of piling up behind a slow dependency.
+    """
+
+    def __init__(self, name: str, pool: ThreadPoolExecutor, max_concurrency: int,
+                 max_queue: int, status_code: int = 503):
+        self.name = name
+        self.pool = pool
+        self.max_concurrency = int(os.getenv(f"STAGE_{name.upper()}_CONCURRENCY", max_concurrency))
+        self.max_queue = int(os.getenv(f"STAGE_{name.upper()}_QUEUE", max_queue))
+        self.status_code = status_code
+        self.pending = 0
+        self._semaphore = None
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.max_concurrency + self.max_queue:
+            raise StageOverloaded(self.name, self.status_code)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.pending += 1
+        try:
+            async with self._semaphore:
+                # Async clients (e.g. the pooled STT client) run on the event loop itself
+                if inspect.iscoroutinefunction(fn):
+                    return await fn(*args, **kwargs)
+                call = partial(fn, *args, **kwargs)
+                if profiling.enabled:
+                    call = profiling.wrap(call)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.pool, call)
+        finally:
+            self.pending -= 1
+
+
+# Embedding calls await the micro-batcher on the event loop (generate_embedding_async)
+# rather than holding a pool thread, so their limit is sized for full batches
+EMBED_CONCURRENCY = max(CPU_POOL_WORKERS, 4 * EMBED_BATCH_MAX_SIZE)
+
+STAGES = {
+    "decode":        Stage("decode",        _cpu_pool, CPU_POOL_WORKERS, 64),
+    "embedding":     Stage("embedding",     _cpu_pool, EMBED_CONCURRENCY, 64),
+    "vector_search": Stage("vector_search", _io_pool,  16, 64),
+    "firestore":     Stage("firestore",     _io_pool,  16, 64),
+    "stt":           Stage("stt",           _io_pool,  8,  32, status_code=429),
+    "nlp":           Stage("nlp",           _io_pool,  8,  32, status_code=429),
+}
+
+for _stage in STAGES.values():
+    gauge(STAGE_PENDING, lambda s=_stage: s.pending, stage=_stage.name)
+
+
+async def run_stage(stage: str, fn, *args, **kwargs):
+    """
+    Run a blocking callable on the pool that owns `stage` (or await a coroutine
+    function on the event loop), with the stage's backpressure either way.
+    """
+    return await STAGES[stage].run(fn, *args, **kwargs)
+
+
+def shutdown_pools() -> None:
+    _cpu_pool.shutdown(wait=False, cancel_futures=True)
+    _io_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,14 +1,26 @@
 from google.cloud import aiplatform
 from google.cloud import firestore
 from google.cloud.aiplatform_v1.types import IndexDatapoint
+import hashlib
+import logging
+import threading
+import time
 import uuid
 import os
 import numpy as np
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+from app.services.name_directory import NameDirectory
+from app.services.metrics import ORPHANED_VECTORS, timed
+from app.services.scoring import RAW_THRESHOLD, aggregate_per_person, reduce_scores
+from app.services.speaker_index import speaker_index
+from app.utils.lru import LRUCache
+
 load_dotenv(override=True)
 
+log = logging.getLogger(__name__)
+
 DIM = 192
 GCP_PROJECT_ID        = os.getenv("GCP_PROJECT_ID")
 GCP_REGION            = os.getenv("GCP_REGION", "us-central1")
@@ -17,13 +29,32 @@ GCP_INDEX_ENDPOINT_ID = os.getenv("GCP_INDEX_ENDPOINT_ID")
 GCP_DEPLOYED_INDEX_ID = os.getenv("GCP_DEPLOYED_INDEX_ID")
 FIRESTORE_COLLECTION  = "voice_speakers"
 
+# Serve identify_speaker from the in-process SpeakerIndex once it is warm;
+# Vertex is only queried while the index is cold/disabled, or as a fallback
+# when the local best match is below RAW_THRESHOLD (the speaker may have been
+# enrolled by another worker since the last refresh).
+LOCAL_INDEX_ENABLED   = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+VERTEX_FALLBACK       = os.getenv("VERTEX_FALLBACK", "true").lower() == "true"
+# Reload the local index from Firestore this often (0 = only at startup)
+LOCAL_INDEX_REFRESH   = float(os.getenv("LOCAL_INDEX_REFRESH_SECONDS", "300"))
+# Push registrations and deletions from other workers into the name directory
+# and the local index as they happen
+NAME_DIRECTORY_LISTEN = os.getenv("NAME_DIRECTORY_LISTEN", "false").lower() == "true"
+SPEAKER_PROFILE_CACHE = int(os.getenv("SPEAKER_PROFILE_CACHE", "1024"))
+# Seconds a cached verify profile is trusted; bounds how long samples enrolled
+# by another worker go unseen (the snapshot listener drops them sooner)
+SPEAKER_PROFILE_TTL   = float(os.getenv("SPEAKER_PROFILE_TTL", "60"))
+
 _db             = None
 _index_endpoint = None
 _index          = None
+_profiles       = LRUCache(SPEAKER_PROFILE_CACHE, ttl=SPEAKER_PROFILE_TTL)
+_refresher      = None
 
 
-def init_gcp():
-    global _db, _index_endpoint, _index
+def init_gcp(warm: bool = True):
+    """Create the Firestore and Vertex clients; `warm` also loads the in-memory indexes."""
+    global _db, _index_endpoint, _index, _refresher
 
     project_id = os.getenv("GCP_PROJECT_ID", "").strip()
     if not project_id:
@@ -31,14 +62,18 @@ def init_gcp():
         parts = index_resource.split("/")
         if len(parts) >= 2:
             project_id = parts[1]
-            print(f"[DEBUG] GCP_PROJECT_ID extracted from GCP_INDEX_ID: '{project_id}'")
+            log.debug("GCP_PROJECT_ID extracted from GCP_INDEX_ID: '%s'", project_id)
         else:
-            print("[ERROR] GCP_PROJECT_ID is empty and could not be extracted from GCP_INDEX_ID")
+            log.error("GCP_PROJECT_ID is empty and could not be extracted from GCP_INDEX_ID")
     else:
-        print(f"[DEBUG] GCP_PROJECT_ID = '{project_id}'")
+        log.debug("GCP_PROJECT_ID = '%s'", project_id)
+
+    region = os.getenv("GCP_REGION", "us-central1").strip()
+    aiplatform.init(project=project_id, location=region)
+    log.info("Vertex AI initialized: project=%s, region=%s", project_id, region)
 
     _db = firestore.Client(project=project_id, database="(default)")
-    print("[OK] Firestore client initialized")
+    log.info("Firestore client initialized")
 
     try:
         _index_endpoint = aiplatform.MatchingEngineIndexEndpoint(
@@ -47,10 +82,66 @@ def init_gcp():
         _index = aiplatform.MatchingEngineIndex(
             index_name=os.getenv("GCP_INDEX_ID")
         )
-        print("[OK] Vertex AI Vector Search initialized")
+        log.info("Vertex AI Vector Search initialized")
     except Exception as e:
-        print(f"[WARN] Vertex AI Vector Search unavailable (network issue?): {e}")
-        print("[WARN] Server will start but vector search endpoints will fail until GCP is reachable.")
+        log.warning("Vertex AI Vector Search unavailable (network issue?): %s", e)
+        log.warning("Server will start but vector search endpoints will fail until GCP is reachable.")
+
+    if not warm:
+        return
+
+    if LOCAL_INDEX_ENABLED:
+        try:
+            warm_local_index()
+        except Exception as e:
+            log.warning("Local speaker index warm-up failed, using Vertex AI only: %s", e)
+        if LOCAL_INDEX_REFRESH > 0 and _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name="speaker-index-refresh", daemon=True)
+            _refresher.start()
+
+    try:
+        name_directory.refresh()
+        if NAME_DIRECTORY_LISTEN:
+            _db.collection(FIRESTORE_COLLECTION).on_snapshot(_on_speakers_snapshot)
+            log.info("Name directory listening for Firestore changes")
+    except Exception as e:
+        log.warning("Name directory warm-up failed, will load on first lookup: %s", e)
+
+
+def warm_local_index() -> None:
+    """
+    Load every sample embedding from Firestore into the in-process SpeakerIndex
+    and derive each person's centroid from them (centroid docs carry no vector).
+    """
+    docs = _db.collection(FIRESTORE_COLLECTION) \
+              .select(["person_name", "embedding", "is_centroid"]) \
+              .stream()
+
+    items = []
+    by_person = {}
+    for doc in docs:
+        data = doc.to_dict()
+        if not data or data.get("is_centroid", False) or not data.get("embedding"):
+            continue
+        name = data["person_name"].lower()
+        vector = np.asarray(data["embedding"], dtype=np.float32)
+        items.append((doc.id, name, vector))
+        by_person.setdefault(name, []).append(vector)
+
+    for name, vectors in by_person.items():
+        items.append((f"{name}_centroid", name, normalize(np.mean(vectors, axis=0))))
+
+    speaker_index.replace_all(items)
+    log.info("Local speaker index warmed: %s vector(s), %s speaker(s)", len(items), len(by_person))
+
+
+def _refresh_loop() -> None:
+    while True:
+        time.sleep(LOCAL_INDEX_REFRESH)
+        try:
+            warm_local_index()
+        except Exception as e:
+            log.warning("Local speaker index refresh failed, keeping the previous copy: %s", e)
 
 
 def normalize(vec: np.ndarray) -> np.ndarray:
@@ -59,150 +150,427 @@ def normalize(vec: np.ndarray) -> np.ndarray:
 
 
 def add_embedding(embedding: np.ndarray, person_name: str) -> None:
+    add_embeddings([embedding], person_name)
+
+
+def add_embeddings(embeddings: list, person_name: str) -> list:
+    """
+    Register several samples for one person in a single round-trip per backend:
+    one upsert_datapoints call carrying every sample plus the centroid, and one
+    Firestore transaction that writes all sample documents and folds the new
+    vectors into the centroid's running sum (see _apply_centroid_delta).
+    Returns the new sample datapoint IDs (empty on failure).
+    """
     try:
-        vector = normalize(embedding)
-        datapoint_id = str(uuid.uuid4())
         name_lower = person_name.lower()
+        vectors = [normalize(np.asarray(e, dtype=np.float32)) for e in embeddings]
+        if not vectors:
+            return []
+        datapoint_ids = [str(uuid.uuid4()) for _ in vectors]
+
+        now = datetime.now(timezone.utc)
+        collection = _db.collection(FIRESTORE_COLLECTION)
+        sample_writes = [
+            (collection.document(datapoint_id), {
+                "person_name": name_lower,
+                "created_at": now,
+                "embedding": vector.tolist()
+            })
+            for datapoint_id, vector in zip(datapoint_ids, vectors)
+        ]
+        centroid_id, centroid, count = _apply_centroid_delta(
+            name_lower, np.sum(vectors, axis=0), len(vectors), sample_writes
+        )
+        log.info("Registered speaker '%s' with %s sample(s)", name_lower, len(vectors))
 
         _index.upsert_datapoints(
             datapoints=[
-                IndexDatapoint(
-                    datapoint_id=datapoint_id,
-                    feature_vector=vector.tolist()
-                )
+                IndexDatapoint(datapoint_id=datapoint_id, feature_vector=vector.tolist())
+                for datapoint_id, vector in zip(datapoint_ids, vectors)
+            ] + [
+                IndexDatapoint(datapoint_id=centroid_id, feature_vector=centroid.tolist())
             ]
         )
-        print(f"[OK] Vector upserted to Vertex AI for '{name_lower}' ID={datapoint_id}")
+        log.info("%s vector(s) + centroid (%s sample(s)) upserted to Vertex AI for '%s'", len(vectors), count, name_lower)
 
-        _db.collection(FIRESTORE_COLLECTION).document(datapoint_id).set({
-            "person_name": name_lower,
-            "created_at": datetime.now(timezone.utc),
-            "embedding": vector.tolist()
-        })
-        print(f"[OK] Registered speaker '{name_lower}' with ID {datapoint_id}")
+        speaker_index.upsert_many(
+            list(zip(datapoint_ids, [name_lower] * len(vectors), vectors))
+            + [(centroid_id, name_lower, centroid)]
+        )
+        name_directory.add(name_lower)
+        _profiles.pop(name_lower)
 
-        _update_centroid(name_lower)
+        return datapoint_ids
 
     except Exception as e:
-        import traceback
-        print(f"[ERROR] GCP REGISTER ERROR: {e}")
-        traceback.print_exc()
-
-
-def _update_centroid(person_name: str) -> None:
-    try:
-        docs = _db.collection(FIRESTORE_COLLECTION) \
-                  .where("person_name", "==", person_name) \
-                  .stream()
-
-        embeddings = []
-        for doc in docs:
-            data = doc.to_dict()
-            if data.get("embedding") and not data.get("is_centroid", False):
-                embeddings.append(np.array(data["embedding"]))
+        log.exception("GCP REGISTER ERROR: %s", e)
+        return []
 
-        if not embeddings:
-            return
 
-        centroid = normalize(np.mean(embeddings, axis=0))
-        centroid_id = f"{person_name}_centroid"
+def sample_id(person_name: str, source: str) -> str:
+    """Datapoint ID of an imported sample: the same clip always maps to the same document."""
+    return hashlib.sha256(f"{person_name.lower()}\0{source}".encode("utf-8")).hexdigest()[:32]
+
+
+def add_embeddings_bulk(groups: dict, chunk_size: int = 500) -> dict:
+    """
+    Import variant of add_embeddings for many speakers at once
+    ({person_name: [(source, embedding), ...]}, where `source` names the clip,
+    e.g. its path relative to the corpus). Sample IDs come from `sample_id`, and
+    each speaker's samples are committed in transactions of up to `chunk_size`
+    writes together with the centroid update, skipping samples that already
+    exist; an interrupted or retried import therefore never stores or counts a
+    clip twice. All datapoints are then upserted to Vertex AI in chunks.
+    Raises on failure so callers can retry the whole group.
+    Returns {person_name: [datapoint_id, ...]}.
+    """
+    collection = _db.collection(FIRESTORE_COLLECTION)
+    now = datetime.now(timezone.utc)
+    # The centroid document is one of the transaction's writes
+    per_transaction = max(chunk_size - 1, 1)
+    records, centroids = [], []
+    for person_name, items in groups.items():
+        name_lower = person_name.lower()
+        person = {}
+        for source, e in items:
+            person[sample_id(name_lower, source)] = normalize(np.asarray(e, dtype=np.float32))
+        person = list(person.items())
+        if not person:
+            continue
+
+        for start in range(0, len(person), per_transaction):
+            samples = [
+                (collection.document(datapoint_id), {
+                    "person_name": name_lower,
+                    "created_at": now,
+                    "embedding": vector.tolist()
+                }, vector)
+                for datapoint_id, vector in person[start:start + per_transaction]
+            ]
+            centroid_id, centroid, _ = _apply_centroid_delta(name_lower, np.zeros(DIM), 0, samples=samples)
+        records.extend((datapoint_id, name_lower, vector) for datapoint_id, vector in person)
+        centroids.append((centroid_id, name_lower, centroid))
 
+    points = records + centroids
+    for start in range(0, len(points), chunk_size):
         _index.upsert_datapoints(
             datapoints=[
-                IndexDatapoint(
-                    datapoint_id=centroid_id,
-                    feature_vector=centroid.tolist()
-                )
+                IndexDatapoint(datapoint_id=datapoint_id, feature_vector=vector.tolist())
+                for datapoint_id, _, vector in points[start:start + chunk_size]
             ]
         )
 
-        _db.collection(FIRESTORE_COLLECTION).document(centroid_id).set({
-            "person_name": person_name,
-            "is_centroid": True,
-            "sample_count": len(embeddings),
-            "updated_at": datetime.now(timezone.utc)
-        })
+    speaker_index.upsert_many(points)
+    for _, name_lower, _ in centroids:
+        name_directory.add(name_lower)
+        _profiles.pop(name_lower)
+
+    log.info("Bulk registered %s sample(s) for %s speaker(s)", len(records), len(centroids))
+    result = {}
+    for datapoint_id, name_lower, _ in records:
+        result.setdefault(name_lower, []).append(datapoint_id)
+    return result
+
+
+def remove_embedding(datapoint_id: str) -> bool:
+    """
+    Delete one sample and subtract it from its speaker's running centroid.
+    The centroid is removed as well once the speaker has no samples left.
+    """
+    try:
+        collection = _db.collection(FIRESTORE_COLLECTION)
+        doc = collection.document(datapoint_id).get()
+        data = doc.to_dict() if doc.exists else None
+        if not data or data.get("is_centroid", False) or not data.get("embedding"):
+            log.warning("No sample document with ID=%s", datapoint_id)
+            return False
+
+        name_lower = data["person_name"].lower()
+        vector = np.asarray(data["embedding"], dtype=np.float32)
+        centroid_id, centroid, count = _apply_centroid_delta(
+            name_lower, -vector, -1, deletes=[collection.document(datapoint_id)]
+        )
+
+        if count > 0:
+            _index.upsert_datapoints(
+                datapoints=[IndexDatapoint(datapoint_id=centroid_id, feature_vector=centroid.tolist())]
+            )
+            _index.remove_datapoints(datapoint_ids=[datapoint_id])
+            speaker_index.upsert(centroid_id, name_lower, centroid)
+            speaker_index.remove([datapoint_id])
+        else:
+            _index.remove_datapoints(datapoint_ids=[datapoint_id, centroid_id])
+            speaker_index.remove([datapoint_id, centroid_id])
+            name_directory.discard(name_lower)
 
-        print(f"[OK] Centroid updated for '{person_name}' from {len(embeddings)} sample(s)")
+        _profiles.pop(name_lower)
+        log.info("Removed sample ID=%s from '%s' (%s sample(s) left)", datapoint_id, name_lower, count)
+        return True
 
     except Exception as e:
-        import traceback
-        print(f"[ERROR] CENTROID UPDATE ERROR: {e}")
-        traceback.print_exc()
+        log.exception("GCP REMOVE ERROR: %s", e)
+        return False
+
+
+def _apply_centroid_delta(person_name: str, delta_sum: np.ndarray, delta_count: int,
+                          writes: list = (), deletes: list = (), samples: list = ()) -> tuple:
+    """
+    O(1) centroid maintenance. The centroid document stores the unnormalized sum
+    of the speaker's normalized samples ("embedding_sum") and "sample_count";
+    a transaction reads it, adds the delta, and commits it together with the
+    caller's sample writes/deletes. Returns (centroid_id, centroid, sample_count).
+
+    `samples` are (ref, doc, vector) sample writes that may already have been
+    committed by an earlier attempt: those whose document exists are skipped,
+    the rest are written and their vectors added to the delta.
+
+    Centroid documents written before running sums existed are migrated by one
+    full rescan of the speaker's samples. The rescan reads the state before this
+    transaction's writes, so the delta is still added on top of it exactly once.
+    """
+    centroid_id = f"{person_name}_centroid"
+    collection = _db.collection(FIRESTORE_COLLECTION)
+    centroid_ref = collection.document(centroid_id)
+
+    @firestore.transactional
+    def apply(transaction):
+        snapshot = centroid_ref.get(transaction=transaction)
+        data = snapshot.to_dict() if snapshot.exists else {}
+
+        added_sum, added_count = np.asarray(delta_sum, dtype=np.float64), delta_count
+        new_samples = []
+        if samples:
+            existing = {doc.id for doc in transaction.get_all([ref for ref, _, _ in samples]) if doc.exists}
+            for ref, doc, vector in samples:
+                if ref.id not in existing:
+                    new_samples.append((ref, doc))
+                    added_sum = added_sum + vector
+                    added_count += 1
+
+        if data.get("embedding_sum") is not None or not data.get("sample_count"):
+            total = np.asarray(data.get("embedding_sum") or np.zeros(DIM), dtype=np.float64) + added_sum
+            count = int(data.get("sample_count", 0)) + added_count
+        else:
+            total, count = _rescan_sum(person_name, transaction)
+            total = total + added_sum
+            count += added_count
+
+        for ref, doc in list(writes) + new_samples:
+            transaction.set(ref, doc)
+        for ref in deletes:
+            transaction.delete(ref)
+
+        if count > 0:
+            transaction.set(centroid_ref, {
+                "person_name": person_name,
+                "is_centroid": True,
+                "sample_count": count,
+                "embedding_sum": total.tolist(),
+                "updated_at": datetime.now(timezone.utc)
+            })
+        else:
+            transaction.delete(centroid_ref)
+        return total, count
+
+    total, count = apply(_db.transaction())
+    return centroid_id, normalize(np.asarray(total, dtype=np.float32)), count
+
+
+def _rescan_sum(person_name: str, transaction=None) -> tuple:
+    query = _db.collection(FIRESTORE_COLLECTION) \
+               .where("person_name", "==", person_name) \
+               .select(["embedding", "is_centroid"])
+    docs = transaction.get(query) if transaction is not None else query.stream()
+
+    embeddings = [
+        data["embedding"] for data in (doc.to_dict() for doc in docs)
+        if data and data.get("embedding") and not data.get("is_centroid", False)
+    ]
+    if not embeddings:
+        return np.zeros(DIM), 0
+    matrix = np.asarray(embeddings, dtype=np.float64)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return matrix.sum(axis=0), len(embeddings)
 
 
 def identify_speaker(embedding: np.ndarray) -> tuple:
+    ranked = identify_topk(embedding, k=1)
+    if not ranked:
+        return None, 0.0
+    return ranked[0]
+
+
+def identify_topk(embedding: np.ndarray, k: int = 5) -> list:
+    """Return up to k distinct speakers as (person_name, similarity), best first."""
     try:
         query = normalize(embedding)
 
-        response = _index_endpoint.find_neighbors(
-            deployed_index_id=GCP_DEPLOYED_INDEX_ID,
-            queries=[query.tolist()],
-            num_neighbors=20
-        )
+        if LOCAL_INDEX_ENABLED and speaker_index.ready:
+            # Each speaker owns several vectors (samples + centroid), so over-fetch
+            hits = speaker_index.search(query, k=k * 8)
+            ranked = aggregate_per_person((name, score) for _, name, score in hits)[:k]
+            if ranked and ranked[0][1] >= RAW_THRESHOLD:
+                name, similarity = ranked[0]
+                log.debug("Matched '%s' locally (similarity=%.4f)", name, similarity)
+                return ranked
+            if not VERTEX_FALLBACK:
+                if not ranked:
+                    log.warning("No neighbors found")
+                return ranked
+            # No confident local match: the speaker may be newer than this copy
+            remote = _identify_topk_vertex(query, k)
+            if ranked and (not remote or ranked[0][1] >= remote[0][1]):
+                return ranked
+            return remote
+
+        return _identify_topk_vertex(query, k)
+
+    except Exception as e:
+        log.error("GCP MATCH ERROR: %s", e)
+        return []
+
 
-        if not response or not response[0]:
-            print("[WARN] No neighbors found")
-            return None, 0.0
+def _identify_topk_vertex(query: np.ndarray, k: int) -> list:
+    response = _index_endpoint.find_neighbors(
+        deployed_index_id=GCP_DEPLOYED_INDEX_ID,
+        queries=[query.tolist()],
+        num_neighbors=max(20, k * 8)
+    )
+
+    if not response or not response[0]:
+        log.warning("No neighbors found")
+        return []
 
-        for neighbor in response[0]:
-            similarity = 1.0 - neighbor.distance
+    scored = []
+    for neighbor in response[0]:
+        similarity = 1.0 - neighbor.distance
+        with timed("firestore_read"):
             doc = _db.collection(FIRESTORE_COLLECTION).document(neighbor.id).get()
-            if doc.exists:
-                person_name = doc.to_dict().get("person_name")
-                print(f"[OK] Matched '{person_name}' (ID={neighbor.id}, similarity={similarity:.4f})")
-                return person_name, similarity
-            else:
-                print(f"[WARN] Skipping orphaned vector ID={neighbor.id} (no Firestore doc)")
-
-        print("[WARN] No neighbors with valid Firestore documents found")
-        return None, 0.0
+        if doc.exists:
+            person_name = doc.to_dict().get("person_name")
+            log.debug("Matched '%s' (ID=%s, similarity=%.4f)", person_name, neighbor.id, similarity)
+            scored.append((person_name, similarity))
+            if len({name for name, _ in scored}) >= k:
+                break
+        else:
+            ORPHANED_VECTORS.inc()
+            log.warning("Skipping orphaned vector ID=%s (no Firestore doc)", neighbor.id,
+                        extra={"datapoint_id": neighbor.id})
 
-    except Exception as e:
-        print(f"[ERROR] GCP MATCH ERROR: {e}")
-        return None, 0.0
+    if not scored:
+        log.warning("No neighbors with valid Firestore documents found")
+    return aggregate_per_person(scored)[:k]
 
 
 def verify_speaker(embedding: np.ndarray, expected_name: str) -> tuple:
+    """
+    Targeted verification: score the query against the claimed speaker's own
+    sample embeddings and centroid only, without a global nearest-neighbor search.
+    """
     try:
         name_lower = expected_name.lower().strip()
 
-        docs = _db.collection(FIRESTORE_COLLECTION).where("person_name", "==", name_lower).stream()
-        valid_ids = {doc.id for doc in docs}
-
-        if not valid_ids:
-            print(f"[WARN] No registered vectors found for '{name_lower}'")
+        profile = _get_speaker_profile(name_lower)
+        if profile is None:
+            log.warning("No registered vectors found for '%s'", name_lower)
             return 0.0, False
 
-        print(f"[DEBUG] '{name_lower}' has {len(valid_ids)} registered vector(s)")
+        scores = profile @ normalize(embedding).astype(np.float32)
+        best = int(np.argmax(scores))
+        kind = "centroid" if best == len(scores) - 1 else f"sample {best}"
+        log.debug("Best match for '%s': %s of %s, sim=%.4f", name_lower, kind, len(scores) - 1, float(scores[best]))
 
-        query = normalize(embedding)
-        response = _index_endpoint.find_neighbors(
-            deployed_index_id=GCP_DEPLOYED_INDEX_ID,
-            queries=[query.tolist()],
-            num_neighbors=50
-        )
+        return reduce_scores(scores), True
 
-        if not response or not response[0]:
-            print("[WARN] No neighbors found in Vertex AI")
-            return 0.0, True
+    except Exception as e:
+        log.error("VERIFY SPEAKER ERROR: %s", e)
+        return 0.0, False
 
-        best_similarity = 0.0
-        for neighbor in response[0]:
-            if neighbor.id in valid_ids:
-                similarity = 1.0 - neighbor.distance
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    print(f"[OK] Best match for '{name_lower}': ID={neighbor.id}, sim={similarity:.4f}")
 
-        if best_similarity == 0.0:
-            print(f"[WARN] None of the top 50 neighbors belong to '{name_lower}'")
+def _get_speaker_profile(name_lower: str):
+    """
+    Return a (samples + 1, DIM) float32 matrix of the speaker's normalized sample
+    embeddings with the centroid as the last row, or None if not registered.
+    Profiles are cached in an LRU for SPEAKER_PROFILE_TTL seconds and dropped
+    whenever this process (or, with the snapshot listener, any worker) changes
+    the speaker's samples.
+    """
+    profile = _profiles.get(name_lower)
+    if profile is not None:
+        return profile
 
-        return best_similarity, True
+    with timed("firestore_read"):
+        docs = _db.collection(FIRESTORE_COLLECTION) \
+                  .where("person_name", "==", name_lower) \
+                  .select(["embedding", "is_centroid"]) \
+                  .stream()
+        samples = [
+            data["embedding"] for data in (doc.to_dict() for doc in docs)
+            if data and data.get("embedding") and not data.get("is_centroid", False)
+        ]
+    if not samples:
+        return None
+
+    matrix = np.asarray(samples, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    centroid = normalize(matrix.mean(axis=0))
+    profile = np.vstack([matrix, centroid]).astype(np.float32)
+
+    _profiles.set(name_lower, profile)
+    return profile
+
+
+def speaker_models() -> tuple:
+    """(person_names, centroid matrix): one model per speaker, used by AS-norm."""
+    if LOCAL_INDEX_ENABLED and speaker_index.ready:
+        ids, names, matrix = speaker_index.snapshot()
+        rows = [row for row, datapoint_id in enumerate(ids) if datapoint_id.endswith("_centroid")]
+        return [names[row] for row in rows], matrix[rows]
+
+    docs = _db.collection(FIRESTORE_COLLECTION) \
+              .where("is_centroid", "==", True) \
+              .select(["person_name", "embedding_sum"]) \
+              .stream()
+    names, sums = [], []
+    for doc in docs:
+        data = doc.to_dict()
+        # Centroids from before running sums carry no vector until recomputed
+        if data and data.get("embedding_sum"):
+            names.append(data["person_name"].lower())
+            sums.append(data["embedding_sum"])
+    return names, np.asarray(sums, dtype=np.float32).reshape(-1, DIM)
+
+
+def delete_speaker(person_name: str) -> int:
+    """Remove every sample and the centroid of a speaker. Returns the number of samples removed."""
+    try:
+        name_lower = person_name.lower().strip()
+        collection = _db.collection(FIRESTORE_COLLECTION)
+        docs = collection.where("person_name", "==", name_lower).select(["is_centroid"]).stream()
+        ids, samples = [], 0
+        for doc in docs:
+            ids.append(doc.id)
+            if not (doc.to_dict() or {}).get("is_centroid", False):
+                samples += 1
+        if not ids:
+            return 0
+
+        for start in range(0, len(ids), 500):
+            batch = _db.batch()
+            for datapoint_id in ids[start:start + 500]:
+                batch.delete(collection.document(datapoint_id))
+            batch.commit()
+        _index.remove_datapoints(datapoint_ids=ids)
+
+        speaker_index.remove(ids)
+        name_directory.discard(name_lower)
+        _profiles.pop(name_lower)
+        log.info("Deleted speaker '%s' (%s sample(s))", name_lower, samples)
+        return samples
 
     except Exception as e:
-        print(f"[ERROR] VERIFY SPEAKER ERROR: {e}")
-        return 0.0, False
+        log.exception("GCP DELETE ERROR: %s", e)
+        return 0
 
 
 def check_name_exists(name: str) -> tuple:
@@ -210,51 +578,68 @@ def check_name_exists(name: str) -> tuple:
         return False, None
 
     try:
-        all_names = get_all_registered_names()
-        name_lower = name.lower().strip()
-
-        if name_lower in all_names:
-            return True, name_lower
-
-        for registered_name in all_names:
-            if len(name_lower) >= 3 and len(registered_name) >= 3:
-                if name_lower in registered_name or registered_name in name_lower:
-                    return True, registered_name
-            if _is_similar(name_lower, registered_name, max_distance=2):
-                return True, registered_name
-
-        return False, None
+        return name_directory.lookup(name)
 
     except Exception as e:
-        print(f"[ERROR] GCP CHECK NAME ERROR: {e}")
+        log.error("GCP CHECK NAME ERROR: %s", e)
         return False, None
 
 
-def _is_similar(s1: str, s2: str, max_distance: int = 2) -> bool:
-    if abs(len(s1) - len(s2)) > max_distance:
-        return False
-    m, n = len(s1), len(s2)
-    dp = list(range(n + 1))
-    for i in range(1, m + 1):
-        prev = dp[0]
-        dp[0] = i
-        for j in range(1, n + 1):
-            temp = dp[j]
-            dp[j] = prev if s1[i - 1] == s2[j - 1] else 1 + min(prev, dp[j], dp[j - 1])
-            prev = temp
-    return dp[n] <= max_distance
-
-
 def get_all_registered_names() -> list:
     try:
-        docs = _db.collection(FIRESTORE_COLLECTION).stream()
-        names = set()
-        for doc in docs:
-            data = doc.to_dict()
-            if data and "person_name" in data and not data.get("is_centroid", False):
-                names.add(data["person_name"].lower())
-        return list(names)
+        return name_directory.names()
 
     except Exception as e:
-        print(f"[ERROR] GCP GET NAMES ERROR: {e}")
+        log.error("GCP GET NAMES ERROR: %s", e)
         return []
+
+
+@timed("firestore_read")
+def _load_registered_names() -> set:
+    # Only the fields needed here, so the 192-float embeddings are not transferred
+    docs = _db.collection(FIRESTORE_COLLECTION) \
+              .select(["person_name", "is_centroid"]) \
+              .stream()
+    names = set()
+    for doc in docs:
+        data = doc.to_dict()
+        if data and "person_name" in data and not data.get("is_centroid", False):
+            names.add(data["person_name"].lower())
+    return names
+
+
+name_directory = NameDirectory(_load_registered_names)
+
+
+def _on_speakers_snapshot(col_snapshot, changes, read_time) -> None:
+    for change in changes:
+        doc = change.document
+        data = doc.to_dict() or {}
+        name = (data.get("person_name") or "").lower()
+        if change.type.name == "REMOVED":
+            # Other samples may still carry the name; let the next refresh decide
+            name_directory.invalidate()
+            if LOCAL_INDEX_ENABLED:
+                speaker_index.remove([doc.id])
+            _profiles.pop(name)
+            continue
+        if not name:
+            continue
+
+        if data.get("is_centroid", False):
+            vector = data.get("embedding_sum")
+        else:
+            vector = data.get("embedding")
+            if change.type.name == "ADDED":
+                name_directory.add(name)
+        if LOCAL_INDEX_ENABLED and vector:
+            speaker_index.upsert(doc.id, name, normalize(np.asarray(vector, dtype=np.float32)))
+        _profiles.pop(name)
+
+
+# VectorStore backend interface (see app/services/store.py)
+init_store = init_gcp
+add_many   = add_embeddings
+verify     = verify_speaker
+list_names = get_all_registered_names
+delete     = delete_speaker
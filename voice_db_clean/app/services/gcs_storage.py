@@ -1,28 +1,94 @@
 from google.cloud import storage
+from google.api_core.exceptions import PreconditionFailed
 import os
-import uuid
 from dotenv import load_dotenv
 
+from app.utils.lru import LRUCache
+from app.services.metrics import timed
+
 load_dotenv()
 
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
-_client = storage.Client()
-_bucket = _client.bucket(GCS_BUCKET_NAME)
+# HTTP connections kept open to GCS (one per concurrent audit upload worker)
+GCS_POOL_SIZE   = int(os.getenv("GCS_POOL_SIZE", "16"))
+# original — store the uploaded bytes as received
+# flac / opus / wav — store the decoded 16 kHz mono clip, encoded by the audit workers
+AUDIT_ENCODING  = os.getenv("AUDIT_ENCODING", "original").lower()
+_bucket = None
+
+# Object paths this process has already stored, so re-submitted audio skips the upload
+_uploaded = LRUCache(int(os.getenv("GCS_DEDUPE_CACHE", "4096")))
+
 
+def _get_bucket():
+    # Created on first upload so importing the routers does no credential lookup
+    global _bucket
+    if _bucket is None:
+        import requests
+        client = storage.Client()
+        # The default session keeps 10 connections per host; size it to the
+        # upload workers so concurrent uploads reuse warm TLS connections.
+        adapter = requests.adapters.HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+        client._http.mount("https://", adapter)
+        _bucket = client.bucket(GCS_BUCKET_NAME)
+    return _bucket
 
-def upload_audio(audio_bytes: bytes, folder: str, filename: str) -> str:
-    blob = _bucket.blob(f"{folder}/{filename}")
-    blob.upload_from_string(audio_bytes, content_type="audio/wav", timeout=8)
+
+def object_uri(folder: str, filename: str) -> str:
     return f"gs://{GCS_BUCKET_NAME}/{folder}/{filename}"
 
 
-def upload_registration_audio(audio_bytes: bytes, person_name: str) -> str:
-    return upload_audio(audio_bytes, f"registrations/{person_name.lower()}", f"{uuid.uuid4()}.wav")
+def content_filename(key: str, extension: str = "wav") -> str:
+    """Content-addressed object name: identical audio always maps to the same object."""
+    return f"{key}.{extension}"
+
+
+# Leading bytes -> (content type, extension) for uploads stored as received
+_CONTAINERS = (
+    (b"RIFF", "audio/wav", "wav"),
+    (b"fLaC", "audio/flac", "flac"),
+    (b"OggS", "audio/ogg", "ogg"),
+    (b"ID3", "audio/mpeg", "mp3"),
+    (b"\xff\xfb", "audio/mpeg", "mp3"),
+    (b"\xff\xf3", "audio/mpeg", "mp3"),
+    (b"\xff\xf2", "audio/mpeg", "mp3"),
+    (b"\x1aE\xdf\xa3", "audio/webm", "webm"),
+)
+
+
+def sniff_format(audio_bytes: bytes) -> tuple:
+    """(content type, extension) of raw upload bytes, from their container signature."""
+    for magic, content_type, extension in _CONTAINERS:
+        if audio_bytes.startswith(magic):
+            return content_type, extension
+    if audio_bytes[4:8] == b"ftyp":
+        return "audio/mp4", "m4a"
+    return "application/octet-stream", "bin"
+
+
+def registration_folder(person_name: str) -> str:
+    return f"registrations/{person_name.lower()}"
+
 
+def is_uploaded(folder: str, filename: str) -> bool:
+    return bool(_uploaded.get(f"{folder}/{filename}"))
 
-def upload_match_audio(audio_bytes: bytes) -> str:
-    return upload_audio(audio_bytes, "matches", f"{uuid.uuid4()}.wav")
 
+@timed("gcs_upload")
+def upload_audio(audio_bytes: bytes, folder: str, filename: str, content_type: str = "audio/wav",
+                 metadata: dict = None, timeout: float = 8) -> str:
+    """One create-only upload attempt; retries and queueing are up to the caller (audit_sink)."""
+    path = f"{folder}/{filename}"
+    if _uploaded.get(path):
+        return object_uri(folder, filename)
 
-def upload_transaction_audio(audio_bytes: bytes) -> str:
-    return upload_audio(audio_bytes, "transactions", f"{uuid.uuid4()}.wav")
+    blob = _get_bucket().blob(path)
+    if metadata:
+        blob.metadata = {k: str(v) for k, v in metadata.items()}
+    try:
+        # if_generation_match=0: only create, never overwrite, an existing object
+        blob.upload_from_string(audio_bytes, content_type=content_type, timeout=timeout, if_generation_match=0)
+    except PreconditionFailed:
+        pass  # Same content already stored (e.g. by another worker)
+    _uploaded.set(path, True)
+    return object_uri(folder, filename)
@@ -0,0 +1,214 @@
+import hashlib
+import io
+import os
+import time
+import numpy as np
+import soundfile
+from dotenv import load_dotenv
+
+from app.services.audio import DecodedAudio, TARGET_SR
+from app.services.metrics import timed
+
+load_dotenv()
+
+MAX_UPLOAD_BYTES   = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Whole request (register-multi carries three files), checked before the body is read
+MAX_REQUEST_BYTES  = int(os.getenv("MAX_REQUEST_BYTES", str(3 * MAX_UPLOAD_BYTES + 64 * 1024)))
+MAX_AUDIO_SECONDS  = float(os.getenv("MAX_AUDIO_SECONDS", "30"))
+MIN_SPEECH_SECONDS = float(os.getenv("MIN_SPEECH_SECONDS", "0.5"))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Energy VAD: a 30 ms frame is speech when its level is within VAD_RANGE_DB of
+# the loudest frame and above VAD_FLOOR_DB (dBFS). Speech is padded by
+# VAD_PAD_MS on both sides so word onsets/endings are kept.
+VAD_ENABLED  = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_FRAME_MS = 30
+VAD_RANGE_DB = float(os.getenv("VAD_RANGE_DB", "35"))
+VAD_FLOOR_DB = float(os.getenv("VAD_FLOOR_DB", "-55"))
+VAD_PAD_MS   = float(os.getenv("VAD_PAD_MS", "200"))
+
+# Leading bytes of the containers the decoders handle
+_SIGNATURES = (b"RIFF", b"fLaC", b"OggS", b"ID3", b"\x1aE\xdf\xa3", b"\xff\xfb", b"\xff\xf3", b"\xff\xf2")
+
+
+class AudioRejected(Exception):
+    """Raised before any model work when an upload is too large, not audio, or has no speech."""
+
+    def __init__(self, message: str, status_code: int = 422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RequestSizeLimit:
+    """
+    ASGI middleware that answers 413 from the Content-Length header alone, before
+    the multipart body is received and spooled. Bodies sent without a length
+    are still bounded per file by read_upload.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            length = dict(scope["headers"]).get(b"content-length")
+            if length is not None and length.isdigit() and int(length) > self.max_bytes:
+                from fastapi.responses import JSONResponse
+                response = JSONResponse(
+                    status_code=413,
+                    content={"error": "invalid_audio", "message": f"Request exceeds {self.max_bytes} bytes"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def _looks_like_audio(head: bytes) -> bool:
+    return head.startswith(_SIGNATURES) or head[4:8] == b"ftyp"
+
+
+async def read_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple:
+    """
+    Read an UploadFile, rejecting it as soon as it exceeds `max_bytes` or its
+    first bytes are not a known audio container. A declared size over the
+    limit is rejected before reading; the body is always read in
+    UPLOAD_CHUNK_BYTES chunks and hashed as it goes, with the limit enforced
+    on the bytes actually received, so memory never grows past it even when
+    the declared size is missing or wrong. Returns (audio_bytes, content_key).
+    """
+    size = getattr(upload, "size", None)
+    if size is not None and size > max_bytes:
+        raise AudioRejected(f"Upload is {size} bytes (limit {max_bytes})", 413)
+
+    digest = hashlib.sha256()
+    chunks, total = [], 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        if not total and not _looks_like_audio(chunk[:12]):
+            raise AudioRejected("Unsupported or invalid audio format", 415)
+        total += len(chunk)
+        if total > max_bytes:
+            raise AudioRejected(f"Upload exceeds {max_bytes} bytes", 413)
+        digest.update(chunk)
+        chunks.append(chunk)
+
+    if not total:
+        raise AudioRejected("Empty audio upload", 422)
+    return b"".join(chunks), digest.hexdigest()
+
+
+def _decode_capped(audio_bytes: bytes, max_seconds: float) -> tuple:
+    """
+    Decode at most `max_seconds` of audio to 16 kHz mono float32.
+    Returns (samples, source_seconds, reusable_wav_bytes_or_None).
+    """
+    stream = io.BytesIO(audio_bytes)
+    try:
+        info = soundfile.info(stream)
+    except Exception:
+        info = None
+
+    if info is not None:
+        stream.seek(0)
+        limit = int(max_seconds * info.samplerate) if max_seconds else -1
+        audio, sr = soundfile.read(stream, frames=limit, dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1, dtype=np.float32) if audio.shape[1] > 1 else audio[:, 0]
+        if sr != TARGET_SR:
+            import librosa
+            audio = librosa.resample(audio, orig_sr=sr, target_sr=TARGET_SR)
+        complete = limit < 0 or info.frames <= limit
+        reusable = (complete and info.format == "WAV" and info.subtype == "PCM_16"
+                    and info.channels == 1 and sr == TARGET_SR)
+        return np.ascontiguousarray(audio, dtype=np.float32), info.duration, audio_bytes if reusable else None
+
+    # Containers libsndfile cannot read (m4a, webm): librosa/audioread, capped
+    import librosa
+    try:
+        audio, _ = librosa.load(stream, sr=TARGET_SR, mono=True, duration=max_seconds or None)
+    except Exception as e:
+        raise AudioRejected(f"Could not decode audio: {e}", 422)
+    return audio, len(audio) / TARGET_SR, None
+
+
+def frame_levels(samples: np.ndarray, frame: int) -> np.ndarray:
+    """Level in dBFS of each whole `frame`-sample frame."""
+    n_frames = len(samples) // frame
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    return 10.0 * np.log10(np.einsum("ij,ij->i", frames, frames) / frame + 1e-12)
+
+
+def speech_mask(samples: np.ndarray, sr: int = TARGET_SR) -> np.ndarray:
+    """Per-sample boolean mask of the frames the energy VAD keeps."""
+    frame = int(sr * VAD_FRAME_MS / 1000)
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.ones(len(samples), dtype=bool)
+
+    level = frame_levels(samples, frame)
+    threshold = max(VAD_FLOOR_DB, float(level.max()) - VAD_RANGE_DB)
+    voiced = level > threshold
+
+    # Dilate by the padding so onsets/endings and short pauses survive
+    pad = int(round(VAD_PAD_MS / VAD_FRAME_MS))
+    if pad:
+        voiced = np.convolve(voiced.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+
+    mask = np.repeat(voiced, frame)
+    tail = len(samples) - len(mask)
+    if tail:
+        mask = np.concatenate([mask, np.full(tail, voiced[-1])])
+    return mask
+
+
+@timed("decode")
+def decode_speech(audio_bytes: bytes, max_seconds: float = MAX_AUDIO_SECONDS,
+                  vad: bool = VAD_ENABLED) -> DecodedAudio:
+    """
+    Decode an upload (capped at `max_seconds`) and keep only its speech.
+    The returned DecodedAudio carries `stats`: source/decoded/speech seconds,
+    trim_ratio, decode_ms and `complete` (nothing was capped or trimmed, so the
+    samples are the whole upload). Raises AudioRejected when too little speech
+    remains.
+    """
+    start = time.perf_counter()
+    try:
+        samples, source_seconds, wav_bytes = _decode_capped(audio_bytes, max_seconds)
+    except AudioRejected:
+        raise
+    except Exception as e:
+        raise AudioRejected(f"Could not decode audio: {e}", 422)
+
+    decoded_seconds = len(samples) / TARGET_SR
+    complete = not max_seconds or source_seconds < max_seconds
+    if vad and len(samples):
+        mask = speech_mask(samples)
+        if not mask.all():
+            samples = np.ascontiguousarray(samples[mask])
+            wav_bytes = None
+            complete = False
+    speech_seconds = len(samples) / TARGET_SR
+
+    if speech_seconds < MIN_SPEECH_SECONDS:
+        raise AudioRejected(f"Only {speech_seconds:.2f}s of speech detected (minimum {MIN_SPEECH_SECONDS}s)", 422)
+
+    audio = DecodedAudio(samples, wav_bytes=wav_bytes)
+    audio.stats = {
+        "source_s": round(source_seconds, 3),
+        "decoded_s": round(decoded_seconds, 3),
+        "speech_s": round(speech_seconds, 3),
+        "trim_ratio": round(1.0 - speech_seconds / decoded_seconds, 4) if decoded_seconds else 0.0,
+        "decode_ms": round((time.perf_counter() - start) * 1000.0, 2),
+        "complete": complete,
+    }
+    return audio
+
+
+def decode_full(audio_bytes: bytes) -> DecodedAudio:
+    """The whole upload at 16 kHz mono: no duration cap and no VAD trimming (audit copies)."""
+    samples, source_seconds, wav_bytes = _decode_capped(audio_bytes, 0)
+    audio = DecodedAudio(samples, wav_bytes=wav_bytes)
+    audio.stats = {"source_s": round(source_seconds, 3), "complete": True}
+    return audio
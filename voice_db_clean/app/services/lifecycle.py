@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# Load the encoder and run a dummy inference before reporting ready
+WARMUP_ENABLED      = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Whether /readyz also waits for the vector store (false: serve in degraded mode)
+READY_REQUIRE_STORE = os.getenv("READY_REQUIRE_STORE", "true").lower() == "true"
+
+checks  = {"model": False, "store": False}
+errors  = {}
+timings = {}            # seconds, reported by /readyz
+_tasks  = set()
+
+
+def record(name: str, seconds: float) -> None:
+    timings[name] = round(seconds, 3)
+
+
+def is_ready() -> bool:
+    return checks["model"] and (checks["store"] or not READY_REQUIRE_STORE)
+
+
+def report() -> dict:
+    return {"ready": is_ready(), "checks": dict(checks), "errors": dict(errors), "timings_s": dict(timings)}
+
+
+async def _init_store() -> None:
+    from app.services.store import init_store
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(init_store)
+        checks["store"] = True
+    except Exception as e:
+        errors["store"] = str(e)
+        log.warning("Vector store initialization failed: %s", e)
+        log.warning("Server started in degraded mode — vector store endpoints will not work.")
+    record("store_init", time.perf_counter() - start)
+
+
+async def _warm_model() -> None:
+    if not WARMUP_ENABLED:
+        # The encoder loads on the first request instead
+        checks["model"] = True
+        return
+    from app.services.embedding import warm_up
+    try:
+        for name, seconds in (await asyncio.to_thread(warm_up)).items():
+            record(name, seconds)
+        checks["model"] = True
+    except Exception as e:
+        errors["model"] = str(e)
+        log.error("Speaker encoder warm-up failed: %s", e)
+
+
+async def _prepare() -> None:
+    start = time.perf_counter()
+    # Store (network) and model (CPU) initialization overlap
+    await asyncio.gather(_init_store(), _warm_model())
+    record("startup", time.perf_counter() - start)
+    if is_ready():
+        log.info("Ready after %.2fs", timings['startup'])
+
+
+def begin() -> None:
+    """Start initialization in the background so /healthz answers immediately."""
+    task = asyncio.get_running_loop().create_task(_prepare())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+NAME_DIRECTORY_TTL = float(os.getenv("NAME_DIRECTORY_TTL", "300"))
+MAX_DISTANCE       = 2
+MIN_SUBSTRING_LEN  = 3
+
+
+class NameDirectory:
+    """
+    In-memory set of registered speaker names with indexes for fuzzy lookup.
+
+    - Edit distance ≤ MAX_DISTANCE: a symmetric deletion index (every string
+      reachable by deleting up to MAX_DISTANCE characters → names), so a query
+      only generates its own deletions and verifies the few hits with a banded
+      Levenshtein. Cost depends on the query length, not the directory size.
+    - Substring matches: a trigram index for "query inside a registered name"
+      and direct set probes of the query's substrings for the reverse case.
+
+    The set is loaded through `loader`, refreshed in the background once older
+    than `ttl` seconds, and updated incrementally through `add`.
+    """
+
+    def __init__(self, loader, ttl: float = NAME_DIRECTORY_TTL, max_distance: int = MAX_DISTANCE):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._loaded_at = None
+        self._names = set()
+        self._deletes = {}
+        self._trigrams = {}
+
+    # ---- maintenance -------------------------------------------------------
+
+    def refresh(self) -> None:
+        names = {n.lower() for n in self._loader() if n}
+        deletes, trigrams = {}, {}
+        for name in names:
+            self._index(name, deletes, trigrams)
+        with self._lock:
+            self._names, self._deletes, self._trigrams = names, deletes, trigrams
+            self._loaded_at = time.monotonic()
+        log.info("Name directory loaded: %s name(s)", len(names))
+
+    def add(self, name: str) -> None:
+        name = name.lower().strip()
+        if not name:
+            return
+        with self._lock:
+            if name in self._names:
+                return
+            self._names.add(name)
+            self._index(name, self._deletes, self._trigrams)
+
+    def discard(self, name: str) -> None:
+        name = name.lower().strip()
+        with self._lock:
+            if name not in self._names:
+                return
+            self._names.discard(name)
+            for variant in _deletions(name, self.max_distance):
+                bucket = self._deletes.get(variant)
+                if bucket is not None:
+                    bucket.discard(name)
+                    if not bucket:
+                        del self._deletes[variant]
+            for gram in _trigrams(name):
+                bucket = self._trigrams.get(gram)
+                if bucket is not None:
+                    bucket.discard(name)
+                    if not bucket:
+                        del self._trigrams[gram]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def _index(self, name: str, deletes: dict, trigrams: dict) -> None:
+        for variant in _deletions(name, self.max_distance):
+            deletes.setdefault(variant, set()).add(name)
+        for gram in _trigrams(name):
+            trigrams.setdefault(gram, set()).add(name)
+
+    def _ensure_fresh(self) -> None:
+        if self._loaded_at is None:
+            self.refresh()
+            return
+        if time.monotonic() - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        # Serve the current snapshot while a new one loads
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            log.warning("Name directory refresh failed: %s", e)
+        finally:
+            self._refreshing = False
+
+    # ---- queries -----------------------------------------------------------
+
+    def names(self) -> list:
+        self._ensure_fresh()
+        return list(self._names)
+
+    def lookup(self, name: str) -> tuple:
+        """Return (True, registered_name) for an exact or fuzzy match, else (False, None)."""
+        self._ensure_fresh()
+        query = name.lower().strip()
+
+        with self._lock:
+            if query in self._names:
+                return True, query
+
+            best = None
+            for variant in _deletions(query, self.max_distance):
+                for candidate in self._deletes.get(variant, ()):
+                    d = _bounded_distance(query, candidate, self.max_distance)
+                    if d is not None and (best is None or (d, candidate) < best):
+                        best = (d, candidate)
+            if best is not None:
+                return True, best[1]
+
+            if len(query) >= MIN_SUBSTRING_LEN:
+                # Registered name contained in the query
+                for length in range(len(query) - 1, MIN_SUBSTRING_LEN - 1, -1):
+                    for start in range(len(query) - length + 1):
+                        piece = query[start:start + length]
+                        if piece in self._names:
+                            return True, piece
+
+                # Query contained in a registered name: only names sharing the
+                # query's rarest trigram can qualify
+                rarest = min(
+                    (self._trigrams.get(g, ()) for g in _trigrams(query)), key=len
+                )
+                matches = [c for c in rarest if query in c]
+                if matches:
+                    return True, min(matches, key=lambda c: (len(c), c))
+
+        return False, None
+
+
+def _deletions(word: str, max_distance: int) -> set:
+    result = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+def _trigrams(word: str) -> set:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def _bounded_distance(s1: str, s2: str, max_distance: int):
+    """Levenshtein distance restricted to a diagonal band; None if > max_distance."""
+    m, n = len(s1), len(s2)
+    if abs(m - n) > max_distance:
+        return None
+    big = max_distance + 1
+    prev = [j if j <= max_distance else big for j in range(n + 1)]
+    for i in range(1, m + 1):
+        cur = [big] * (n + 1)
+        if i <= max_distance:
+            cur[0] = i
+        lo = max(1, i - max_distance)
+        hi = min(n, i + max_distance)
+        row_min = cur[0]
+        for j in range(lo, hi + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            cur[j] = min(prev[j - 1] + cost, prev[j] + 1, cur[j - 1] + 1, big)
+            row_min = min(row_min, cur[j])
+        if row_min > max_distance:
+            return None
+        prev = cur
+    return prev[n] if prev[n] <= max_distance else None
@@ -1,72 +1,213 @@
+import logging
 import os
 import re
 import json
+import threading
+import time
+import unicodedata
 from dotenv import load_dotenv
 
+from app.services.transaction_parser import parse_transaction
+from app.services.metrics import CACHE_LOOKUPS, NLP_RESULTS, timed
+from app.utils.lru import LRUCache
+from app.utils.singleflight import SingleFlight
+
 load_dotenv()
 
-from google import genai
+log = logging.getLogger(__name__)
+
+# Transcripts the deterministic parser explains with at least this confidence
+# skip the Gemini call entirely
+PARSER_ENABLED        = os.getenv("NLP_PARSER_ENABLED", "true").lower() == "true"
+PARSER_MIN_CONFIDENCE = float(os.getenv("NLP_PARSER_MIN_CONFIDENCE", "0.8"))
+
+# Gemini results keyed by the normalized transcript (0 disables the cache)
+NLP_CACHE_SIZE         = int(os.getenv("NLP_CACHE_SIZE", "2048"))
+NLP_CACHE_TTL          = float(os.getenv("NLP_CACHE_TTL", "3600"))        # seconds, 0 = no expiry
+# Concurrent Gemini calls per process; further callers wait within their budget
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+# Seconds one transcript may spend queued for and inside the Gemini call
+# before the rule-based fallback answers instead
+GEMINI_TIMEOUT         = float(os.getenv("GEMINI_TIMEOUT", "5"))
+
+GEMINI_MODEL = "gemini-2.5-flash"
 
 _client = None
+_results = LRUCache(max(NLP_CACHE_SIZE, 1), ttl=NLP_CACHE_TTL or None)
+_flights = SingleFlight()
+_gemini_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+
+_metrics = {
+    "parser": 0, "cache_hits": 0, "coalesced": 0, "gemini_calls": 0,
+    "gemini_errors": 0, "budget_exceeded": 0, "gemini_ms": 0.0, "saved_ms": 0.0,
+}
+_metrics_lock = threading.Lock()
+
+_by_source = {s: NLP_RESULTS.labels(source=s) for s in ("parser", "cache", "gemini", "fallback")}
+_cache_hit  = CACHE_LOOKUPS.labels(cache="nlp", result="hit")
+_cache_miss = CACHE_LOOKUPS.labels(cache="nlp", result="miss")
+
+
+def _count(name: str, value: float = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] += value
+
+
+def stats() -> dict:
+    """Path counts, cache hit rate and the Gemini latency the cache and coalescing saved."""
+    with _metrics_lock:
+        m = dict(_metrics)
+    shared = m["cache_hits"] + m["coalesced"]
+    lookups = shared + m["gemini_calls"] + m["gemini_errors"] + m["budget_exceeded"]
+    return {
+        **m,
+        "gemini_ms": round(m["gemini_ms"], 1),
+        "saved_ms": round(m["saved_ms"], 1),
+        "hit_rate": shared / lookups if lookups else 0.0,
+        "avg_gemini_ms": round(m["gemini_ms"] / m["gemini_calls"], 1) if m["gemini_calls"] else 0.0,
+        "cache_size": len(_results),
+        "in_flight": len(_flights),
+    }
 
 
 def _get_client():
     global _client
     if _client is None:
+        from google import genai
+        from google.genai import types
         _client = genai.Client(
             vertexai=True,
             project=os.getenv("GCP_PROJECT_ID"),
             location=os.getenv("GCP_REGION", "us-central1"),
+            http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000)),
         )
     return _client
 
 
-def extract_transaction_info(text: str):
-    """
-    Use Gemini 2.5 Flash via Vertex AI to extract sender, receiver, and amount
-    from a transaction sentence.
-    """
-    if not text or not text.strip():
-        return {"sender": None, "amount": None, "receiver": None}
+def normalize_transcript(text: str) -> str:
+    """Cache key: case, whitespace and sentence punctuation do not change the extraction."""
+    text = unicodedata.normalize("NFC", text).lower()
+    return " ".join(re.sub(r"[!?;:\"'()\[\]]|[.,](?!\d)", " ", text).split())
+
+
+def _ask_gemini(text: str, deadline: float) -> dict:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or not _gemini_slots.acquire(timeout=remaining):
+        raise TimeoutError(f"no Gemini slot within {GEMINI_TIMEOUT}s")
+    try:
+        from google.genai import types
 
-    prompt = f"""Extract the sender name, receiver name, and amount from this transaction sentence.
+        prompt = f"""Extract the sender name, receiver name, and amount from this transaction sentence.
 Return ONLY a JSON object with keys "sender", "receiver", "amount".
 Use null if a value is not mentioned.
-Amount must be a number (integer), not a string.
+Amount must be a number, not a string; keep paise as a decimal (99.50 -> 99.5).
 
 Sentence: "{text}"
 
 JSON:"""
 
-    try:
-        client = _get_client()
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
+        # Whatever is left of the budget after queueing bounds the HTTP call
+        timeout_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+        response = _get_client().models.generate_content(
+            model=GEMINI_MODEL,
             contents=prompt,
+            config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=timeout_ms)),
         )
-        raw = response.text.strip()
+    finally:
+        _gemini_slots.release()
+
+    raw = response.text.strip()
+    raw = re.sub(r"^```(?:json)?\s*", "", raw)
+    raw = re.sub(r"\s*```$", "", raw)
+
+    data = json.loads(raw)
+    sender   = data.get("sender")
+    receiver = data.get("receiver")
+    amount   = data.get("amount")
+
+    if isinstance(sender, str):
+        sender = sender.lower().strip() or None
+    if isinstance(receiver, str):
+        receiver = receiver.lower().strip() or None
+    if isinstance(amount, str):
+        match = re.search(r"\d[\d,]*(?:\.\d+)?", amount)
+        amount = float(match.group().replace(",", "")) if match else None
+    if isinstance(amount, float) and amount.is_integer():
+        amount = int(amount)
+
+    return {"sender": sender, "amount": amount, "receiver": receiver}
 
-        raw = re.sub(r"^```(?:json)?\s*", "", raw)
-        raw = re.sub(r"\s*```$", "", raw)
 
-        data = json.loads(raw)
-        sender   = data.get("sender")
-        receiver = data.get("receiver")
-        amount   = data.get("amount")
+def _fetch(text: str, key: str, deadline: float) -> tuple:
+    """One Gemini call for `key`; the result is cached before concurrent waiters are released."""
+    start = time.perf_counter()
+    info = _ask_gemini(text, deadline)
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    if NLP_CACHE_SIZE:
+        _results.set(key, (info, elapsed_ms))
+    return info, elapsed_ms
 
-        if isinstance(sender, str):
-            sender = sender.lower().strip() or None
-        if isinstance(receiver, str):
-            receiver = receiver.lower().strip() or None
-        if isinstance(amount, str):
-            amount = int(re.sub(r"\D", "", amount)) if re.search(r"\d", amount) else None
 
-        print(f"[OK] Gemini NLP: sender={sender}, receiver={receiver}, amount={amount}")
-        return {"sender": sender, "amount": amount, "receiver": receiver}
+@timed("nlp")
+def extract_transaction_info(text: str):
+    """
+    Extract sender, receiver, and amount from a transaction sentence.
+    Common shapes are handled by the rule-based transaction_parser; Gemini 2.5
+    Flash via Vertex AI is only called when the parser's confidence is below
+    NLP_PARSER_MIN_CONFIDENCE. Gemini results are cached by normalized
+    transcript, and concurrent identical transcripts share one in-flight call.
+    `source` says which path produced the result ("parser", "cache", "gemini"
+    or "fallback") and `confidence` is the parser's score.
+    """
+    result = _extract(text)
+    _by_source[result["source"]].inc()
+    return result
+
 
+def _extract(text: str) -> dict:
+    if not text or not text.strip():
+        return {"sender": None, "amount": None, "receiver": None, "source": "parser", "confidence": 0.0}
+
+    parsed = parse_transaction(text)
+    confidence = parsed["confidence"]
+    if PARSER_ENABLED and confidence >= PARSER_MIN_CONFIDENCE:
+        _count("parser")
+        log.debug("Parser NLP (%.2f): sender=%s, receiver=%s, amount=%s",
+                  confidence, parsed["sender"], parsed["receiver"], parsed["amount"])
+        return {"sender": parsed["sender"], "amount": parsed["amount"], "receiver": parsed["receiver"],
+                "source": "parser", "confidence": confidence}
+
+    key = normalize_transcript(text)
+    cached = _results.get(key) if NLP_CACHE_SIZE else None
+    (_cache_miss if cached is None else _cache_hit).inc()
+    if cached is not None:
+        info, elapsed_ms = cached
+        _count("cache_hits")
+        _count("saved_ms", elapsed_ms)
+        return {**info, "source": "cache", "confidence": confidence}
+
+    deadline = time.monotonic() + GEMINI_TIMEOUT
+    try:
+        (info, elapsed_ms), shared = _flights.do(
+            key, lambda: _fetch(text, key, deadline), timeout=max(deadline - time.monotonic(), 0.0)
+        )
+    except TimeoutError as e:
+        _count("budget_exceeded")
+        log.warning("Gemini NLP over budget: %s — falling back to rule-based", e)
+        return {**_rule_based_fallback(text), "source": "fallback", "confidence": confidence}
     except Exception as e:
-        print(f"[ERROR] Gemini NLP failed: {e} — falling back to rule-based")
-        return _rule_based_fallback(text)
+        _count("gemini_errors")
+        log.error("Gemini NLP failed: %s — falling back to rule-based", e)
+        return {**_rule_based_fallback(text), "source": "fallback", "confidence": confidence}
+
+    if shared:
+        _count("coalesced")
+        _count("saved_ms", elapsed_ms)
+    else:
+        _count("gemini_calls")
+        _count("gemini_ms", elapsed_ms)
+    log.debug("Gemini NLP: sender=%s, receiver=%s, amount=%s", info['sender'], info['receiver'], info['amount'])
+    return {**info, "source": "gemini", "confidence": confidence}
 
 
 def _rule_based_fallback(text: str):
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+# before they finish.
+_background_tasks = set()
+
+
+class Pipeline:
+    """
+    Minimal async DAG executor for a single request.
+
+    Each node is an async callable that receives its dependencies' results as
+    keyword arguments. Nodes start as soon as their dependencies finish, so
+    independent branches overlap. Background nodes are started but not awaited
+    by `run`; their outcome is only logged.
+    """
+
+    def __init__(self):
+        self._nodes = {}
+        self.timings = {}
+
+    def add(self, name: str, fn, deps: tuple = (), background: bool = False) -> None:
+        if name in self._nodes:
+            raise ValueError(f"Duplicate pipeline node '{name}'")
+        for dep in deps:
+            if dep not in self._nodes:
+                raise ValueError(f"Node '{name}' depends on unknown node '{dep}'")
+        self._nodes[name] = (fn, tuple(deps), background)
+
+    async def _run_node(self, name: str, tasks: dict):
+        fn, deps, _ = self._nodes[name]
+        inputs = {dep: await tasks[dep] for dep in deps}
+        start = time.perf_counter()
+        try:
+            return await fn(**inputs)
+        finally:
+            self.timings[name] = round((time.perf_counter() - start) * 1000.0, 1)
+
+    async def run(self) -> dict:
+        start = time.perf_counter()
+        tasks = {}
+        # Nodes can only depend on nodes added before them, so insertion order
+        # is already a valid topological order.
+        for name, (_, _, background) in self._nodes.items():
+            task = asyncio.ensure_future(self._run_node(name, tasks))
+            tasks[name] = task
+            if background:
+                _background_tasks.add(task)
+                task.add_done_callback(_finish_background(name))
+
+        foreground = {n: t for n, t in tasks.items() if not self._nodes[n][2]}
+        try:
+            results = await asyncio.gather(*foreground.values())
+        except Exception:
+            for task in foreground.values():
+                task.cancel()
+            raise
+        finally:
+            self.timings["total"] = round((time.perf_counter() - start) * 1000.0, 1)
+        return dict(zip(foreground.keys(), results))
+
+    def server_timing(self) -> str:
+        """Render recorded timings as a `Server-Timing` header value."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.timings.items())
+
+
+def _finish_background(name: str):
+    def callback(task: asyncio.Task) -> None:
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("Background stage '%s' failed (non-fatal): %s", name, task.exception())
+    return callback
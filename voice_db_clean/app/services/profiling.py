@@ -0,0 +1,307 @@
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# Shared secret that switches profiling on. Unset: no middleware, no admin
+# routes, and the hooks below reduce to one boolean check.
+PROFILE_TOKEN       = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR         = os.getenv("PROFILE_DIR", "data/profiles")
+# Captures kept on disk; older ones are deleted
+PROFILE_KEEP        = int(os.getenv("PROFILE_KEEP", "50"))
+# Stack samples per second taken by an admin-started profiling window
+PROFILE_SAMPLE_HZ   = float(os.getenv("PROFILE_SAMPLE_HZ", "100"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+# Also record torch.profiler traces of encoder calls during a capture
+PROFILE_TORCH       = os.getenv("PROFILE_TORCH", "true").lower() == "true"
+
+enabled = bool(PROFILE_TOKEN)
+# Read by the embedding batcher on every encoder call; True only while a capture is running
+torch_active = False
+
+_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-(request|window)-[0-9a-f]{6}$")
+
+_current = ContextVar("profile_session", default=None)
+_lock = threading.Lock()
+_active = set()
+_window = None
+_loop_profiler_busy = False
+
+
+def authorized(token: str) -> bool:
+    return enabled and bool(token) and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+class Session:
+    """
+    One capture, stored under PROFILE_DIR/<id>/:
+
+        cprofile.pstats   merged cProfile stats (load with pstats / snakeviz)
+        cprofile.txt      top functions by cumulative and by own time
+        stacks.txt        collapsed stacks from the sampler (flamegraph.pl / speedscope)
+        torch-NNN.json    torch.profiler Chrome traces of encoder calls (chrome://tracing)
+        torch.txt         torch operator summaries of the same calls
+        meta.json         what was captured, when, and for how long
+    """
+
+    def __init__(self, kind: str, label: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{uuid.uuid4().hex[:6]}"
+        self.kind = kind
+        self.label = label
+        self.dir = os.path.join(PROFILE_DIR, self.id)
+        self.started = time.time()
+        self.torch_traces = 0
+        self._stats = None
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+        self._write_meta(status="running")
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def add_profile(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profiler)
+            else:
+                self._stats.add(profiler)
+
+    def add_torch(self, prof) -> None:
+        with self._lock:
+            n = self.torch_traces
+            self.torch_traces += 1
+        prof.export_chrome_trace(self.path(f"torch-{n:03d}.json"))
+        table = prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=25)
+        with self._lock, open(self.path("torch.txt"), "a") as f:
+            f.write(f"# encoder call {n}\n{table}\n\n")
+
+    def _write_meta(self, **extra) -> None:
+        meta = {"id": self.id, "kind": self.kind, "label": self.label, "started": self.started,
+                "torch_traces": self.torch_traces, **extra}
+        with open(self.path("meta.json.tmp"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(self.path("meta.json.tmp"), self.path("meta.json"))
+
+    def finish(self, **extra) -> None:
+        """Write the artifacts; run off the event loop."""
+        with self._lock:
+            stats = self._stats
+        if stats is not None:
+            stats.dump_stats(self.path("cprofile.pstats"))
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(40)
+            stats.sort_stats("tottime").print_stats(25)
+            with open(self.path("cprofile.txt"), "w") as f:
+                f.write(out.getvalue())
+        self._write_meta(**{"status": "complete", "seconds": round(time.time() - self.started, 3), **extra})
+        _prune()
+
+
+def _activate(session: Session) -> None:
+    global torch_active
+    with _lock:
+        _active.add(session)
+        torch_active = PROFILE_TORCH
+
+
+def _deactivate(session: Session) -> None:
+    global torch_active
+    with _lock:
+        _active.discard(session)
+        torch_active = PROFILE_TORCH and bool(_active)
+
+
+# ---- Per-request capture (X-Profile header / ?profile= query flag) ---------------------
+
+def begin_request(label: str) -> tuple:
+    """
+    Start profiling the current request: stage calls on the worker pools are
+    profiled on their threads (see `wrap`), and the event-loop thread is
+    profiled too when no other request holds it. Returns (session, state) for
+    `end_request`.
+    """
+    global _loop_profiler_busy
+    session = Session("request", label)
+    token = _current.set(session)
+    _activate(session)
+
+    loop_profiler = None
+    with _lock:
+        if not _loop_profiler_busy:
+            _loop_profiler_busy = True
+            loop_profiler = cProfile.Profile()
+    if loop_profiler is not None:
+        loop_profiler.enable()
+    return session, (token, loop_profiler)
+
+
+def end_request(session: Session, state: tuple) -> None:
+    global _loop_profiler_busy
+    token, loop_profiler = state
+    if loop_profiler is not None:
+        loop_profiler.disable()
+        session.add_profile(loop_profiler)
+        with _lock:
+            _loop_profiler_busy = False
+    _current.reset(token)
+    _deactivate(session)
+
+
+def wrap(call):
+    """`call`, profiled on whichever thread runs it if the calling request is being profiled."""
+    session = _current.get()
+    if session is None:
+        return call
+
+    def profiled():
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return call()
+        finally:
+            profiler.disable()
+            session.add_profile(profiler)
+    return profiled
+
+
+def run_encoder(fn, *args):
+    """
+    Run one encoder call under torch.profiler and attach the trace to every
+    running capture. A micro-batch can serve several requests, so a profiled
+    request may also see the other clips its batch carried.
+    """
+    with _lock:
+        sessions = list(_active)
+    if not sessions:
+        return fn(*args)
+
+    import torch
+    from torch.profiler import profile, ProfilerActivity
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    with profile(activities=activities, record_shapes=True) as prof:
+        result = fn(*args)
+    for session in sessions:
+        try:
+            session.add_torch(prof)
+        except Exception as e:
+            log.warning("Writing torch trace for profile %s failed: %s", session.id, e)
+    return result
+
+
+# ---- Admin-started window: whole-process stack sampling for N seconds ------------------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _sample(session: Session, seconds: float, hz: float) -> None:
+    global _window
+    me = threading.get_ident()
+    interval = 1.0 / hz
+    deadline = time.monotonic() + seconds
+    stacks, samples = Counter(), 0
+    try:
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        with open(session.path("stacks.txt"), "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+    except Exception as e:
+        log.error("Profiling window %s failed: %s", session.id, e)
+    finally:
+        _deactivate(session)
+        session.finish(samples=samples, sample_hz=hz)
+        with _lock:
+            _window = None
+        log.info("Profiling window %s finished: %s sample(s)", session.id, samples)
+
+
+def start_window(seconds: float, hz: float = PROFILE_SAMPLE_HZ) -> Session:
+    """Sample every thread's stack at `hz` for `seconds` (and trace encoder calls); raises if one is running."""
+    global _window
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    with _lock:
+        if _window is not None:
+            raise RuntimeError(f"Profiling window {_window.id} is still running")
+        _window = Session("window", f"{seconds:g}s at {hz:g} Hz")
+    session = _window
+    _activate(session)
+    threading.Thread(target=_sample, args=(session, seconds, hz), name="profile-sampler", daemon=True).start()
+    log.info("Profiling window %s started for %.1fs", session.id, seconds)
+    return session
+
+
+# ---- Stored captures -----------------------------------------------------------------
+
+def list_profiles() -> list:
+    try:
+        ids = sorted((n for n in os.listdir(PROFILE_DIR) if _ID.match(n)), reverse=True)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for profile_id in ids:
+        try:
+            with open(os.path.join(PROFILE_DIR, profile_id, "meta.json")) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def archive(profile_id: str):
+    """A zip of one capture's artifacts, or None if there is no such capture."""
+    if not _ID.match(profile_id):
+        return None
+    directory = os.path.join(PROFILE_DIR, profile_id)
+    if not os.path.isdir(directory):
+        return None
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".tmp"):
+                zf.write(os.path.join(directory, name), f"{profile_id}/{name}")
+    return out.getvalue()
+
+
+def _prune() -> None:
+    with _lock:
+        running = {s.id for s in _active}
+    try:
+        ids = sorted((n for n in os.listdir(PROFILE_DIR) if _ID.match(n)), reverse=True)
+    except FileNotFoundError:
+        return
+    for profile_id in [i for i in ids if i not in running][PROFILE_KEEP:]:
+        shutil.rmtree(os.path.join(PROFILE_DIR, profile_id), ignore_errors=True)
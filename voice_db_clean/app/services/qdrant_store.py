@@ -1,33 +1,52 @@
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client.models import (
+    VectorParams, Distance, PointStruct, Filter, FieldCondition, MatchValue, FilterSelector
+)
+import logging
 import uuid
 import os
 import numpy as np
 from dotenv import load_dotenv
+
+from app.services.name_directory import NameDirectory
+from app.services.scoring import aggregate_per_person, reduce_scores
+
 DIM = 192
 COLLECTION = "voice_embeddings"
+SCROLL_PAGE = 1000
 
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
-# Try cloud first, fall back to local in-memory mode
-try:
-    client = QdrantClient(
-        url=QDRANT_URL,
-        api_key=QDRANT_API_KEY
-    )
-    # Quick connectivity check
-    client.get_collections()
-    print("[OK] Connected to Qdrant Cloud")
-except Exception as e:
-    print(f"[WARN] Qdrant Cloud unavailable ({e}), using local in-memory mode")
-    client = QdrantClient(":memory:")
+_client = None
+
+
+def get_client() -> QdrantClient:
+    """Connect on first use (not at import): try cloud first, fall back to local in-memory mode."""
+    global _client
+    if _client is None:
+        try:
+            client = QdrantClient(
+                url=QDRANT_URL,
+                api_key=QDRANT_API_KEY
+            )
+            # Quick connectivity check
+            client.get_collections()
+            log.info("Connected to Qdrant Cloud")
+        except Exception as e:
+            log.warning("Qdrant Cloud unavailable (%s), using local in-memory mode", e)
+            client = QdrantClient(":memory:")
+        _client = client
+    return _client
 
 
 def init_collection():
+    client = get_client()
     if not client.collection_exists(COLLECTION):
         client.create_collection(
             collection_name=COLLECTION,
@@ -37,27 +56,46 @@ def init_collection():
             )
         )
 
+
+def init_store():
+    init_collection()
+    name_directory.refresh()
+
+
+def _name_filter(person_name):
+    return Filter(must=[FieldCondition(key="person_name", match=MatchValue(value=person_name))])
+
+
 def add_embedding(embedding, person_name):
+    add_many([embedding], person_name)
+
+
+def add_many(embeddings, person_name):
     try:
-        vector = normalize(embedding)
+        name_lower = person_name.lower()
+        ids = [str(uuid.uuid4()) for _ in embeddings]
 
-        client.upsert(
+        get_client().upsert(
             collection_name=COLLECTION,
             points=[
                 PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vector.tolist(),
-                    payload={"person_name": person_name.lower()}
+                    id=point_id,
+                    vector=normalize(embedding).tolist(),
+                    payload={"person_name": name_lower}
                 )
+                for point_id, embedding in zip(ids, embeddings)
             ]
         )
+        name_directory.add(name_lower)
+        return ids
 
     except Exception as e:
-        print("[ERROR] QDRANT REGISTER ERROR:", e)
-
+        log.error("QDRANT REGISTER ERROR: %s", e)
+        return []
 
 
 def normalize(vec):
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
     norm = np.linalg.norm(vec)
     if norm == 0:
         return vec
@@ -65,42 +103,89 @@ def normalize(vec):
 
 
 def identify_speaker(embedding):
+    ranked = identify_topk(embedding, 1)
+    return ranked[0] if ranked else (None, 0.0)
+
+
+def identify_topk(embedding, k=5):
     try:
         query = normalize(embedding)
 
-        response = client.query_points(
+        response = get_client().query_points(
             collection_name=COLLECTION,
             query=query.tolist(),
-            limit=1
+            limit=k * 8
         )
 
         # SAFETY CHECKS
-        if response is None:
-            print("[WARN] Qdrant response is None")
-            return None, 0.0
+        if response is None or not hasattr(response, "points"):
+            log.warning("Qdrant response has no points: %s", response)
+            return []
+
+        ranked = aggregate_per_person(
+            (point.payload.get("person_name"), float(point.score or 0.0))
+            for point in response.points if point.payload is not None
+        )
 
-        if not hasattr(response, "points"):
-            print("[WARN] No 'points' in response:", response)
-            return None, 0.0
+        if not ranked:
+            log.warning("No matching points found")
+        return ranked[:k]
 
-        if len(response.points) == 0:
-            print("[WARN] No matching points found")
-            return None, 0.0
+    except Exception as e:
+        log.error("QDRANT MATCH ERROR: %s", e)
+        return []
 
-        top = response.points[0]
 
-        if top.payload is None:
-            print("[WARN] Payload missing")
-            return None, float(top.score or 0.0)
+def verify(embedding, person_name):
+    try:
+        name_lower = person_name.lower().strip()
+        vectors = []
+        offset = None
+        while True:
+            points, offset = get_client().scroll(
+                collection_name=COLLECTION,
+                scroll_filter=_name_filter(name_lower),
+                limit=SCROLL_PAGE,
+                offset=offset,
+                with_payload=False,
+                with_vectors=True
+            )
+            vectors.extend(point.vector for point in points)
+            if offset is None:
+                break
 
-        name = top.payload.get("person_name")
-        score = float(top.score or 0.0)
+        if not vectors:
+            log.warning("No registered vectors found for '%s'", name_lower)
+            return 0.0, False
 
-        return name, score
+        stored = np.asarray(vectors, dtype=np.float32)
+        return reduce_scores(stored @ normalize(embedding)), True
 
     except Exception as e:
-        print("[ERROR] QDRANT MATCH ERROR:", e)
-        return None, 0.0
+        log.error("QDRANT VERIFY ERROR: %s", e)
+        return 0.0, False
+
+
+def verify_speaker(embedding, person_name):
+    return verify(embedding, person_name)
+
+
+def delete(person_name):
+    try:
+        name_lower = person_name.lower().strip()
+        removed = get_client().count(
+            collection_name=COLLECTION, count_filter=_name_filter(name_lower), exact=True
+        ).count
+        get_client().delete(
+            collection_name=COLLECTION,
+            points_selector=FilterSelector(filter=_name_filter(name_lower))
+        )
+        name_directory.discard(name_lower)
+        return removed
+
+    except Exception as e:
+        log.error("QDRANT DELETE ERROR: %s", e)
+        return 0
 
 
 def check_name_exists(name: str) -> tuple:
@@ -109,79 +194,73 @@ def check_name_exists(name: str) -> tuple:
     Returns (True, matched_name) if found, (False, None) otherwise.
     Handles spelling variations like "sumant" matching "sumanth".
     """
-    if not name:
+    if not name or len(name.strip()) < 2:
         return False, None
 
     try:
-        # Get all registered names
-        all_names = get_all_registered_names()
-
-        name_lower = name.lower().strip()
-
-        # Exact match first
-        if name_lower in all_names:
-            return True, name_lower
-
-        # Fuzzy match: check if input is substring or similar
-        for registered_name in all_names:
-            # Check if one contains the other (handles missing letters)
-            if name_lower in registered_name or registered_name in name_lower:
-                return True, registered_name
-
-            # Check similarity (Levenshtein-like: allow 1-2 character difference)
-            if _is_similar(name_lower, registered_name, max_distance=2):
-                return True, registered_name
-
-        return False, None
+        return name_directory.lookup(name)
 
     except Exception as e:
-        print(f"[ERROR] QDRANT CHECK NAME ERROR: {e}")
+        log.error("QDRANT CHECK NAME ERROR: %s", e)
         return False, None
 
 
-def _is_similar(s1: str, s2: str, max_distance: int = 2) -> bool:
-    """
-    Check if two strings are similar (within max_distance edits).
-    Simple implementation for short names.
-    """
-    if abs(len(s1) - len(s2)) > max_distance:
-        return False
-
-    # Simple character difference count
-    longer = s1 if len(s1) >= len(s2) else s2
-    shorter = s2 if len(s1) >= len(s2) else s1
-
-    differences = 0
-    j = 0
-    for i, char in enumerate(longer):
-        if j < len(shorter) and char == shorter[j]:
-            j += 1
-        else:
-            differences += 1
-
-    differences += (len(shorter) - j)  # remaining unmatched chars
-
-    return differences <= max_distance
-
-
 def get_all_registered_names() -> list:
     """
     Get all registered person names from the database.
     """
     try:
-        response = client.scroll(
+        return name_directory.names()
+
+    except Exception as e:
+        log.error("QDRANT GET NAMES ERROR: %s", e)
+        return []
+
+
+def speaker_models() -> tuple:
+    """(person_names, per-speaker mean vectors) for score normalization."""
+    sums, counts = {}, {}
+    offset = None
+    while True:
+        points, offset = get_client().scroll(
             collection_name=COLLECTION,
-            limit=100
+            limit=SCROLL_PAGE,
+            offset=offset,
+            with_payload=["person_name"],
+            with_vectors=True
+        )
+        for point in points:
+            if point.payload and "person_name" in point.payload:
+                name = point.payload["person_name"].lower()
+                sums[name] = sums.get(name, 0.0) + np.asarray(point.vector, dtype=np.float32)
+                counts[name] = counts.get(name, 0) + 1
+        if offset is None:
+            break
+    names = sorted(sums)
+    models = [sums[name] / counts[name] for name in names]
+    return names, np.asarray(models, dtype=np.float32).reshape(-1, DIM)
+
+
+def _load_registered_names() -> set:
+    # Page through the whole collection (payload only, no vectors)
+    names = set()
+    offset = None
+    while True:
+        points, offset = get_client().scroll(
+            collection_name=COLLECTION,
+            limit=SCROLL_PAGE,
+            offset=offset,
+            with_payload=["person_name"],
+            with_vectors=False
         )
-
-        points, _ = response
-        names = set()
         for point in points:
             if point.payload and "person_name" in point.payload:
                 names.add(point.payload["person_name"].lower())
+        if offset is None:
+            break
+    return names
 
-        return list(names)
 
-    except Exception as e:
-        print(f"[ERROR] QDRANT GET NAMES ERROR: {e}")
-        return []
+name_directory = NameDirectory(_load_registered_names)
+
+list_names = get_all_registered_names
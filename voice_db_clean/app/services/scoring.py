@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# How a speaker's several vectors (samples + centroid) collapse into one score
+IDENTIFY_AGGREGATE = os.getenv("IDENTIFY_AGGREGATE", "max").lower()
+
+# none   — raw cosine similarity, compared against RAW_THRESHOLD
+# asnorm — adaptive symmetric score normalization, compared against ASNORM_THRESHOLD
+SCORE_NORM         = os.getenv("SCORE_NORM", "none").lower()
+ASNORM_TOP_N       = int(os.getenv("ASNORM_TOP_N", "100"))
+# Optional .npy (M, 192) cohort; defaults to the other enrolled speakers' models
+ASNORM_COHORT_PATH = os.getenv("ASNORM_COHORT_PATH", "")
+ASNORM_TTL         = float(os.getenv("ASNORM_TTL", "300"))
+# Raw top-k candidates rescored per identification
+ASNORM_SHORTLIST   = int(os.getenv("ASNORM_SHORTLIST", "10"))
+
+RAW_THRESHOLD    = 0.45
+ASNORM_THRESHOLD = float(os.getenv("ASNORM_THRESHOLD", "3.0"))
+# Configured scale; a score that could not be normalized is still raw and is
+# judged against RAW_THRESHOLD (see CohortNormalizer.normalize)
+THRESHOLD        = ASNORM_THRESHOLD if SCORE_NORM == "asnorm" else RAW_THRESHOLD
+
+_CHUNK = 1024
+# Seconds before a failed cohort fit is attempted again
+_RETRY_SECONDS = 30.0
+
+
+def reduce_scores(scores, mode: str = IDENTIFY_AGGREGATE) -> float:
+    """One score for a speaker from the similarities of several of their vectors."""
+    scores = np.asarray(scores, dtype=np.float32)
+    return float(scores.mean() if mode == "mean" else scores.max())
+
+
+def aggregate_per_person(scored, mode: str = IDENTIFY_AGGREGATE) -> list:
+    """
+    Collapse (person_name, score) pairs into one score per person, best first.
+    With "mean", only the vectors that made the search shortlist are averaged.
+    """
+    groups = {}
+    for name, score in scored:
+        if name:
+            groups.setdefault(name, []).append(float(score))
+    merged = {name: reduce_scores(s, mode) for name, s in groups.items()}
+    return sorted(merged.items(), key=lambda item: item[1], reverse=True)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def _top_n_stats(scores: np.ndarray, n: int) -> tuple:
+    """Mean and std of the n highest scores in each row."""
+    n = min(n, scores.shape[1])
+    top = np.partition(scores, scores.shape[1] - n, axis=1)[:, -n:]
+    return top.mean(axis=1), top.std(axis=1) + 1e-6
+
+
+class ASNorm:
+    """
+    Adaptive symmetric score normalization (AS-norm):
+
+        s' = ½ · ((s − μ_e) / σ_e + (s − μ_q) / σ_q)
+
+    where μ/σ are the mean/std of the top-N cohort scores of the enrolled
+    model (e) and of the query (q). Enrolled-side statistics are computed once
+    per gallery in `fit` (chunked matmul against the cohort); the query side is
+    a single (M, D) @ (D,) product per request. With the gallery as cohort,
+    the speaker being scored is left out of both sides.
+    """
+
+    def __init__(self, top_n: int = ASNORM_TOP_N, cohort: np.ndarray = None):
+        self.top_n = top_n
+        self._external_cohort = None if cohort is None else _normalize_rows(cohort)
+        self._cohort = None
+        self._gallery_cohort = False
+        self._rows = {}
+        self._mu = None
+        self._sigma = None
+
+    @property
+    def ready(self) -> bool:
+        return self._cohort is not None and len(self._cohort) > 1
+
+    def fit(self, names: list, models: np.ndarray) -> "ASNorm":
+        models = _normalize_rows(models) if len(names) else np.zeros((0, 192), dtype=np.float32)
+        use_gallery = self._external_cohort is None
+        self._cohort = models if use_gallery else self._external_cohort
+        self._gallery_cohort = use_gallery
+        self._rows = {name: i for i, name in enumerate(names)}
+
+        mu = np.zeros(len(names), dtype=np.float32)
+        sigma = np.ones(len(names), dtype=np.float32)
+        if self.ready:
+            for start in range(0, len(names), _CHUNK):
+                block = models[start:start + _CHUNK] @ self._cohort.T
+                if use_gallery:
+                    # A speaker is not part of its own cohort
+                    idx = np.arange(block.shape[0])
+                    block[idx, start + idx] = -np.inf
+                    n = min(self.top_n, self._cohort.shape[0] - 1)
+                else:
+                    n = self.top_n
+                mu[start:start + len(block)], sigma[start:start + len(block)] = _top_n_stats(block, n)
+        self._mu, self._sigma = mu, sigma
+        return self
+
+    def query_scores(self, query: np.ndarray) -> np.ndarray:
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        return self._cohort @ q
+
+    def query_stats(self, scores: np.ndarray, name: str = None) -> tuple:
+        """Query-side mean/std from `query_scores`, without `name`'s own model in the cohort."""
+        row = self._rows.get(name) if self._gallery_cohort else None
+        n = self.top_n
+        if row is not None:
+            scores = scores.copy()
+            scores[row] = -np.inf
+            n = min(n, scores.shape[0] - 1)
+        mu, sigma = _top_n_stats(scores[np.newaxis, :], n)
+        return float(mu[0]), float(sigma[0])
+
+    def normalize(self, query: np.ndarray, scored: list) -> list:
+        """Normalize (person_name, raw_score) pairs for one query, best first."""
+        if not self.ready or not scored:
+            return scored
+        scores = self.query_scores(query)
+        out = []
+        for name, raw in scored:
+            mu_q, sigma_q = self.query_stats(scores, name)
+            s_q = (raw - mu_q) / sigma_q
+            row = self._rows.get(name)
+            if row is None:
+                # Enrolled after the last fit: fall back to the query side only
+                out.append((name, float(s_q)))
+                continue
+            s_e = (raw - self._mu[row]) / self._sigma[row]
+            out.append((name, float(0.5 * (s_e + s_q))))
+        return sorted(out, key=lambda item: item[1], reverse=True)
+
+
+class CohortNormalizer:
+    """
+    Keeps an ASNorm fitted to the current gallery. `loader` returns
+    (person_names, (S, DIM) speaker models). The first use fits synchronously;
+    afterwards the stats are refitted in the background once older than `ttl`
+    seconds (or after `invalidate`) while the previous fit keeps serving. A
+    failed fit is logged, the previous one kept, and it is retried after
+    _RETRY_SECONDS.
+    """
+
+    def __init__(self, loader, ttl: float = ASNORM_TTL, top_n: int = ASNORM_TOP_N,
+                 cohort_path: str = ASNORM_COHORT_PATH):
+        self._loader = loader
+        self.ttl = ttl
+        self.top_n = top_n
+        self.cohort_path = cohort_path
+        self._cohort = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._fitted_at = None
+        self._failed_at = None
+        self._asnorm = None
+
+    @property
+    def ready(self) -> bool:
+        asnorm = self._asnorm
+        return asnorm is not None and asnorm.ready
+
+    def refresh(self) -> bool:
+        """Refit from the loader; on failure keep the previous fit and return False."""
+        start = time.perf_counter()
+        try:
+            if self.cohort_path and self._cohort is None:
+                self._cohort = np.load(self.cohort_path)
+                log.info("AS-norm cohort loaded: %s embedding(s)", self._cohort.shape[0])
+            names, models = self._loader()
+            asnorm = ASNorm(self.top_n, self._cohort).fit(names, models)
+        except Exception as e:
+            log.warning("AS-norm refresh failed, keeping the previous fit: %s", e)
+            with self._lock:
+                self._failed_at = time.monotonic()
+            return False
+        with self._lock:
+            self._asnorm = asnorm
+            self._fitted_at = time.monotonic()
+            self._failed_at = None
+        log.info("AS-norm stats fitted: %s speaker(s) in %.1f ms",
+                 len(names), (time.perf_counter() - start) * 1000)
+        return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            if self._fitted_at is not None:
+                self._fitted_at = 0.0
+
+    def _ensure_fresh(self) -> None:
+        if self._failed_at is not None and time.monotonic() - self._failed_at < _RETRY_SECONDS:
+            return
+        if self._fitted_at is None or (not self._asnorm.ready and self._fitted_at == 0.0):
+            # Nothing usable to serve while a background refit runs
+            self.refresh()
+            return
+        if time.monotonic() - self._fitted_at < self.ttl:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            self._refreshing = False
+
+    def normalize(self, query: np.ndarray, scored: list) -> tuple:
+        """
+        (scored, threshold): the pairs AS-normalized with ASNORM_THRESHOLD, or
+        left raw with RAW_THRESHOLD while no usable fit exists (one speaker or
+        fewer, or every fit so far failed).
+        """
+        self._ensure_fresh()
+        asnorm = self._asnorm
+        if asnorm is None or not asnorm.ready:
+            return scored, RAW_THRESHOLD
+        return asnorm.normalize(query, scored), ASNORM_THRESHOLD
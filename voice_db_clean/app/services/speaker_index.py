@@ -0,0 +1,124 @@
+import threading
+import numpy as np
+
+DIM = 192
+
+
+class SpeakerIndex:
+    """
+    Memory-resident copy of every registered vector: datapoint ID → person_name
+    plus a contiguous float32 matrix of L2-normalized embeddings.
+
+    Identification is one matrix-vector product over the matrix followed by an
+    argpartition top-k, so no network round-trip is needed to resolve a match.
+    Writers take the lock; readers only take it to snapshot the row count.
+    """
+
+    def __init__(self, dim: int = DIM, capacity: int = 1024):
+        self.dim = dim
+        self.ready = False
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = []
+        self._names = []
+        self._rows = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        # Swap in a new array so in-flight searches keep reading the old one
+        self._matrix = matrix
+
+    def upsert(self, datapoint_id: str, person_name: str, vector: np.ndarray) -> None:
+        self.upsert_many([(datapoint_id, person_name, vector)])
+
+    def upsert_many(self, items: list) -> None:
+        with self._lock:
+            new = [item for item in items if item[0] not in self._rows]
+            self._grow(len(self._ids) + len(new))
+            for datapoint_id, person_name, vector in items:
+                row = self._rows.get(datapoint_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(datapoint_id)
+                    self._names.append(person_name)
+                    self._rows[datapoint_id] = row
+                else:
+                    self._names[row] = person_name
+                self._matrix[row] = _normalize(vector)
+
+    def remove(self, datapoint_ids: list) -> None:
+        """Drop rows; rebuilds the arrays so concurrent searches never see a half-moved row."""
+        with self._lock:
+            doomed = {self._rows[i] for i in datapoint_ids if i in self._rows}
+            if not doomed:
+                return
+            keep = [row for row in range(len(self._ids)) if row not in doomed]
+            matrix = np.zeros_like(self._matrix)
+            matrix[:len(keep)] = self._matrix[keep]
+            self._matrix = matrix
+            self._ids = [self._ids[row] for row in keep]
+            self._names = [self._names[row] for row in keep]
+            self._rows = {datapoint_id: row for row, datapoint_id in enumerate(self._ids)}
+
+    def replace_all(self, items: list) -> None:
+        """Rebuild the index from scratch (used to warm it at startup)."""
+        ids = [i for i, _, _ in items]
+        names = [n for _, n, _ in items]
+        matrix = np.zeros((max(len(items), 1024), self.dim), dtype=np.float32)
+        if items:
+            matrix[:len(items)] = _normalize_rows(np.asarray([v for _, _, v in items], dtype=np.float32))
+        with self._lock:
+            self._matrix = matrix
+            self._ids = ids
+            self._names = names
+            self._rows = {datapoint_id: row for row, datapoint_id in enumerate(ids)}
+            self.ready = True
+
+    def snapshot(self) -> tuple:
+        """(datapoint_ids, person_names, matrix) of the current rows."""
+        with self._lock:
+            n = len(self._ids)
+            return list(self._ids), list(self._names), self._matrix[:n].copy()
+
+    def search(self, query: np.ndarray, k: int = 1) -> list:
+        """Return up to k (datapoint_id, person_name, cosine_similarity), best first."""
+        with self._lock:
+            n = len(self._ids)
+            matrix = self._matrix
+            ids = self._ids
+            names = self._names
+        if n == 0:
+            return []
+
+        scores = matrix[:n] @ _normalize(query)
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], names[i], float(scores[i])) for i in top]
+
+
+def _normalize(vec: np.ndarray) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    return vec if norm == 0 else vec / norm
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+speaker_index = SpeakerIndex()
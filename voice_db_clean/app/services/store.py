@@ -0,0 +1,131 @@
+import importlib
+import logging
+import os
+from typing import Protocol
+import numpy as np
+from dotenv import load_dotenv
+
+from app.services.scoring import CohortNormalizer, SCORE_NORM, ASNORM_SHORTLIST, RAW_THRESHOLD
+from app.services.metrics import GALLERY_SPEAKERS, gauge, timed
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+# gcp    — Vertex AI Vector Search + Firestore (app/services/gcp_vector_store.py)
+# faiss  — local FAISS index on disk, no network (app/services/vector_store.py)
+# qdrant — Qdrant Cloud, or local in-memory Qdrant (app/services/qdrant_store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "gcp").strip().lower()
+
+BACKENDS = {
+    "gcp":    "app.services.gcp_vector_store",
+    "faiss":  "app.services.vector_store",
+    "qdrant": "app.services.qdrant_store",
+}
+
+
+class VectorStore(Protocol):
+    """
+    The interface every backend module implements as module-level functions.
+    Similarities are cosine similarities of L2-normalized 192-d embeddings.
+    """
+
+    def init_store(self) -> None: ...
+
+    def add_many(self, embeddings: list, person_name: str) -> list:
+        """Register samples for one person; returns their IDs."""
+
+    def identify_topk(self, embedding: np.ndarray, k: int = 5) -> list:
+        """Up to k distinct speakers as (person_name, similarity), best first."""
+
+    def verify(self, embedding: np.ndarray, person_name: str) -> tuple:
+        """(best similarity against that person's vectors, is_registered)."""
+
+    def list_names(self) -> list: ...
+
+    def delete(self, person_name: str) -> int:
+        """Remove a speaker; returns the number of samples removed."""
+
+    def check_name_exists(self, name: str) -> tuple:
+        """(True, registered_name) for an exact or fuzzy match, else (False, None)."""
+
+    def speaker_models(self) -> tuple:
+        """(person_names, (S, 192) matrix of one model vector per speaker) for score normalization."""
+
+
+_store = None
+
+
+def get_store(backend: str = None) -> VectorStore:
+    """Return the backend module selected by VECTOR_BACKEND (or `backend`)."""
+    global _store
+    if backend is not None:
+        return importlib.import_module(BACKENDS[backend])
+    if _store is None:
+        if VECTOR_BACKEND not in BACKENDS:
+            raise ValueError(f"Unknown VECTOR_BACKEND '{VECTOR_BACKEND}' (expected one of {sorted(BACKENDS)})")
+        _store = importlib.import_module(BACKENDS[VECTOR_BACKEND])
+    return _store
+
+
+def init_store() -> None:
+    log.info("Vector backend: %s", VECTOR_BACKEND)
+    get_store().init_store()
+    if SCORE_NORM == "asnorm":
+        normalizer.refresh()
+
+
+def add_embeddings(embeddings: list, person_name: str) -> list:
+    ids = get_store().add_many(embeddings, person_name)
+    normalizer.invalidate()
+    return ids
+
+
+@timed("vector_search")
+def identify_topk(embedding: np.ndarray, k: int = 5) -> tuple:
+    """
+    (ranked, threshold): up to k distinct speakers as (person_name, score),
+    best first, and the threshold those scores are compared against. Scores
+    are AS-norm scores when SCORE_NORM=asnorm and the cohort could be fitted,
+    otherwise raw cosine similarities with RAW_THRESHOLD.
+    """
+    if SCORE_NORM != "asnorm":
+        return get_store().identify_topk(embedding, k), RAW_THRESHOLD
+    # Normalization can reorder speakers, so rescore a wider raw shortlist
+    ranked = get_store().identify_topk(embedding, max(k, ASNORM_SHORTLIST))
+    ranked, threshold = normalizer.normalize(embedding, ranked)
+    return ranked[:k], threshold
+
+
+def identify_speaker(embedding: np.ndarray) -> tuple:
+    """(person_name, score, threshold) of the best match, (None, 0.0, threshold) without one."""
+    ranked, threshold = identify_topk(embedding, 1)
+    name, score = ranked[0] if ranked else (None, 0.0)
+    return name, score, threshold
+
+
+@timed("vector_search")
+def verify_speaker(embedding: np.ndarray, person_name: str) -> tuple:
+    """(score, is_registered, threshold) for a claimed speaker, as identify_topk scores it."""
+    score, registered = get_store().verify(embedding, person_name)
+    threshold = RAW_THRESHOLD
+    if registered and SCORE_NORM == "asnorm":
+        normalized, threshold = normalizer.normalize(embedding, [(person_name.lower().strip(), score)])
+        score = normalized[0][1]
+    return score, registered, threshold
+
+
+def check_name_exists(name: str) -> tuple:
+    return get_store().check_name_exists(name)
+
+
+def gallery_size() -> int:
+    """Registered speakers known to this process, from memory (no backend round trip)."""
+    if _store is None:
+        return 0
+    directory = getattr(_store, "name_directory", None)
+    return len(directory) if directory is not None else len(_store.list_names())
+
+
+normalizer = CohortNormalizer(lambda: get_store().speaker_models())
+gauge(GALLERY_SPEAKERS, gallery_size)
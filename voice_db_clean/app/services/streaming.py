@@ -0,0 +1,187 @@
+import collections
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+from app.services.audio import TARGET_SR
+from app.services.ingest import (
+    frame_levels, MAX_AUDIO_SECONDS, VAD_FRAME_MS, VAD_RANGE_DB, VAD_FLOOR_DB, VAD_PAD_MS,
+)
+
+load_dotenv()
+
+# Interim scores embed the last STREAM_WINDOW_SECONDS of speech, every
+# STREAM_HOP_SECONDS of new speech once STREAM_MIN_SPEECH_SECONDS is available.
+STREAM_WINDOW_SECONDS     = float(os.getenv("STREAM_WINDOW_SECONDS", "3.0"))
+STREAM_HOP_SECONDS        = float(os.getenv("STREAM_HOP_SECONDS", "0.5"))
+STREAM_MIN_SPEECH_SECONDS = float(os.getenv("STREAM_MIN_SPEECH_SECONDS", "1.0"))
+# Trailing silence after speech that ends the utterance
+STREAM_ENDPOINT_MS        = float(os.getenv("STREAM_ENDPOINT_MS", "400"))
+# A frame is speech when it is this far above the tracked noise floor
+STREAM_VAD_MARGIN_DB      = float(os.getenv("STREAM_VAD_MARGIN_DB", "6"))
+STREAM_IDLE_TIMEOUT       = float(os.getenv("STREAM_IDLE_TIMEOUT", "10"))
+# Caps on one stream regardless of what the VAD makes of it: total audio
+# received (silence and noise included) and wall-clock time since it opened
+STREAM_MAX_SECONDS        = float(os.getenv("STREAM_MAX_SECONDS", "60"))
+STREAM_MAX_WALL_SECONDS   = float(os.getenv("STREAM_MAX_WALL_SECONDS", "90"))
+
+# How fast (dB per frame) the noise floor may rise outside / during speech;
+# it drops to any quieter frame immediately
+_NOISE_RISE_DB        = 0.2
+_NOISE_RISE_SPEECH_DB = 0.02
+
+ENCODINGS = {"pcm16": np.dtype("<i2"), "f32": np.dtype("<f4")}
+
+
+class StreamSession:
+    """
+    Incremental speech buffer for one streamed utterance.
+
+    PCM arrives in arbitrary-sized messages; whole 30 ms frames go through an
+    online energy VAD (level above both the tracked noise floor and the
+    ingest VAD thresholds). Speech frames, with VAD_PAD_MS of context on
+    either side, are appended to a preallocated buffer capped at
+    MAX_AUDIO_SECONDS. The utterance ends after STREAM_ENDPOINT_MS of
+    silence, when the buffer is full, when the client says so, or with
+    reason "max_received" once `max_received_seconds` of audio (speech or
+    not) has arrived.
+    """
+
+    def __init__(self, encoding: str = "pcm16", sr: int = TARGET_SR,
+                 max_seconds: float = MAX_AUDIO_SECONDS,
+                 window_seconds: float = STREAM_WINDOW_SECONDS,
+                 hop_seconds: float = STREAM_HOP_SECONDS,
+                 min_speech_seconds: float = STREAM_MIN_SPEECH_SECONDS,
+                 endpoint_ms: float = STREAM_ENDPOINT_MS,
+                 max_received_seconds: float = STREAM_MAX_SECONDS):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unsupported encoding '{encoding}' (expected one of {sorted(ENCODINGS)})")
+        self.sr = sr
+        self.dtype = ENCODINGS[encoding]
+        self.frame = int(sr * VAD_FRAME_MS / 1000)
+        self.window = int(window_seconds * sr)
+        self.hop = int(hop_seconds * sr)
+        self.min_speech = int(min_speech_seconds * sr)
+        self.endpoint_frames = max(1, int(round(endpoint_ms / VAD_FRAME_MS)))
+        self.pad_frames = int(round(VAD_PAD_MS / VAD_FRAME_MS))
+        self.max_received = int(max_received_seconds * sr)
+
+        self._speech = np.zeros(int(max_seconds * sr), dtype=np.float32)
+        self.speech_len = 0
+        self.received = 0
+        self._byte_tail = b""
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._preroll = collections.deque(maxlen=self.pad_frames)
+        self._noise_db = None
+        self._peak_db = VAD_FLOOR_DB
+        self._hangover = 0
+        self._silent_frames = 0
+        self._scored_at = 0
+
+        self.started = False
+        self.end_reason = None
+
+    @property
+    def ended(self) -> bool:
+        return self.end_reason is not None
+
+    @property
+    def speech_seconds(self) -> float:
+        return self.speech_len / self.sr
+
+    @property
+    def received_seconds(self) -> float:
+        return self.received / self.sr
+
+    def end(self, reason: str) -> None:
+        if self.end_reason is None:
+            self.end_reason = reason
+
+    def feed_bytes(self, data: bytes) -> None:
+        """Append raw little-endian PCM; a partial trailing sample is kept for the next message."""
+        data = self._byte_tail + data
+        usable = len(data) - len(data) % self.dtype.itemsize
+        self._byte_tail = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self.dtype)
+        if self.dtype.kind == "i":
+            samples = samples.astype(np.float32) / 32768.0
+        self.feed(samples)
+
+    def feed(self, samples: np.ndarray) -> None:
+        if self.ended:
+            return
+        samples = np.asarray(samples, dtype=np.float32)
+        over = self.received + len(samples) >= self.max_received
+        if over:
+            samples = samples[:max(0, self.max_received - self.received)]
+        samples = np.concatenate([self._pending, samples])
+        self.received += len(samples) - len(self._pending)
+        n_frames = len(samples) // self.frame
+        self._pending = samples[n_frames * self.frame:]
+        if n_frames:
+            levels = frame_levels(samples, self.frame)
+            for i, level in enumerate(levels):
+                self._on_frame(samples[i * self.frame:(i + 1) * self.frame], float(level))
+                if self.ended:
+                    return
+        if over:
+            self.end("max_received")
+
+    def _on_frame(self, frame: np.ndarray, level: float) -> None:
+        # The floor starts at the first frame: clients open the stream before speaking
+        if self._noise_db is None:
+            self._noise_db = level
+        rise = _NOISE_RISE_SPEECH_DB if self._silent_frames == 0 and self.started else _NOISE_RISE_DB
+        self._noise_db = min(level, self._noise_db + rise)
+        self._peak_db = max(self._peak_db, level)
+        voiced = level > max(VAD_FLOOR_DB, self._noise_db + STREAM_VAD_MARGIN_DB, self._peak_db - VAD_RANGE_DB)
+
+        if voiced:
+            if not self.started:
+                self.started = True
+                for earlier in self._preroll:
+                    self._append(earlier)
+                self._preroll.clear()
+            self._append(frame)
+            self._hangover = self.pad_frames
+            self._silent_frames = 0
+        elif self.started:
+            if self._hangover:
+                self._append(frame)
+                self._hangover -= 1
+            self._silent_frames += 1
+            if self._silent_frames >= self.endpoint_frames:
+                self.end("end_of_utterance")
+        elif self._preroll.maxlen:
+            self._preroll.append(frame.copy())
+
+    def _append(self, frame: np.ndarray) -> None:
+        n = min(len(frame), len(self._speech) - self.speech_len)
+        self._speech[self.speech_len:self.speech_len + n] = frame[:n]
+        self.speech_len += n
+        if self.speech_len == len(self._speech):
+            self.end("max_duration")
+
+    def due(self) -> bool:
+        """True when enough new speech arrived since the last interim score."""
+        return (not self.ended and self.speech_len >= self.min_speech
+                and self.speech_len - self._scored_at >= self.hop)
+
+    def window_samples(self) -> np.ndarray:
+        """Copy of the last STREAM_WINDOW_SECONDS of speech; marks it scored."""
+        self._scored_at = self.speech_len
+        return self._speech[max(0, self.speech_len - self.window):self.speech_len].copy()
+
+    def speech(self) -> np.ndarray:
+        """Copy of all the speech collected so far."""
+        return self._speech[:self.speech_len].copy()
+
+    def last_window_was_full_utterance(self) -> bool:
+        """The last interim score already covered exactly the collected speech."""
+        return self._scored_at == self.speech_len and self.speech_len <= self.window
+
+    def stats(self) -> dict:
+        return {
+            "received_s": round(self.received_seconds, 3),
+            "speech_s": round(self.speech_seconds, 3),
+        }
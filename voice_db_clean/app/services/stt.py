@@ -1,52 +1,272 @@
-import requests
-import librosa
-import soundfile
-import io
+import asyncio
+import logging
 import os
+import random
+import time
+from typing import Protocol
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
+from app.services.audio import DecodedAudio
+from app.services.metrics import timed
+
+log = logging.getLogger(__name__)
+
 SARVAM_API_KEY = os.getenv("SARVAM_API_KEY", "")
 SARVAM_URL     = "https://api.sarvam.ai/speech-to-text"
 
+# sarvam — Sarvam AI saaras:v3 over a pooled HTTP client
+# local  — in-process stand-in, no network (STT_LOCAL_TRANSCRIPT after STT_LOCAL_LATENCY_MS)
+STT_PROVIDER = os.getenv("STT_PROVIDER", "sarvam").lower()
+
+# Total time one transcription may take, retries and hedges included
+STT_DEADLINE          = float(os.getenv("STT_DEADLINE", "15"))
+# Upper bound for a single HTTP attempt within the deadline
+STT_ATTEMPT_TIMEOUT   = float(os.getenv("STT_ATTEMPT_TIMEOUT", "8"))
+STT_MAX_RETRIES       = int(os.getenv("STT_MAX_RETRIES", "2"))
+STT_BACKOFF_BASE      = float(os.getenv("STT_BACKOFF_BASE", "0.2"))
+STT_BACKOFF_CAP       = float(os.getenv("STT_BACKOFF_CAP", "2.0"))
+# Requests in flight to the provider per process (hedges included)
+STT_MAX_CONCURRENCY   = int(os.getenv("STT_MAX_CONCURRENCY", "16"))
+# Send a second copy of a request still unanswered after this long and use
+# whichever answers first (0 disables; set near the observed p95)
+STT_HEDGE_AFTER_MS    = float(os.getenv("STT_HEDGE_AFTER_MS", "0"))
+
+STT_LOCAL_TRANSCRIPT  = os.getenv("STT_LOCAL_TRANSCRIPT", "")
+STT_LOCAL_LATENCY_MS  = float(os.getenv("STT_LOCAL_LATENCY_MS", "0"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class STTError(Exception):
+    """A transcription attempt failed; `retryable` attempts may be repeated within the deadline."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: float = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class STTProvider(Protocol):
+    """A speech-to-text backend. Implementations return the lowercased transcript."""
+
+    name: str
+
+    async def transcribe(self, wav_bytes: bytes, deadline: float) -> str:
+        """Transcribe 16 kHz mono WAV before `deadline` (time.monotonic()); raises STTError."""
+
+    async def aclose(self) -> None: ...
 
-def speech_to_text(audio_bytes: bytes) -> str:
+    def stats(self) -> dict: ...
+
+
+class SarvamSTT:
     """
-    Convert audio bytes to text using Sarvam AI saaras:v3.
-    Purpose-built for 23 Indian languages — handles Telugu, Hindi, Tamil,
-    Kannada names natively without keyword hints.
-    Returns empty string on failure.
+    Sarvam AI saaras:v3 over one pooled, keep-alive httpx.AsyncClient.
+
+    Each attempt holds one of `max_concurrency` slots. 429/5xx responses and
+    transport errors are retried with full-jitter exponential backoff (or
+    the server's Retry-After) while the per-request deadline allows. With
+    `hedge_after_ms`, an attempt still unanswered after that long is sent
+    again if a slot is free, and the first successful answer wins.
     """
-    try:
-        audio_np, _ = librosa.load(io.BytesIO(audio_bytes), sr=16000, mono=True)
-        wav_io = io.BytesIO()
-        soundfile.write(wav_io, audio_np, 16000, format="WAV", subtype="PCM_16")
-        wav_bytes = wav_io.getvalue()
-        print(f"[DEBUG] Audio resampled: {len(wav_bytes)} bytes")
-
-        response = requests.post(
-            SARVAM_URL,
-            headers={"api-subscription-key": SARVAM_API_KEY},
-            files={"file": ("audio.wav", wav_bytes, "audio/wav")},
-            data={
-                "model":         "saaras:v3",
-                "language_code": "en-IN",
-                "mode":          "transcribe",
-            },
-            timeout=15,
-        )
+
+    name = "sarvam"
+
+    def __init__(self, api_key: str = SARVAM_API_KEY, url: str = SARVAM_URL,
+                 max_concurrency: int = STT_MAX_CONCURRENCY, max_retries: int = STT_MAX_RETRIES,
+                 attempt_timeout: float = STT_ATTEMPT_TIMEOUT, hedge_after_ms: float = STT_HEDGE_AFTER_MS,
+                 transport=None):
+        self.api_key = api_key
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.attempt_timeout = attempt_timeout
+        self.hedge_after = hedge_after_ms / 1000.0
+        self._transport = transport
+        self._client = None
+        self._slots = None
+        self.counters = {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0}
+
+    def _get_client(self):
+        # Created on first use so it binds to the serving event loop
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                headers={"api-subscription-key": self.api_key},
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60.0,
+                ),
+                transport=self._transport,
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _post(self, wav_bytes: bytes, deadline: float) -> str:
+        import httpx
+
+        client = self._get_client()
+        async with self._slots:
+            timeout = min(self.attempt_timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise STTError("STT deadline exceeded")
+            self.counters["attempts"] += 1
+            try:
+                response = await client.post(
+                    self.url,
+                    files={"file": ("audio.wav", wav_bytes, "audio/wav")},
+                    data={
+                        "model":         "saaras:v3",
+                        "language_code": "en-IN",
+                        "mode":          "transcribe",
+                    },
+                    timeout=timeout,
+                )
+            except httpx.TransportError as e:
+                raise STTError(f"Sarvam STT {type(e).__name__}: {e}", retryable=True)
 
         if response.status_code != 200:
-            print(f"[ERROR] Sarvam STT HTTP {response.status_code}: {response.text}")
-            return ""
+            retry_after = response.headers.get("retry-after")
+            raise STTError(
+                f"Sarvam STT HTTP {response.status_code}: {response.text[:200]}",
+                retryable=response.status_code in RETRY_STATUS,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        return response.json().get("transcript", "").strip().lower()
+
+    async def _attempt(self, wav_bytes: bytes, deadline: float) -> str:
+        primary = asyncio.ensure_future(self._post(wav_bytes, deadline))
+        if not self.hedge_after:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        # Hedge only with a free slot and time left, so hedges never queue behind real work
+        if done or self._slots.locked() or deadline - time.monotonic() < self.hedge_after:
+            return await primary
+
+        self.counters["hedges"] += 1
+        hedge = asyncio.ensure_future(self._post(wav_bytes, deadline))
+        pending, error = {primary, hedge}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
 
-        transcript = response.json().get("transcript", "").strip().lower()
-        print(f"[OK] Sarvam transcript: '{transcript}'")
+    async def transcribe(self, wav_bytes: bytes, deadline: float) -> str:
+        self.counters["requests"] += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._attempt(wav_bytes, deadline)
+            except STTError as e:
+                remaining = deadline - time.monotonic()
+                if not e.retryable or attempt == self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                delay = e.retry_after if e.retry_after is not None else \
+                    random.uniform(0, min(STT_BACKOFF_CAP, STT_BACKOFF_BASE * 2 ** attempt))
+                if delay >= remaining:
+                    self.counters["failures"] += 1
+                    raise STTError(f"{e} (no time left to retry)")
+                log.warning("%s — retrying in %.2fs", e, delay)
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {"provider": self.name, **self.counters}
+
+
+class LocalSTT:
+    """
+    Offline stand-in for tests and benchmarks: answers with a fixed transcript
+    after a simulated latency, without touching the network.
+    """
+
+    name = "local"
+
+    def __init__(self, transcript: str = STT_LOCAL_TRANSCRIPT, latency_ms: float = STT_LOCAL_LATENCY_MS):
+        self.transcript = transcript
+        self.latency = latency_ms / 1000.0
+        self.counters = {"requests": 0}
+
+    async def transcribe(self, wav_bytes: bytes, deadline: float) -> str:
+        self.counters["requests"] += 1
+        if self.latency:
+            if time.monotonic() + self.latency > deadline:
+                raise STTError("STT deadline exceeded")
+            await asyncio.sleep(self.latency)
+        return self.transcript.strip().lower()
+
+    async def aclose(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"provider": self.name, **self.counters}
+
+
+PROVIDERS = {"sarvam": SarvamSTT, "local": LocalSTT}
+
+_provider = None
+
+
+def get_provider() -> STTProvider:
+    global _provider
+    if _provider is None:
+        if STT_PROVIDER not in PROVIDERS:
+            raise ValueError(f"Unknown STT_PROVIDER '{STT_PROVIDER}' (expected one of {sorted(PROVIDERS)})")
+        _provider = PROVIDERS[STT_PROVIDER]()
+        log.info("STT provider: %s", STT_PROVIDER)
+    return _provider
+
+
+@timed("stt")
+async def speech_to_text(audio, deadline: float = None) -> str:
+    """
+    Convert audio to text with the configured provider (Sarvam AI saaras:v3
+    by default — purpose-built for 23 Indian languages, handles Telugu, Hindi,
+    Tamil, Kannada names natively without keyword hints).
+    Accepts raw upload bytes or an already-decoded DecodedAudio.
+    Returns empty string on failure or when the STT_DEADLINE budget runs out.
+    """
+    deadline = deadline or time.monotonic() + STT_DEADLINE
+    try:
+        if not isinstance(audio, DecodedAudio):
+            audio = await asyncio.to_thread(DecodedAudio.from_bytes, audio)
+        wav_bytes = await asyncio.to_thread(audio.wav_bytes)
+        log.debug("Audio prepared for STT: %s bytes", len(wav_bytes))
+
+        transcript = await get_provider().transcribe(wav_bytes, deadline)
+        log.debug("STT transcript: '%s'", transcript)
         return transcript
 
+    except STTError as e:
+        log.error("%s", e)
+        return ""
     except Exception as e:
-        import traceback
-        print(f"[ERROR] Sarvam STT error: {e}")
-        traceback.print_exc()
+        log.exception("STT error: %s", e)
         return ""
+
+
+def stats() -> dict:
+    return _provider.stats() if _provider is not None else {"provider": STT_PROVIDER}
+
+
+async def aclose() -> None:
+    if _provider is not None:
+        await _provider.aclose()
@@ -0,0 +1,240 @@
+import re
+import unicodedata
+
+# Deterministic parser for the common transaction shapes ("send 500 to rahul",
+# "rahul se priya ko paanch sau rupaye bhejo"). Transcripts are tokenized,
+# spoken amounts are folded into one AMOUNT token, and every token gets a
+# one-letter tag; the slots are then read off the tag string with compiled
+# regexes and the parse is scored by how much of the sentence it explains.
+#
+# Tags:  A amount   V verb   T "to" (before the receiver)   K "ko" (after it)
+#        F "from" (before the sender)   Z "se" (after it)   P first person
+#        N name     C currency   X filler (dropped)
+#        Q negation or correction ("don't", "not", "cancel", "nahi"): the
+#          sentence may not mean what its slots say, so it is never accepted
+
+_UNITS = {
+    # English
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60,
+    "seventy": 70, "eighty": 80, "ninety": 90,
+    # Hindi, romanized
+    "ek": 1, "teen": 3, "char": 4, "chaar": 4, "paanch": 5, "panch": 5, "chhe": 6, "chheh": 6,
+    "saat": 7, "aath": 8, "nau": 9, "das": 10, "gyarah": 11, "barah": 12, "pandrah": 15,
+    "bees": 20, "pachees": 25, "pachchis": 25, "tees": 30, "chalis": 40, "chaalees": 40,
+    "pachas": 50, "pachaas": 50, "saath": 60, "sattar": 70, "assi": 80, "nabbe": 90,
+    "dedh": 1.5, "dhai": 2.5, "adhai": 2.5,
+    # Hindi, Devanagari
+    "एक": 1, "तीन": 3, "चार": 4, "पांच": 5, "पाँच": 5, "छह": 6, "छः": 6, "सात": 7,
+    "आठ": 8, "नौ": 9, "दस": 10, "बीस": 20, "पच्चीस": 25, "तीस": 30, "चालीस": 40, "पचास": 50,
+    "साठ": 60, "सत्तर": 70, "अस्सी": 80, "नब्बे": 90, "डेढ़": 1.5, "ढाई": 2.5,
+}
+
+_SCALES = {
+    "hundred": 100, "thousand": 1000, "k": 1000, "lakh": 100000, "lakhs": 100000, "lac": 100000,
+    "lacs": 100000, "million": 1000000, "crore": 10000000, "crores": 10000000,
+    "sau": 100, "hazaar": 1000, "hazar": 1000, "hajar": 1000, "hazzar": 1000,
+    "karod": 10000000, "karor": 10000000,
+    "सौ": 100, "हज़ार": 1000, "हजार": 1000, "लाख": 100000, "करोड़": 10000000,
+}
+
+# Pronouns that already mean "to me": tagged P followed by an implied K
+_DATIVE_FIRST_PERSON = {"mujhe", "मुझे"}
+
+# "do"/"दो" is the Hindi two only before a scale ("do sau"); otherwise it is the verb "give"
+_AMBIGUOUS_TWO = {"do", "दो"}
+_NUMBER_JOINERS = {"and", "aur", "और"}
+
+_WORD_TAGS = {}
+for _tag, _words in {
+    "V": "send sent sends sending pay paid pays paying transfer transferred transfers transferring "
+         "give gave gives giving credit credited remit bhejo bhej bhejna bhejdo bhejiye bhejna "
+         "bhejta bhejti bhejenge bhejunga de dedo dena dijiye do daal dal daalo dalo "
+         "भेजो भेज भेजना भेजिए भेजें भेजता भेजती भेजूंगा दो दे दीजिए डाल डालो",
+    "T": "to",
+    "K": "ko को mein में",
+    "F": "from",
+    "Z": "se से",
+    "P": "i me my myself mine main mai mujhe mera mere meri maine मैं मुझे मेरे मेरा मेरी मैंने",
+    "C": "rupees rupee rs inr rupaye rupaiye rupay rupe ₹ रुपये रुपए रूपये रुपया",
+    "X": "please plz pls kindly can could would will you u want wants need needs like the a an "
+         "some money amount of now today tomorrow yesterday just quickly right away immediately and also "
+         "zara jaldi abhi aaj kal kar karo kardo karna kijiye karein hai hoon hu hun ji bhai "
+         "paise paisa rakam account ke ka ki liye aur "
+         "कृपया करो कर करें है हूं हूँ जी पैसे और के का की लिए",
+    "Q": "don't dont do'nt doesn't didn't not never no cancel stop wait instead actually sorry "
+         "mat nahi nahin nai मत नहीं नहि रद्द",
+}.items():
+    for _word in _words.split():
+        _WORD_TAGS[unicodedata.normalize("NFC", _word)] = _tag
+
+_UNITS = {unicodedata.normalize("NFC", w): v for w, v in _UNITS.items()}
+_SCALES = {unicodedata.normalize("NFC", w): v for w, v in _SCALES.items()}
+
+# Apostrophes stay inside words ("don't", "rahul's"); a possessive 's is dropped after tokenizing
+_TOKEN = re.compile(r"₹|\d+(?:,\d+)*(?:\.\d+)?|[a-z]+(?:'[a-z]+)*|[\u0900-\u0963\u0971-\u097f]+")
+_APOSTROPHES = str.maketrans("\u2018\u2019\u02bc`", "''''")
+_DEVANAGARI_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+
+# Slot rules over the tag string; each group captures the tag of the slot's token
+_RECEIVER_MARKED = (re.compile(r"T([NP])"), re.compile(r"([NP])K"))
+_RECEIVER_DATIVE = re.compile(r"V([NP])A")           # "pay rahul 500"
+_SENDER_MARKED   = (re.compile(r"F([NP])"), re.compile(r"([NP])Z"))
+_SENDER_SUBJECT  = re.compile(r"^([NP])(?=V|[NP]K|T)")  # "rahul sends ...", "main rahul ko ..."
+
+MAX_NAME_WORDS = 3
+
+
+def _is_number_word(tokens: list, i: int) -> bool:
+    word = tokens[i]
+    if word in _UNITS or word in _SCALES or word[0].isdigit():
+        return word != "k" or (i > 0 and tokens[i - 1][0].isdigit())
+    if word in _AMBIGUOUS_TWO:
+        return i + 1 < len(tokens) and tokens[i + 1] in _SCALES
+    return False
+
+
+def _number_value(word: str):
+    if word[0].isdigit():
+        return float(word.replace(",", ""))
+    if word in _AMBIGUOUS_TWO:
+        return 2
+    return _UNITS.get(word)
+
+
+def _span_value(words: list):
+    """
+    Value of a run of number tokens, Indian scales included ("ek lakh pachas
+    hazaar"). Whole amounts are ints; paise are kept ("99.50" -> 99.5).
+    """
+    total, current = 0.0, 0.0
+    for word in words:
+        scale = _SCALES.get(word)
+        if scale is None:
+            current += _number_value(word)
+        elif scale >= 1000:
+            total += (current or 1) * scale
+            current = 0.0
+        else:
+            current = (current or 1) * scale
+    value = round(total + current, 2)
+    return int(value) if value.is_integer() else value
+
+
+def tokenize(text: str) -> list:
+    text = unicodedata.normalize("NFC", text.lower()).translate(_APOSTROPHES)
+    return [re.sub(r"'s$", "", t).translate(_DEVANAGARI_DIGITS) for t in _TOKEN.findall(text)]
+
+
+def _tag(tokens: list) -> list:
+    """[(tag, value)] with amounts folded into single A tokens and adjacent names merged."""
+    tagged, i = [], 0
+    while i < len(tokens):
+        if _is_number_word(tokens, i):
+            span = [tokens[i]]
+            i += 1
+            while i < len(tokens):
+                if _is_number_word(tokens, i) and not tokens[i][0].isdigit():
+                    span.append(tokens[i])
+                elif (tokens[i] in _NUMBER_JOINERS and i + 1 < len(tokens)
+                      and _is_number_word(tokens, i + 1) and not tokens[i + 1][0].isdigit()):
+                    pass
+                else:
+                    break
+                i += 1
+            tagged.append(["A", _span_value(span)])
+            continue
+
+        word = tokens[i]
+        tag = _WORD_TAGS.get(word, "N")
+        if tag == "T" and i + 1 < len(tokens) and _WORD_TAGS.get(tokens[i + 1]) == "V":
+            tag = "X"  # "want to send"
+        if tag == "P":
+            word = "i"
+        if tag == "N" and tagged and tagged[-1][0] == "N" and len(tagged[-1][1].split()) < MAX_NAME_WORDS:
+            tagged[-1][1] += " " + word
+        elif tag != "X":
+            tagged.append([tag, word])
+        if tokens[i] in _DATIVE_FIRST_PERSON:
+            tagged.append(["K", "ko"])
+        i += 1
+    return tagged
+
+
+def parse_transaction(text: str) -> dict:
+    """
+    Extract {sender, receiver, amount} without a model call, plus a
+    `confidence` in [0, 1] for how completely the grammar explains the
+    sentence. Names are lowercased; first-person references become "i".
+    """
+    result = {"sender": None, "receiver": None, "amount": None, "confidence": 0.0}
+    tagged = _tag(tokenize(text or ""))
+    if not tagged:
+        return result
+
+    # Currency words only confirm an adjacent amount
+    has_currency = False
+    tokens = []
+    for j, (tag, value) in enumerate(tagged):
+        if tag == "C":
+            near = [tagged[k][0] for k in (j - 1, j + 1) if 0 <= k < len(tagged)]
+            has_currency |= "A" in near
+            continue
+        tokens.append((tag, value))
+    tags = "".join(tag for tag, _ in tokens)
+
+    confidence = 0.0
+    amounts = [value for tag, value in tokens if tag == "A"]
+    if amounts:
+        result["amount"] = amounts[0]
+        confidence += 0.4 if len(amounts) == 1 else 0.1
+        if has_currency:
+            confidence += 0.05
+
+    used = set()
+
+    def take(pattern):
+        m = pattern.search(tags)
+        if m and m.start(1) not in used:
+            used.add(m.start(1))
+            return tokens[m.start(1)][1]
+        return None
+
+    receivers = [r for r in (take(p) for p in _RECEIVER_MARKED) if r]
+    if receivers:
+        result["receiver"] = receivers[0]
+        confidence += 0.3 if len(set(receivers)) == 1 else 0.0
+    else:
+        result["receiver"] = take(_RECEIVER_DATIVE)
+        confidence += 0.2 if result["receiver"] else 0.0
+
+    senders = [s for s in (take(p) for p in _SENDER_MARKED) if s]
+    if not senders:
+        subject = take(_SENDER_SUBJECT)
+        senders = [subject] if subject else []
+    has_verb = "V" in tags
+    if senders:
+        result["sender"] = senders[0]
+        confidence += 0.15 if len(set(senders)) == 1 else 0.0
+    elif has_verb:
+        confidence += 0.1  # imperative: no sender is the right answer
+    if has_verb:
+        confidence += 0.15
+
+    # Names the grammar could not place mean it does not understand the sentence
+    leftover = sum(1 for k, tag in enumerate(tags) if tag in "NP" and k not in used)
+    confidence -= 0.25 * leftover
+    # Multi-word names are more often a name plus an unknown word
+    for name in (result["sender"], result["receiver"]):
+        if name:
+            confidence -= 0.05 * name.count(" ")
+    if result["sender"] and result["sender"] == result["receiver"]:
+        confidence -= 0.3
+
+    if "Q" in tags:
+        confidence = 0.0
+
+    result["confidence"] = round(min(max(confidence, 0.0), 1.0), 3)
+    return result
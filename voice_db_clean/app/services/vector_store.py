@@ -1,60 +1,562 @@
 import numpy as np
 import faiss
 import json
+import logging
 import os
+import re
+import shutil
+import struct
+import threading
+from dotenv import load_dotenv
+
+from app.services.name_directory import NameDirectory
+from app.services.scoring import aggregate_per_person, reduce_scores
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
 
 DIM = 192
-INDEX_PATH = "data/faiss.index"
-META_PATH = "data/meta.json"
+DATA_DIR = os.getenv("FAISS_DATA_DIR", "data")
 
-index = faiss.IndexFlatIP(DIM)
-names = []
+# flat  — exact brute-force inner product
+# hnsw  — graph ANN (FAISS_HNSW_M links per node, FAISS_HNSW_EF_SEARCH beam width)
+# ivfpq — inverted lists + product quantization, trained at snapshot time once
+#         there are enough vectors (exact search is used until then)
+FAISS_INDEX_TYPE     = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_HNSW_M         = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+FAISS_IVF_NLIST      = int(os.getenv("FAISS_IVF_NLIST", "256"))
+FAISS_IVF_NPROBE     = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+FAISS_PQ_M           = int(os.getenv("FAISS_PQ_M", "24"))
+FAISS_SNAPSHOT_EVERY = int(os.getenv("FAISS_SNAPSHOT_EVERY", "1000"))
 
-def identify_speaker(embedding):
-    if index.ntotal == 0:
-        return None, 0.0
+# Each snapshot is a generation directory snapshots/<N>/ holding index.faiss,
+# vectors.npy, ids.npy and snapshot.json; CURRENT names the live one and is
+# the only file replaced in place, so a crash mid-snapshot leaves the previous
+# generation intact. When a snapshot starts, wal.bin is renamed wal.<N>.bin:
+# those records are folded into generation N and are replayed on load until
+# CURRENT points at it.
+SNAPSHOTS_DIR = os.path.join(DATA_DIR, "snapshots")
+CURRENT_PATH  = os.path.join(DATA_DIR, "CURRENT")
+WAL_PATH      = os.path.join(DATA_DIR, "wal.bin")
+_FROZEN_WAL   = re.compile(r"^wal\.([0-9]+)\.bin$")
+
+# Single-generation layout written in place before versioned snapshots
+FLAT_INDEX_PATH   = os.path.join(DATA_DIR, "index.faiss")
+FLAT_VECTORS_PATH = os.path.join(DATA_DIR, "vectors.npy")
+FLAT_IDS_PATH     = os.path.join(DATA_DIR, "ids.npy")
+FLAT_META_PATH    = os.path.join(DATA_DIR, "snapshot.json")
+
+# Pre-ANN layout (IndexFlatIP + a JSON list of names), migrated on first load
+LEGACY_INDEX_PATH = os.path.join(DATA_DIR, "faiss.index")
+LEGACY_META_PATH  = os.path.join(DATA_DIR, "meta.json")
+
+_ADD_HEADER = struct.Struct("<qH")
+_DEL_HEADER = struct.Struct("<H")
+
+# The store is an LSM-style pair of segments. The base segment is the last
+# snapshot, memory-mapped read-only so it loads instantly and its pages are
+# shared between worker processes. The delta segment holds vectors added since
+# then; they are also appended to the WAL. Deletes are tombstones until the
+# next snapshot compacts both segments into a new base.
+# Snapshots are serialized on a background thread from a copy taken under the
+# lock, so searches are not held up by index building or fsync.
+# A data directory must only have one writer process.
+_lock = threading.RLock()
+_base_index   = None
+_base_ids     = np.zeros(0, dtype=np.int64)
+_base_vectors = np.zeros((0, DIM), dtype=np.float32)
+_delta_index  = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))
+_delta_ids    = []
+_delta_vectors = np.zeros((0, DIM), dtype=np.float32)
+_rows     = {}      # id → (segment, row)
+_id_names = {}      # id → person_name
+_by_name  = {}      # person_name → set(ids)
+_deleted  = set()
+_next_id  = 0
+_wal_records = 0
+_generation  = 0        # last generation started (CURRENT may still name an older one)
+_snapshot_thread = None
+
+
+def normalize(vec):
+    vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vec)
+    return vec if norm == 0 else vec / norm
+
+
+# ---- index construction ------------------------------------------------------
+
+def _build_index(ids: np.ndarray, vectors: np.ndarray):
+    n = len(ids)
+    if FAISS_INDEX_TYPE == "hnsw":
+        base = faiss.IndexHNSWFlat(DIM, FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    elif FAISS_INDEX_TYPE == "ivfpq" and n >= max(FAISS_IVF_NLIST, 256) * 39:
+        # k-means for the coarse lists and the 256-centroid PQ codebooks both
+        # want ~39 training points per centroid
+        quantizer = faiss.IndexFlatIP(DIM)
+        base = faiss.IndexIVFPQ(quantizer, DIM, FAISS_IVF_NLIST, FAISS_PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+        base.train(vectors)
+    else:
+        base = faiss.IndexFlatIP(DIM)
+    index = faiss.IndexIDMap2(base)
+    if n:
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def _tune(index) -> None:
+    inner = faiss.downcast_index(index.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = FAISS_IVF_NPROBE
+
+
+# ---- persistence -------------------------------------------------------------
+
+def init_store():
+    load_store()
+    name_directory.refresh()
+
+
+def _current() -> tuple:
+    """(generation, directory) of the live snapshot, or None before the first one."""
+    if os.path.exists(CURRENT_PATH):
+        with open(CURRENT_PATH, "r") as f:
+            generation = int(json.load(f)["generation"])
+        return generation, _generation_dir(generation)
+    if os.path.exists(FLAT_META_PATH):
+        return 0, DATA_DIR
+    return None
 
-    emb = embedding / np.linalg.norm(embedding)
-    scores, ids = index.search(emb.reshape(1, -1), 1)
 
-    best_score = float(scores[0][0])
-    best_id = int(ids[0][0])
+def _generation_dir(generation: int) -> str:
+    return os.path.join(SNAPSHOTS_DIR, f"{generation:08d}")
 
-    if best_id == -1:
-        return None, 0.0
 
-    return names[best_id], best_score
+def _frozen_wals() -> list:
+    """[(generation, path)] of WAL segments handed to a snapshot, oldest first."""
+    if not os.path.isdir(DATA_DIR):
+        return []
+    found = []
+    for name in os.listdir(DATA_DIR):
+        m = _FROZEN_WAL.match(name)
+        if m:
+            found.append((int(m.group(1)), os.path.join(DATA_DIR, name)))
+    return sorted(found)
+
 
 def load_store():
-    global index, names
-    if os.path.exists(INDEX_PATH):
-        index = faiss.read_index(INDEX_PATH)
-        with open(META_PATH, "r") as f:
-            names[:] = json.load(f)
+    with _lock:
+        _load()
+    if _wal_records >= FAISS_SNAPSHOT_EVERY:
+        snapshot(background=True)
+
+
+def _load():
+    global _generation
+    current = _current()
+    if current is None and os.path.exists(LEGACY_INDEX_PATH):
+        _reset()
+        _migrate_legacy()
+        return
+    _install(_open_snapshot(current[1]) if current else None, current[0] if current else 0)
+
+    replayed = 0
+    for generation, path in _frozen_wals():
+        if current is not None and generation <= current[0]:
+            os.remove(path)  # already folded into the live snapshot
+        else:
+            replayed += _replay_wal(path)
+        _generation = max(_generation, generation)
+    replayed += _replay_wal(WAL_PATH, truncate=True)
+    log.info("FAISS store loaded (%s, generation %s): %s vector(s), %s WAL record(s) replayed",
+             FAISS_INDEX_TYPE, current[0] if current else "-", len(_id_names), replayed)
+
+
+def _open_snapshot(directory: str) -> dict:
+    """Map one generation's files and index its rows without touching the live state."""
+    with open(os.path.join(directory, "snapshot.json"), "r") as f:
+        meta = json.load(f)
+    index = faiss.read_index(os.path.join(directory, "index.faiss"), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    _tune(index)
+    ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+    vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+    counts = {"names": len(meta["names"]), "ids": len(ids), "vectors": len(vectors), "index": index.ntotal}
+    if len(set(counts.values())) != 1 or meta.get("count", counts["ids"]) != counts["ids"]:
+        raise RuntimeError(f"FAISS snapshot {directory} is inconsistent: {counts}, "
+                           f"snapshot.json count {meta.get('count')}")
+
+    rows, id_names, by_name = {}, {}, {}
+    for row, (datapoint_id, name) in enumerate(zip(ids.tolist(), meta["names"])):
+        rows[datapoint_id] = ("base", row)
+        id_names[datapoint_id] = name
+        by_name.setdefault(name, set()).add(datapoint_id)
+    return {"index": index, "ids": ids, "vectors": vectors, "next_id": meta["next_id"],
+            "rows": rows, "id_names": id_names, "by_name": by_name}
+
+
+def _install(base: dict, generation: int) -> None:
+    """Make `base` (from _open_snapshot, or None for an empty store) the base segment with an empty delta."""
+    global _base_index, _base_ids, _base_vectors, _rows, _id_names, _by_name, _next_id, _generation
+    _reset()
+    _generation = generation
+    if base is None:
+        return
+    _base_index, _base_ids, _base_vectors = base["index"], base["ids"], base["vectors"]
+    _rows, _id_names, _by_name = base["rows"], base["id_names"], base["by_name"]
+    _next_id = base["next_id"]
+
+
+def _reset():
+    global _base_index, _base_ids, _base_vectors, _delta_index, _delta_ids, _delta_vectors
+    global _next_id, _wal_records
+    _base_index = None
+    _base_ids = np.zeros(0, dtype=np.int64)
+    _base_vectors = np.zeros((0, DIM), dtype=np.float32)
+    _delta_index = faiss.IndexIDMap2(faiss.IndexFlatIP(DIM))
+    _delta_ids = []
+    _delta_vectors = np.zeros((0, DIM), dtype=np.float32)
+    _rows.clear()
+    _id_names.clear()
+    _by_name.clear()
+    _deleted.clear()
+    _next_id = 0
+    _wal_records = 0
+
+
+def _migrate_legacy():
+    legacy = faiss.read_index(LEGACY_INDEX_PATH)
+    with open(LEGACY_META_PATH, "r") as f:
+        legacy_names = json.load(f)
+    vectors = legacy.reconstruct_n(0, legacy.ntotal) if legacy.ntotal else np.zeros((0, DIM), dtype=np.float32)
+    _apply_add(list(range(len(legacy_names))), [n.lower() for n in legacy_names], vectors)
+    _replay_wal(WAL_PATH, truncate=True)
+    generation, frozen = _freeze()
+    _write_snapshot(generation, *_compact(frozen))
+    _load()
+    _prune_generations(generation)
+    log.info("Migrated legacy FAISS store: %s vector(s)", len(legacy_names))
+
+
+def _replay_wal(path: str, truncate: bool = False) -> int:
+    """Apply one WAL file's records; counts towards the next snapshot. Returns the record count."""
+    global _wal_records
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        data = f.read()
+
+    pos, count, vector_bytes = 0, 0, DIM * 4
+    while pos < len(data):
+        op = data[pos:pos + 1]
+        try:
+            if op == b"A":
+                datapoint_id, name_len = _ADD_HEADER.unpack_from(data, pos + 1)
+                start = pos + 1 + _ADD_HEADER.size
+                end = start + name_len + vector_bytes
+                if end > len(data):
+                    break
+                name = data[start:start + name_len].decode("utf-8")
+                vector = np.frombuffer(data, dtype=np.float32, count=DIM, offset=start + name_len)
+                _apply_add([datapoint_id], [name], vector.reshape(1, DIM))
+                pos = end
+            elif op == b"D":
+                (name_len,) = _DEL_HEADER.unpack_from(data, pos + 1)
+                start = pos + 1 + _DEL_HEADER.size
+                if start + name_len > len(data):
+                    break
+                _apply_delete(data[start:start + name_len].decode("utf-8"))
+                pos = start + name_len
+            else:
+                break
+        except struct.error:
+            break
+        count += 1
+
+    if pos < len(data):
+        # A torn record from a crash mid-append; drop it
+        log.warning("Ignoring %s trailing byte(s) of %s", len(data) - pos, path)
+        if truncate:
+            with open(path, "r+b") as f:
+                f.truncate(pos)
+    _wal_records += count
+    return count
+
 
-def save_store():
-    faiss.write_index(index, INDEX_PATH)
-    with open(META_PATH, "w") as f:
-        json.dump(names, f)
+def _append_wal(records: list) -> None:
+    global _wal_records
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(WAL_PATH, "ab") as f:
+        f.write(b"".join(records))
+        f.flush()
+        os.fsync(f.fileno())
+    _wal_records += len(records)
+
+
+def snapshot(background: bool = False):
+    """
+    Compact base + delta (minus tombstones) into a new memory-mapped base
+    generation. Under the lock only references to the segments, the
+    tombstones and the names are taken and the WAL is rotated; gathering the
+    vectors and building and writing the index happen outside it, on a background thread
+    when `background` is set (as the automatic FAISS_SNAPSHOT_EVERY trigger
+    does). A snapshot already running makes this a no-op.
+    """
+    global _snapshot_thread
+    with _lock:
+        if _snapshot_thread is not None:
+            return
+        generation, frozen = _freeze()
+        _snapshot_thread = threading.current_thread()
+        if background:
+            _snapshot_thread = threading.Thread(target=_finish_snapshot, args=(generation, frozen),
+                                                name="faiss-snapshot", daemon=True)
+            _snapshot_thread.start()
+            return
+    _finish_snapshot(generation, frozen)
+
+
+def _freeze() -> tuple:
+    """
+    Capture the live state and hand the current WAL to the next generation;
+    caller holds _lock. The base arrays are read-only maps and the delta matrix
+    is replaced (never written in place) on add, so references suffice.
+    """
+    global _generation, _wal_records
+    frozen = {
+        "base_ids": _base_ids, "base_vectors": _base_vectors,
+        "delta_ids": np.asarray(_delta_ids, dtype=np.int64), "delta_vectors": _delta_vectors,
+        "deleted": np.fromiter(_deleted, dtype=np.int64, count=len(_deleted)),
+        "names": dict(_id_names), "next_id": _next_id,
+    }
+    _generation += 1
+    if os.path.exists(WAL_PATH):
+        os.replace(WAL_PATH, os.path.join(DATA_DIR, f"wal.{_generation}.bin"))
+    _wal_records = 0
+    return _generation, frozen
+
+
+def _compact(frozen: dict) -> tuple:
+    """(ids, vectors, names, next_id) of the live rows of a _freeze capture, in id order."""
+    base_keep = ~np.isin(frozen["base_ids"], frozen["deleted"])
+    delta_keep = ~np.isin(frozen["delta_ids"], frozen["deleted"])
+    ids = np.concatenate([np.asarray(frozen["base_ids"])[base_keep], frozen["delta_ids"][delta_keep]])
+    vectors = np.concatenate([np.asarray(frozen["base_vectors"])[base_keep],
+                              frozen["delta_vectors"][:len(frozen["delta_ids"])][delta_keep]])
+    order = np.argsort(ids, kind="stable")
+    ids, vectors = ids[order], np.ascontiguousarray(vectors[order], dtype=np.float32)
+    names = frozen["names"]
+    return ids, vectors, [names[i] for i in ids.tolist()], frozen["next_id"]
+
+
+def _finish_snapshot(generation: int, frozen: dict) -> None:
+    global _snapshot_thread
+    try:
+        state = _compact(frozen)
+        _write_snapshot(generation, *state)
+        base = _open_snapshot(_generation_dir(generation))
+        with _lock:
+            # Swap in the new base; only records written since _freeze are replayed
+            _install(base, generation)
+            for frozen, path in _frozen_wals():
+                if frozen <= generation:
+                    os.remove(path)
+            _replay_wal(WAL_PATH)
+        _prune_generations(generation)
+        log.info("FAISS snapshot written: generation %s, %s vector(s)", generation, len(state[0]))
+    except Exception as e:
+        log.exception("FAISS snapshot %s failed, its WAL stays in place: %s", generation, e)
+    finally:
+        with _lock:
+            _snapshot_thread = None
+
+
+def _write_snapshot(generation: int, ids: np.ndarray, vectors: np.ndarray, names: list, next_id: int) -> None:
+    directory = _generation_dir(generation)
+    tmp = directory + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    faiss.write_index(_build_index(ids, vectors), os.path.join(tmp, "index.faiss"))
+    _save_npy(os.path.join(tmp, "vectors.npy"), vectors)
+    _save_npy(os.path.join(tmp, "ids.npy"), ids)
+    with open(os.path.join(tmp, "snapshot.json"), "w") as f:
+        json.dump({"generation": generation, "next_id": next_id, "index_type": FAISS_INDEX_TYPE,
+                   "count": len(ids), "names": names}, f)
+    for name in os.listdir(tmp):
+        _fsync(os.path.join(tmp, name))
+    os.replace(tmp, directory)
+    _fsync_dir(SNAPSHOTS_DIR)
+
+    # The switch: everything before this line is invisible to load_store
+    with open(CURRENT_PATH + ".tmp", "w") as f:
+        json.dump({"generation": generation}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(CURRENT_PATH + ".tmp", CURRENT_PATH)
+    _fsync_dir(DATA_DIR)
+
+
+def _prune_generations(live: int) -> None:
+    """Drop older generations and the pre-versioning files; a mapped file that cannot go yet is retried next time."""
+    for name in os.listdir(SNAPSHOTS_DIR):
+        generation = name.split(".")[0]
+        if generation.isdigit() and (int(generation) < live or name.endswith(".tmp")):
+            shutil.rmtree(os.path.join(SNAPSHOTS_DIR, name), ignore_errors=True)
+    for path in (FLAT_INDEX_PATH, FLAT_VECTORS_PATH, FLAT_IDS_PATH, FLAT_META_PATH,
+                 LEGACY_INDEX_PATH, LEGACY_META_PATH):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _save_npy(path: str, array: np.ndarray) -> None:
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+
+def _fsync(path: str) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: str) -> None:
+    if os.name == "nt":
+        return  # directories cannot be opened for fsync on Windows
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ---- in-memory state ---------------------------------------------------------
+
+def _track(datapoint_id: int, name: str, location: tuple) -> None:
+    _rows[datapoint_id] = location
+    _id_names[datapoint_id] = name
+    _by_name.setdefault(name, set()).add(datapoint_id)
+
+
+def _apply_add(ids: list, names_: list, vectors: np.ndarray) -> None:
+    global _delta_vectors, _next_id
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    start = len(_delta_ids)
+    _delta_vectors = np.vstack([_delta_vectors, vectors])
+    _delta_index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+    for offset, (datapoint_id, name) in enumerate(zip(ids, names_)):
+        _delta_ids.append(datapoint_id)
+        _track(datapoint_id, name, ("delta", start + offset))
+        _deleted.discard(datapoint_id)
+    _next_id = max(_next_id, max(ids) + 1)
+
+
+def _apply_delete(name: str) -> int:
+    ids = _by_name.pop(name, set())
+    for datapoint_id in ids:
+        _id_names.pop(datapoint_id, None)
+        _rows.pop(datapoint_id, None)
+        _deleted.add(datapoint_id)
+    return len(ids)
+
+
+def _vectors_for(ids: list) -> np.ndarray:
+    out = np.zeros((len(ids), DIM), dtype=np.float32)
+    for i, datapoint_id in enumerate(ids):
+        segment, row = _rows[datapoint_id]
+        out[i] = _base_vectors[row] if segment == "base" else _delta_vectors[row]
+    return out
+
+
+# ---- VectorStore interface ---------------------------------------------------
 
 def add_embedding(embedding, person_name):
-    emb = embedding / np.linalg.norm(embedding)
-    index.add(emb.reshape(1, -1))
-    names.append(person_name)
-    save_store()
+    add_many([embedding], person_name)
+
+def add_many(embeddings, person_name):
+    name_lower = person_name.lower()
+    vectors = np.stack([normalize(e) for e in embeddings])
+    with _lock:
+        ids = list(range(_next_id, _next_id + len(vectors)))
+        encoded = name_lower.encode("utf-8")
+        _append_wal([
+            b"A" + _ADD_HEADER.pack(datapoint_id, len(encoded)) + encoded + vector.tobytes()
+            for datapoint_id, vector in zip(ids, vectors)
+        ])
+        _apply_add(ids, [name_lower] * len(ids), vectors)
+        if _wal_records >= FAISS_SNAPSHOT_EVERY:
+            snapshot(background=True)
+    name_directory.add(name_lower)
+    return [str(i) for i in ids]
+
+def identify_speaker(embedding):
+    ranked = identify_topk(embedding, 1)
+    return ranked[0] if ranked else (None, 0.0)
+
+def identify_topk(embedding, k=5):
+    query = normalize(embedding).reshape(1, -1)
+    with _lock:
+        if not _id_names:
+            return []
+        # Over-fetch to survive tombstones and several vectors per speaker
+        fetch = k * 8 + len(_deleted)
+        candidates = set()
+        for index in (_base_index, _delta_index):
+            if index is not None and index.ntotal:
+                _, found = index.search(query, min(fetch, index.ntotal))
+                candidates.update(int(i) for i in found[0] if i != -1 and int(i) in _id_names)
+        if not candidates:
+            return []
+        ids = list(candidates)
+        # Re-rank with the exact stored vectors (PQ scores are approximate)
+        scores = _vectors_for(ids) @ query[0]
+        scored = [(_id_names[datapoint_id], score) for datapoint_id, score in zip(ids, scores)]
+    return aggregate_per_person(scored)[:k]
+
+def verify(embedding, person_name):
+    name_lower = person_name.lower().strip()
+    with _lock:
+        ids = list(_by_name.get(name_lower, ()))
+        if not ids:
+            return 0.0, False
+        stored = _vectors_for(ids)
+    return reduce_scores(stored @ normalize(embedding)), True
 
 def verify_speaker(embedding, person_name):
-    emb = embedding / np.linalg.norm(embedding)
+    return verify(embedding, person_name)
+
+def list_names():
+    return sorted(_by_name)
+
+def speaker_models():
+    with _lock:
+        names = sorted(_by_name)
+        models = [_vectors_for(list(_by_name[name])).mean(axis=0) for name in names]
+    return names, np.asarray(models, dtype=np.float32).reshape(-1, DIM)
 
-    scores = []
+def delete(person_name):
+    name_lower = person_name.lower().strip()
+    with _lock:
+        if name_lower not in _by_name:
+            return 0
+        encoded = name_lower.encode("utf-8")
+        _append_wal([b"D" + _DEL_HEADER.pack(len(encoded)) + encoded])
+        removed = _apply_delete(name_lower)
+        if _wal_records >= FAISS_SNAPSHOT_EVERY:
+            snapshot(background=True)
+    name_directory.discard(name_lower)
+    return removed
 
-    for i, name in enumerate(names):
-        if name == person_name:
-            stored_emb = index.reconstruct(i)
-            score = np.dot(emb, stored_emb)
-            scores.append(score)
+def check_name_exists(name):
+    if not name or len(name.strip()) < 2:
+        return False, None
+    return name_directory.lookup(name)
 
-    if not scores:
-        return 0.0
 
-    return float(max(scores))
+name_directory = NameDirectory(list_names)
@@ -0,0 +1,107 @@
+"""
+Request-path cost of audit uploads: inline GCS calls vs the background audit sink.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_audit
+    python -m benchmarks.bench_audit --upload-ms 400 --fail-rate 0.2 --outage 3
+
+No GCS access is needed: the sink is driven with a simulated uploader that
+takes --upload-ms per object and fails a --fail-rate share of calls, and
+rejects everything during the first --outage seconds (GCS down). Reported:
+
+    inline  time a request spends in one blocking upload (the previous behaviour)
+    sink    time a request spends in AuditSink.submit, plus how long the
+            background workers needed until every object was stored, and how
+            many were retried or went through the disk spool
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app.services.audit_sink import AuditSink
+
+
+class FakeGCS:
+    def __init__(self, upload_ms: float, fail_rate: float, outage: float, seed: int = 0):
+        self.upload = upload_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.outage_until = time.monotonic() + outage
+        self.rng = random.Random(seed)
+        self.stored = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, audio_bytes, folder, filename, content_type="audio/wav", metadata=None, timeout=8):
+        time.sleep(self.upload * random.uniform(0.5, 1.5))
+        with self.lock:
+            failed = time.monotonic() < self.outage_until or self.rng.random() < self.fail_rate
+        if failed:
+            raise ConnectionError("simulated GCS failure")
+        with self.lock:
+            self.stored.add(f"{folder}/{filename}")
+        return f"gs://bench/{folder}/{filename}"
+
+
+def percentiles(ms: list) -> str:
+    a = np.asarray(ms)
+    return f"p50 {np.percentile(a, 50):>8.2f} ms   p99 {np.percentile(a, 99):>8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50.0, help="requests per second")
+    parser.add_argument("--upload-ms", type=float, default=150.0)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--outage", type=float, default=1.0, help="seconds GCS rejects everything at the start")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--kb", type=int, default=160, help="size of each audio object")
+    args = parser.parse_args()
+
+    audio = os.urandom(args.kb * 1024)
+    print(f"{args.requests} requests at {args.rate:.0f}/s, {args.kb} KB each; simulated upload "
+          f"{args.upload_ms:.0f} ms, {args.fail_rate:.0%} failures, {args.outage:.1f}s outage\n")
+
+    gcs = FakeGCS(args.upload_ms, args.fail_rate, 0.0)
+    inline = []
+    for i in range(min(args.requests, 50)):
+        start = time.perf_counter()
+        try:
+            gcs(audio, "matches", f"inline-{i}.wav")
+        except ConnectionError:
+            pass
+        inline.append((time.perf_counter() - start) * 1000.0)
+    print(f"inline  {percentiles(inline)}   (failed uploads lost)")
+
+    with tempfile.TemporaryDirectory() as spool:
+        gcs = FakeGCS(args.upload_ms, args.fail_rate, args.outage)
+        sink = AuditSink(uploader=gcs, workers=args.workers, queue_size=args.queue,
+                         spool_dir=spool, spool_interval=0.5, encoding="original")
+        sink.start()
+        submit = []
+        begin = time.perf_counter()
+        for i in range(args.requests):
+            start = time.perf_counter()
+            sink.submit(audio, "matches", f"sink-{i}")
+            submit.append((time.perf_counter() - start) * 1000.0)
+            time.sleep(1.0 / args.rate)
+
+        while len(gcs.stored) < args.requests and time.perf_counter() - begin < 120:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - begin
+        sink.close(timeout=1.0)
+        s = sink.stats()
+
+    print(f"sink    {percentiles(submit)}")
+    print(f"        stored {len(gcs.stored)}/{args.requests} after {elapsed:.1f}s   "
+          f"retries {s['retries']}   spooled {s['spooled']}   re-uploaded from spool {s['unspooled']}")
+
+
+if __name__ == "__main__":
+    main()
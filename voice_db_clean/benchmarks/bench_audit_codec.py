@@ -0,0 +1,122 @@
+"""
+Bytes and encode CPU per clip for the audit storage encodings (AUDIT_ENCODING).
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_audit_codec                        # synthetic speech-like clips
+    python -m benchmarks.bench_audit_codec --audio a.wav b.m4a    # real recordings
+    python -m benchmarks.bench_audit_codec --seconds 8 --uplink-mbps 20
+    python -m benchmarks.bench_audit_codec --check    # audit-copy completeness check only
+
+Each clip is decoded once to 16 kHz mono (as the request path does), then
+encoded --repeat times per format. Reported per clip: stored bytes, ratio to
+16-bit WAV, bitrate, encode wall and CPU milliseconds (paid by the audit
+workers, not the request), and the upload time the bytes would take at
+--uplink-mbps. "err_lsb" is the largest difference between the decoded
+object and the float clip, in 16-bit steps (1-2 is plain quantization).
+
+First, an upload with leading/trailing silence and more audio than the
+request path decodes is put through AuditSink, and the stored object is
+checked to hold every sample of the upload, with a matching duration_s.
+"""
+import argparse
+import io
+import tempfile
+import time
+
+import numpy as np
+import soundfile
+
+from app.services.audio import DecodedAudio, STORAGE_FORMATS, TARGET_SR
+from app.services.audit_sink import AuditSink
+from app.services.ingest import decode_speech
+
+
+def synthetic_speech(seconds: float, seed: int = 0) -> np.ndarray:
+    """Voiced harmonics with a moving pitch, a syllable-rate envelope, pauses and a noise floor."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * TARGET_SR)) / TARGET_SR
+    f0 = 120.0 + 30.0 * np.sin(2 * np.pi * 0.7 * t) + 10.0 * rng.standard_normal()
+    phase = 2 * np.pi * np.cumsum(f0) / TARGET_SR
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 16))
+    envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0, None) * (np.sin(2 * np.pi * 0.3 * t) > -0.6)
+    signal = 0.3 * voiced * envelope + 0.003 * rng.standard_normal(len(t))
+    return (signal / np.max(np.abs(signal)) * 0.8).astype(np.float32)
+
+
+def measure(clip: DecodedAudio, encoding: str, repeat: int) -> dict:
+    wall, cpu = [], []
+    for _ in range(repeat):
+        w, c = time.perf_counter(), time.process_time()
+        data = clip.encode(encoding) if encoding != "wav" else DecodedAudio(clip.samples).wav_bytes()
+        wall.append((time.perf_counter() - w) * 1000.0)
+        cpu.append((time.process_time() - c) * 1000.0)
+
+    restored, _ = soundfile.read(io.BytesIO(data), dtype="float32")
+    n = min(len(restored), len(clip.samples))
+    err = float(np.abs(restored[:n] - clip.samples[:n]).max()) * 32768 if n == len(clip.samples) else float("inf")
+    return {"bytes": len(data), "wall": float(np.median(wall)), "cpu": float(np.median(cpu)), "err": err}
+
+
+def check_audit_copy(encoding: str = "flac") -> None:
+    """The stored audit object is the whole upload, not the VAD-trimmed, capped request clip."""
+    silence = np.zeros(2 * TARGET_SR, dtype=np.float32)
+    upload = np.concatenate([silence, synthetic_speech(6.0), silence])
+    wav = io.BytesIO()
+    soundfile.write(wav, upload, TARGET_SR, format="WAV", subtype="PCM_16")
+    audio_bytes = wav.getvalue()
+    decoded = decode_speech(audio_bytes, max_seconds=5.0)  # what the request path embeds
+
+    stored = []
+    with tempfile.TemporaryDirectory() as spool:
+        sink = AuditSink(uploader=lambda data, *args, **kwargs: stored.append((data, kwargs["metadata"])),
+                         workers=1, spool_dir=spool, encoding=encoding)
+        sink.submit(audio_bytes, "check", "audit-copy", decoded)
+        sink.close()
+    assert stored, "audit copy was not uploaded"
+    data, metadata = stored[0]
+    restored, sr = soundfile.read(io.BytesIO(data), dtype="float32")
+    assert sr == TARGET_SR and len(restored) == len(upload), \
+        f"stored {len(restored)} samples at {sr} Hz, uploaded {len(upload)} at {TARGET_SR} Hz"
+    assert metadata["duration_s"] == round(len(upload) / TARGET_SR, 3), f"duration_s {metadata['duration_s']}"
+    print(f"audit copy: ok ({len(restored)} samples, {metadata['duration_s']}s stored; "
+          f"request clip {decoded.duration:.2f}s)\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--audio", nargs="*", default=None)
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of the synthetic clips")
+    parser.add_argument("--clips", type=int, default=5, help="number of synthetic clips")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--uplink-mbps", type=float, default=50.0)
+    parser.add_argument("--check", action="store_true", help="run the audit-copy check only")
+    args = parser.parse_args()
+
+    check_audit_copy()
+    if args.check:
+        return
+
+    if args.audio:
+        clips = []
+        for path in args.audio:
+            with open(path, "rb") as f:
+                clips.append(DecodedAudio.from_bytes(f.read()))
+    else:
+        clips = [DecodedAudio(synthetic_speech(args.seconds, seed)) for seed in range(args.clips)]
+    seconds = sum(c.duration for c in clips) / len(clips)
+    print(f"{len(clips)} clip(s), {seconds:.1f}s average, 16 kHz mono; upload at {args.uplink_mbps:.0f} Mbit/s\n")
+
+    print(f"{'encoding':<9} {'bytes':>9} {'vs wav':>7} {'kbit/s':>7} {'enc_ms':>7} {'cpu_ms':>7} {'upload_ms':>10} {'err_lsb':>8}")
+    wav_bytes = None
+    for encoding in STORAGE_FORMATS:
+        rows = [measure(c, encoding, args.repeat) for c in clips]
+        size = np.mean([r["bytes"] for r in rows])
+        wav_bytes = wav_bytes or size
+        print(f"{encoding:<9} {size:>9.0f} {size / wav_bytes:>7.2f} {size * 8 / seconds / 1000:>7.1f} "
+              f"{np.mean([r['wall'] for r in rows]):>7.2f} {np.mean([r['cpu'] for r in rows]):>7.2f} "
+              f"{size * 8 / (args.uplink_mbps * 1e6) * 1000:>10.1f} {max(r['err'] for r in rows):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Conformance checks and latency/recall benchmark for VectorStore backends.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_backends --backends faiss,qdrant --speakers 500
+
+Every backend is driven only through the VectorStore interface
+(app/services/store.py) with synthetic 192-d embeddings: a cluster centre
+per speaker, noisy samples for enrollment and noisy queries for search.
+The conformance pass asserts behaviour all backends must share; the
+benchmark reports add / identify / verify latency and recall@1.
+
+The FAISS backend writes to a temporary FAISS_DATA_DIR. The Qdrant backend
+uses local in-memory mode unless QDRANT_URL is set. "gcp" writes to the real
+Firestore/Vertex deployment and is therefore never in the default list.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+DIM = 192
+
+
+def _clusters(rng, speakers: int, samples: int, noise: float):
+    centres = rng.standard_normal((speakers, DIM)).astype(np.float32)
+    enroll = centres[:, None, :] + noise * rng.standard_normal((speakers, samples, DIM)).astype(np.float32)
+    return centres, enroll
+
+
+def conformance(store, rng) -> None:
+    centres, enroll = _clusters(rng, 3, 3, 0.2)
+    names = ["conf_alice", "conf_bob", "conf_charlie"]
+    for name, samples in zip(names, enroll):
+        ids = store.add_many(list(samples), name.upper())
+        assert len(ids) == 3, f"add_many returned {ids!r}"
+
+    listed = set(store.list_names())
+    assert set(names) <= listed, f"list_names missing entries: {set(names) - listed}"
+
+    ranked = store.identify_topk(centres[1], 2)
+    assert ranked and ranked[0][0] == "conf_bob", f"identify_topk: {ranked!r}"
+    assert len({n for n, _ in ranked}) == len(ranked), "identify_topk must return distinct speakers"
+    assert all(a[1] >= b[1] for a, b in zip(ranked, ranked[1:])), "identify_topk must be sorted"
+
+    genuine, registered = store.verify(centres[0], "Conf_Alice")
+    impostor, _ = store.verify(centres[2], "conf_alice")
+    assert registered and genuine > 0.9 > impostor, f"verify: genuine={genuine}, impostor={impostor}"
+    assert store.verify(centres[0], "conf_nobody") == (0.0, False)
+
+    assert store.check_name_exists("conf_bobb") == (True, "conf_bob")
+    assert store.check_name_exists("zz")[0] is False
+
+    assert store.delete("conf_charlie") == 3
+    assert "conf_charlie" not in store.list_names()
+    assert store.verify(centres[2], "conf_charlie") == (0.0, False)
+    for name in names[:2]:
+        store.delete(name)
+
+
+def benchmark(store, rng, speakers: int, queries: int) -> dict:
+    centres, enroll = _clusters(rng, speakers, 3, 0.35)
+    names = [f"bench_speaker_{i}" for i in range(speakers)]
+
+    start = time.perf_counter()
+    for name, samples in zip(names, enroll):
+        store.add_many(list(samples), name)
+    add_ms = (time.perf_counter() - start) * 1000.0 / speakers
+
+    truth = rng.integers(0, speakers, size=queries)
+    probes = centres[truth] + 0.35 * rng.standard_normal((queries, DIM)).astype(np.float32)
+
+    start = time.perf_counter()
+    top1 = [store.identify_topk(q, 1) for q in probes]
+    identify_ms = (time.perf_counter() - start) * 1000.0 / queries
+
+    start = time.perf_counter()
+    for q, t in zip(probes, truth):
+        store.verify(q, names[t])
+    verify_ms = (time.perf_counter() - start) * 1000.0 / queries
+
+    recall = float(np.mean([bool(r) and r[0][0] == names[t] for r, t in zip(top1, truth)]))
+
+    for name in names:
+        store.delete(name)
+    return {"add_ms": add_ms, "identify_ms": identify_ms, "verify_ms": verify_ms, "recall@1": recall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", default="faiss,qdrant")
+    parser.add_argument("--speakers", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("FAISS_DATA_DIR", tempfile.mkdtemp(prefix="voice_faiss_"))
+    from app.services.store import get_store
+
+    results = {}
+    for backend in args.backends.split(","):
+        store = get_store(backend)
+        store.init_store()
+        conformance(store, np.random.default_rng(1))
+        print(f"[OK] {backend}: conformance passed")
+        results[backend] = benchmark(store, np.random.default_rng(2), args.speakers, args.queries)
+
+    print(f"\n{'backend':<8} {'add_ms':>8} {'identify_ms':>12} {'verify_ms':>10} {'recall@1':>9}")
+    for backend, r in results.items():
+        print(f"{backend:<8} {r['add_ms']:>8.3f} {r['identify_ms']:>12.3f} "
+              f"{r['verify_ms']:>10.3f} {r['recall@1']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Throughput vs. per-request latency of the embedding micro-batcher.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_batching --clients 16 --requests 8
+    python -m benchmarks.bench_batching --check     # cancellation check only, no model
+
+Each client thread submits synthetic 3-6 s clips back to back. The first
+configuration (max_batch_size=1) is the unbatched baseline. Before timing,
+a request cancelled while its clip waits for a batch (client disconnect) is
+checked not to stop the worker: the next submit must still be answered.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from app.services.batcher import EmbeddingBatcher
+
+SR = 16000
+
+
+def _percentile(values, q):
+    return float(np.percentile(np.asarray(values), q)) if values else 0.0
+
+
+def run(encoder, max_batch_size, max_wait_ms, clients, requests_per_client, seed=0):
+    batcher = EmbeddingBatcher(encoder, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    rng = np.random.default_rng(seed)
+    clips = [
+        rng.standard_normal(int(SR * rng.uniform(3.0, 6.0))).astype(np.float32) * 0.05
+        for _ in range(clients * requests_per_client)
+    ]
+
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(requests_per_client):
+            clip = clips[offset * requests_per_client + i]
+            t0 = time.perf_counter()
+            batcher.encode(clip[np.newaxis, :])
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt * 1000.0)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+    }
+
+
+class SlowEncoder:
+    """Stands in for SpeakerEncoder: one batch takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+
+    def encode_batch(self, waveforms):
+        time.sleep(self.delay)
+        return [np.full(192, len(w), dtype=np.float32) for w in waveforms]
+
+
+def check_cancellation(timeout: float = 5.0) -> None:
+    """A waiter cancelled mid-batch must neither kill the worker nor block later submits."""
+    batcher = EmbeddingBatcher(SlowEncoder(), max_batch_size=4, max_wait_ms=1)
+
+    async def cancel_one():
+        task = asyncio.ensure_future(asyncio.wrap_future(batcher.submit(np.zeros(SR, dtype=np.float32))))
+        await asyncio.sleep(0.05)  # the clip is in the running batch now
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # and one cancelled while still queued behind that batch
+        queued = asyncio.ensure_future(asyncio.wrap_future(batcher.submit(np.zeros(SR, dtype=np.float32))))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+
+    asyncio.run(cancel_one())
+    emb = batcher.submit(np.zeros(8, dtype=np.float32)).result(timeout=timeout)
+    assert batcher._thread.is_alive(), "batcher worker died after a cancelled waiter"
+    assert emb[0] == 8, "submit after a cancellation got the wrong embedding"
+    print("cancellation: ok (worker alive, next submit answered)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--configs", default="1:0,4:2,8:5,16:10",
+                        help="comma-separated max_batch_size:max_wait_ms pairs")
+    parser.add_argument("--check", action="store_true", help="run the cancellation check only")
+    args = parser.parse_args()
+
+    check_cancellation()
+    if args.check:
+        return
+
+    from app.models.speaker import SpeakerEncoder
+    encoder = SpeakerEncoder()
+    # Warm up torch so the first configuration is not penalised.
+    encoder.encode(np.zeros((1, SR), dtype=np.float32))
+
+    print(f"{'batch':>5} {'wait_ms':>7} {'clips/s':>9} {'p50_ms':>8} {'p99_ms':>8}")
+    for pair in args.configs.split(","):
+        size, wait = pair.split(":")
+        r = run(encoder, int(size), float(wait), args.clients, args.requests)
+        print(f"{r['max_batch_size']:>5} {r['max_wait_ms']:>7.1f} {r['throughput']:>9.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
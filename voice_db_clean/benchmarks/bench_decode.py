@@ -0,0 +1,75 @@
+"""
+Per-request decode cost before and after DecodedAudio.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_decode --repeat 20
+
+"before" replays the old verify-transaction path: librosa.load for the
+embedding, then librosa.load + PCM_16 re-encode again for STT. "after" is
+one DecodedAudio.from_bytes plus its lazily built tensor and WAV payload.
+"""
+import argparse
+import io
+import time
+
+import librosa
+import numpy as np
+import soundfile
+
+from app.services.audio import DecodedAudio, TARGET_SR
+
+
+def _synthetic_wav(seconds: float, sr: int, subtype: str) -> bytes:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sr)) / sr
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+    buf = io.BytesIO()
+    soundfile.write(buf, signal.astype(np.float32), sr, format="WAV", subtype=subtype)
+    return buf.getvalue()
+
+
+def _before(audio_bytes: bytes) -> None:
+    librosa.load(io.BytesIO(audio_bytes), sr=TARGET_SR, mono=True)
+    audio_np, _ = librosa.load(io.BytesIO(audio_bytes), sr=TARGET_SR, mono=True)
+    wav_io = io.BytesIO()
+    soundfile.write(wav_io, audio_np, TARGET_SR, format="WAV", subtype="PCM_16")
+    wav_io.getvalue()
+
+
+def _after(audio_bytes: bytes) -> None:
+    decoded = DecodedAudio.from_bytes(audio_bytes)
+    decoded.tensor()
+    decoded.wav_bytes()
+
+
+def _time(fn, audio_bytes: bytes, repeat: int) -> float:
+    fn(audio_bytes)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(audio_bytes)
+    return (time.perf_counter() - start) * 1000.0 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ("16k PCM_16", TARGET_SR, "PCM_16"),
+        ("44.1k PCM_16", 44100, "PCM_16"),
+        ("48k FLOAT", 48000, "FLOAT"),
+    ]
+
+    print(f"{'input':<14} {'secs':>4} {'before_ms':>10} {'after_ms':>9} {'speedup':>8}")
+    for label, sr, subtype in cases:
+        for seconds in (3, 5, 10):
+            audio_bytes = _synthetic_wav(seconds, sr, subtype)
+            before = _time(_before, audio_bytes, args.repeat)
+            after = _time(_after, audio_bytes, args.repeat)
+            print(f"{label:<14} {seconds:>4} {before:>10.2f} {after:>9.2f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
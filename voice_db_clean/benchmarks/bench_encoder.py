@@ -0,0 +1,127 @@
+"""
+Parity and speed of the speaker encoder backends (eager, TorchScript, ONNX, ONNX int8).
+
+Run from inside voice_db_clean/ after `python -m scripts.export_encoder`:
+
+    python -m benchmarks.bench_encoder --variants eager,torchscript,onnx,onnx-int8
+    python -m benchmarks.bench_encoder --audio a.wav b.wav --threads 4 --batch 1,8
+
+Parity: every variant embeds the same clips (several lengths, alone and in a
+padded batch) and is compared with the eager SpeechBrain model. Full-precision
+variants must reach cosine > --min-cosine (0.999); int8 is held to
+--min-cosine-int8. The exit status is non-zero when a variant fails.
+
+Speed: ms of compute per second of audio, for each batch size in --batch.
+Without --audio, synthetic voiced clips (harmonics + noise) are used.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_clip(rng, seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = rng.uniform(90, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 4) * t) ** 2
+    clip = 0.1 * envelope * voiced + 0.005 * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+def load_clips(paths: list, seconds: list, rng) -> list:
+    if paths:
+        from app.services.audio import DecodedAudio
+        clips = []
+        for path in paths:
+            with open(path, "rb") as f:
+                clips.append(DecodedAudio.from_bytes(f.read()).samples)
+        return clips
+    return [synthetic_clip(rng, s) for s in seconds]
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=-1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=-1, keepdims=True)
+    return (a * b).sum(axis=-1)
+
+
+def embed_all(encoder, clips: list) -> tuple:
+    single = np.stack([encoder.encode(c) for c in clips])
+    batched = encoder.encode_batch(clips)
+    return single, batched
+
+
+def ms_per_audio_second(encoder, clips: list, batch_size: int, repeat: int) -> float:
+    audio_seconds = sum(len(c) for c in clips) / SAMPLE_RATE
+    encoder.encode_batch(clips[:batch_size])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(0, len(clips), batch_size):
+            chunk = clips[i:i + batch_size]
+            if batch_size == 1:
+                encoder.encode(chunk[0])
+            else:
+                encoder.encode_batch(chunk)
+    return (time.perf_counter() - start) * 1000.0 / (audio_seconds * repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--variants", default="eager,torchscript,onnx,onnx-int8")
+    parser.add_argument("--audio", nargs="*", default=[])
+    parser.add_argument("--seconds", default="1.5,3,5,8", help="synthetic clip lengths")
+    parser.add_argument("--batch", default="1,8")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=0, help="torch / ORT intra-op threads (0 = default)")
+    parser.add_argument("--export-dir", default=None)
+    parser.add_argument("--min-cosine", type=float, default=0.999)
+    parser.add_argument("--min-cosine-int8", type=float, default=0.99)
+    args = parser.parse_args()
+
+    import torch
+    import app.models.speaker as speaker
+    if args.threads:
+        speaker.TORCH_NUM_THREADS = args.threads
+        torch.set_num_threads(args.threads)
+
+    rng = np.random.default_rng(0)
+    clips = load_clips(args.audio, [float(s) for s in args.seconds.split(",")], rng)
+    batch_sizes = [int(b) for b in args.batch.split(",")]
+    export_dir = args.export_dir or speaker.SPEAKER_EXPORT_DIR
+
+    eager = speaker.load_encoder("eager")
+    reference, _ = embed_all(eager, clips)
+
+    rows, failed = [], False
+    for variant in args.variants.split(","):
+        if variant == "eager":
+            encoder = eager
+        else:
+            backend, int8 = ("onnx", True) if variant == "onnx-int8" else (variant, False)
+            try:
+                encoder = speaker.load_encoder(backend, int8=int8, export_dir=export_dir)
+            except Exception as e:
+                print(f"[WARN] Skipping {variant}: {e}")
+                continue
+
+        single, batched = embed_all(encoder, clips)
+        worst = float(min(cosine(single, reference).min(), cosine(batched, reference).min()))
+        threshold = args.min_cosine_int8 if variant == "onnx-int8" else args.min_cosine
+        ok = worst > threshold
+        failed |= not ok
+        speeds = [ms_per_audio_second(encoder, clips, b, args.repeat) for b in batch_sizes]
+        rows.append((variant, worst, ok, speeds))
+
+    print(f"\n{'variant':<12} {'min_cos':>9} {'parity':>7} " + " ".join(f"{'ms/s@b' + str(b):>10}" for b in batch_sizes))
+    for variant, worst, ok, speeds in rows:
+        print(f"{variant:<12} {worst:>9.5f} {'PASS' if ok else 'FAIL':>7} " + " ".join(f"{s:>10.2f}" for s in speeds))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
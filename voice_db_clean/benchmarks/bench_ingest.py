@@ -0,0 +1,119 @@
+"""
+Memory ceiling, trim ratio and decode cost of the streaming ingestion stage.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_ingest --speech 4 --silence 2,10,120
+    python -m benchmarks.bench_ingest --audio recording.wav
+
+Each synthetic upload is 0.5 s of silence, `speech` seconds of voiced signal,
+then the given amount of trailing silence (long values exceed the duration
+cap). For every upload this reports the speech kept, the trim ratio, the
+decode time and the peak Python heap (tracemalloc) of read_upload +
+decode_speech, next to the previous path (whole read + decode_audio of the
+full clip). The samples reaching the encoder are what the model pays for.
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import soundfile
+
+from app.services.audio import TARGET_SR, decode_audio
+from app.services.ingest import read_upload, decode_speech, AudioRejected, MAX_AUDIO_SECONDS
+
+
+class _Upload:
+    """Minimal stand-in for starlette's UploadFile over an in-memory body."""
+
+    def __init__(self, body: bytes):
+        self._stream = io.BytesIO(body)
+        self.size = len(body)
+
+    async def read(self, n: int = -1) -> bytes:
+        return self._stream.read(n)
+
+    async def seek(self, offset: int) -> None:
+        self._stream.seek(offset)
+
+
+def _drive(coro):
+    """
+    Run a coroutine that never suspends (reads from _Upload) without an event
+    loop, so the event loop's own allocations stay out of the heap peaks.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended")
+
+
+def synthetic_upload(speech: float, silence: float, rng) -> bytes:
+    t = np.arange(int(speech * TARGET_SR)) / TARGET_SR
+    voiced = 0.2 * np.sin(2 * np.pi * 140 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    lead = 0.0005 * rng.standard_normal(TARGET_SR // 2)
+    trail = 0.0005 * rng.standard_normal(int(silence * TARGET_SR))
+    signal = np.concatenate([lead, voiced + 0.002 * rng.standard_normal(len(t)), trail])
+    buf = io.BytesIO()
+    soundfile.write(buf, signal.astype(np.float32), TARGET_SR, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def _peak(fn) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000.0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _old_path(body: bytes):
+    audio_bytes = _drive(_Upload(body).read())
+    return decode_audio(audio_bytes).samples
+
+
+def measure(label: str, body: bytes) -> None:
+    def ingest():
+        audio_bytes, _ = _drive(read_upload(_Upload(body)))
+        return decode_speech(audio_bytes)
+
+    try:
+        decoded, new_ms, new_peak = _peak(ingest)
+    except AudioRejected as e:
+        print(f"{label:<22} rejected: {e}")
+        return
+    full, old_ms, old_peak = _peak(lambda: _old_path(body))
+
+    stats = decoded.stats
+    print(f"{label:<22} {len(body) / 1e6:>7.2f} {stats['source_s']:>8.1f} {stats['speech_s']:>8.2f} "
+          f"{stats['trim_ratio']:>6.2f} {new_ms:>8.1f} {new_peak / 1e6:>8.2f} "
+          f"{len(full) / TARGET_SR:>8.1f} {old_ms:>8.1f} {old_peak / 1e6:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--speech", type=float, default=4.0)
+    parser.add_argument("--silence", default="0,2,10,120")
+    parser.add_argument("--audio", nargs="*", default=[])
+    args = parser.parse_args()
+
+    print(f"duration cap: {MAX_AUDIO_SECONDS:.0f}s\n")
+    print(f"{'upload':<22} {'MB':>7} {'source_s':>8} {'speech_s':>8} {'trim':>6} {'new_ms':>8} {'new_MB':>8} "
+          f"{'old_s':>8} {'old_ms':>8} {'old_MB':>8}")
+
+    rng = np.random.default_rng(0)
+    for silence in (float(s) for s in args.silence.split(",")):
+        measure(f"{args.speech:g}s speech +{silence:g}s", synthetic_upload(args.speech, silence, rng))
+    for path in args.audio:
+        with open(path, "rb") as f:
+            measure(path[-22:], f.read())
+    measure("not audio", b"<html>" + b"x" * 1000)
+
+
+if __name__ == "__main__":
+    main()
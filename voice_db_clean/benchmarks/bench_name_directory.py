@@ -0,0 +1,91 @@
+"""
+Fuzzy name lookup cost: linear Levenshtein scan vs. NameDirectory.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_name_directory --sizes 100,10000,100000
+
+The linear scan reproduces the previous check_name_exists loop; it is
+skipped above --max-linear names because it gets too slow to be useful.
+"""
+import argparse
+import random
+import time
+
+from app.services.name_directory import NameDirectory
+
+SYLLABLES = ["ra", "hu", "l", "su", "man", "th", "pri", "ya", "an", "ka", "vi",
+             "shal", "de", "ep", "ak", "sh", "ay", "ni", "kh", "il", "go", "pal"]
+
+
+def _name(rng) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _typo(rng, name: str) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice("aeiouxyz") + name[i + 1:]
+
+
+def _is_similar(s1, s2, max_distance=2):
+    if abs(len(s1) - len(s2)) > max_distance:
+        return False
+    m, n = len(s1), len(s2)
+    dp = list(range(n + 1))
+    for i in range(1, m + 1):
+        prev = dp[0]
+        dp[0] = i
+        for j in range(1, n + 1):
+            temp = dp[j]
+            dp[j] = prev if s1[i - 1] == s2[j - 1] else 1 + min(prev, dp[j], dp[j - 1])
+            prev = temp
+    return dp[n] <= max_distance
+
+
+def _linear(name, all_names):
+    if name in all_names:
+        return True, name
+    for registered in all_names:
+        if len(name) >= 3 and len(registered) >= 3:
+            if name in registered or registered in name:
+                return True, registered
+        if _is_similar(name, registered):
+            return True, registered
+    return False, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,10000,100000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-linear", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'names':>7} {'build_s':>8} {'linear_us':>10} {'directory_us':>13}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        names = list({_name(rng) for _ in range(size)})
+        queries = [_typo(rng, rng.choice(names)) if i % 2 else _name(rng) for i in range(args.queries)]
+
+        start = time.perf_counter()
+        directory = NameDirectory(lambda: names, ttl=float("inf"))
+        directory.refresh()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for q in queries:
+            directory.lookup(q)
+        indexed = (time.perf_counter() - start) * 1e6 / len(queries)
+
+        linear = float("nan")
+        if len(names) <= args.max_linear:
+            start = time.perf_counter()
+            for q in queries:
+                _linear(q, names)
+            linear = (time.perf_counter() - start) * 1e6 / len(queries)
+
+        print(f"{len(names):>7} {build:>8.2f} {linear:>10.1f} {indexed:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
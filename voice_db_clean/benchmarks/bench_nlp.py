@@ -0,0 +1,158 @@
+"""
+Accuracy and latency of transaction extraction: rule-based parser vs Gemini.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_nlp                                  # parser only, no network
+    python -m benchmarks.bench_nlp --gemini                         # also Gemini and the routed path
+    python -m benchmarks.bench_nlp --corpus my_corpus.jsonl --min-confidence 0.7
+    python -m benchmarks.bench_nlp --burst 16                       # cache + single-flight, simulated model
+
+The corpus is JSON lines of {"text", "sender", "receiver", "amount"} (first
+person is "i"; null when not mentioned); the default is
+benchmarks/transaction_corpus.jsonl. For each path this reports exact-match
+accuracy (all three fields, then per field) and latency percentiles.
+
+    parser        transaction_parser on every sentence
+    parser@conf   only the sentences it accepts (confidence >= --min-confidence)
+    fallback      the old regex fallback (_rule_based_fallback)
+    gemini        every sentence through Gemini (needs Vertex AI credentials)
+    routed        what extract_transaction_info does: parser when confident, else Gemini
+
+With --burst N, N threads then submit the corpus's low-confidence sentences
+concurrently (each several times) through extract_transaction_info, and the
+NLP cache / single-flight counters are printed: how many Gemini calls were
+actually made, the hit rate and the model latency saved. Without --gemini the
+model call is replaced by a --simulate-ms sleep so this runs offline.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.services import nlp
+from app.services.transaction_parser import parse_transaction
+
+FIELDS = ("sender", "receiver", "amount")
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "transaction_corpus.jsonl")
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def timed(fn, corpus: list, repeat: int = 1) -> tuple:
+    outputs, latencies = [], []
+    for item in corpus:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            out = fn(item["text"])
+        latencies.append((time.perf_counter() - start) * 1000.0 / repeat)
+        outputs.append(out)
+    return outputs, np.asarray(latencies)
+
+
+def report(label: str, corpus: list, outputs: list, latencies: np.ndarray) -> None:
+    if not corpus:
+        print(f"{label:<12} {0:>5}")
+        return
+    field_ok = {f: np.mean([o.get(f) == c[f] for o, c in zip(outputs, corpus)]) for f in FIELDS}
+    exact = np.mean([all(o.get(f) == c[f] for f in FIELDS) for o, c in zip(outputs, corpus)])
+    print(f"{label:<12} {len(corpus):>5} {exact:>7.1%} " + " ".join(f"{field_ok[f]:>8.1%}" for f in FIELDS)
+          + f" {np.percentile(latencies, 50):>9.3f} {np.percentile(latencies, 99):>9.3f}")
+
+
+def _gemini(text: str) -> dict:
+    # Force the model path regardless of the parser's confidence
+    enabled, nlp.PARSER_ENABLED = nlp.PARSER_ENABLED, False
+    try:
+        return nlp.extract_transaction_info(text)
+    finally:
+        nlp.PARSER_ENABLED = enabled
+
+
+def burst(corpus: list, threads: int, rounds: int, simulate_ms: float = None) -> None:
+    texts = [item["text"] for item in corpus if parse_transaction(item["text"])["confidence"] < nlp.PARSER_MIN_CONFIDENCE]
+    if simulate_ms is not None:
+        def ask(text, deadline):
+            time.sleep(simulate_ms / 1000.0)
+            return {f: None for f in FIELDS}
+        nlp._ask_gemini = ask
+
+    barrier = threading.Barrier(threads)
+
+    def client(offset: int):
+        barrier.wait()
+        for r in range(rounds):
+            for text in texts[offset % len(texts):] + texts[:offset % len(texts)]:
+                nlp.extract_transaction_info(text)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    s = nlp.stats()
+    requests = threads * rounds * len(texts)
+    print(f"\nburst: {threads} threads x {rounds} rounds x {len(texts)} distinct low-confidence sentences "
+          f"= {requests} requests in {elapsed:.2f}s")
+    print(f"  gemini calls {s['gemini_calls']}, cache hits {s['cache_hits']}, coalesced {s['coalesced']}, "
+          f"errors {s['gemini_errors']}, over budget {s['budget_exceeded']}")
+    print(f"  hit rate {s['hit_rate']:.1%}, model time {s['gemini_ms'] / 1000:.2f}s, saved {s['saved_ms'] / 1000:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--min-confidence", type=float, default=nlp.PARSER_MIN_CONFIDENCE)
+    parser.add_argument("--gemini", action="store_true", help="also call Gemini (network + credentials)")
+    parser.add_argument("--repeat", type=int, default=200, help="repetitions for the local paths' latency")
+    parser.add_argument("--show-misses", action="store_true")
+    parser.add_argument("--burst", type=int, default=0, help="threads for the cache / coalescing run")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--simulate-ms", type=float, default=400.0, help="stand-in Gemini latency without --gemini")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} sentences, parser threshold {args.min_confidence}\n")
+    print(f"{'path':<12} {'n':>5} {'exact':>7} " + " ".join(f"{f:>8}" for f in FIELDS) + f" {'p50_ms':>9} {'p99_ms':>9}")
+
+    parsed, parse_ms = timed(parse_transaction, corpus, args.repeat)
+    report("parser", corpus, parsed, parse_ms)
+
+    confident = [i for i, p in enumerate(parsed) if p["confidence"] >= args.min_confidence]
+    report("parser@conf", [corpus[i] for i in confident], [parsed[i] for i in confident], parse_ms[confident])
+    print(f"{'':<12} coverage {len(confident) / len(corpus):.1%} of sentences skip the model call")
+
+    fallback, fallback_ms = timed(nlp._rule_based_fallback, corpus, args.repeat)
+    report("fallback", corpus, fallback, fallback_ms)
+
+    if args.gemini:
+        gemini, gemini_ms = timed(_gemini, corpus)
+        report("gemini", corpus, gemini, gemini_ms)
+        accepted = set(confident)
+        routed = [parsed[i] if i in accepted else gemini[i] for i in range(len(corpus))]
+        routed_ms = np.asarray([parse_ms[i] + (0.0 if i in accepted else gemini_ms[i])
+                                for i in range(len(corpus))])
+        report("routed", corpus, routed, routed_ms)
+
+    if args.burst:
+        burst(corpus, args.burst, args.rounds, None if args.gemini else args.simulate_ms)
+
+    if args.show_misses:
+        print()
+        for item, out in zip(corpus, parsed):
+            if out["confidence"] >= args.min_confidence and any(out.get(f) != item[f] for f in FIELDS):
+                print(f"[MISS] {out['confidence']:.2f} {item['text']!r} -> "
+                      f"{ {f: out.get(f) for f in FIELDS} } expected { {f: item[f] for f in FIELDS} }")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Latency of per-person aggregation and AS-norm scoring on synthetic galleries.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_scoring --speakers 100,1000,10000 --top-n 100
+
+For each gallery size this reports the one-off cost of fitting the enrolled-side
+cohort statistics (ASNorm.fit) and the per-query cost of raw identification
+(matrix-vector product + top-k aggregation) with and without AS-norm on top.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.scoring import ASNorm, aggregate_per_person
+
+DIM = 192
+SAMPLES = 3
+
+
+def _unit(rows: np.ndarray) -> np.ndarray:
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def run(speakers: int, queries: int, top_n: int, shortlist: int, rng) -> dict:
+    centres = _unit(rng.standard_normal((speakers, DIM)).astype(np.float32))
+    samples = _unit(np.repeat(centres, SAMPLES, axis=0)
+                    + 0.3 * rng.standard_normal((speakers * SAMPLES, DIM)).astype(np.float32))
+    gallery = np.vstack([samples, centres])
+    owners = [f"speaker_{i // SAMPLES}" for i in range(len(samples))] + [f"speaker_{i}" for i in range(speakers)]
+    names = [f"speaker_{i}" for i in range(speakers)]
+
+    start = time.perf_counter()
+    asnorm = ASNorm(top_n).fit(names, centres)
+    fit_ms = (time.perf_counter() - start) * 1000.0
+
+    probes = _unit(centres[rng.integers(0, speakers, size=queries)]
+                   + 0.3 * rng.standard_normal((queries, DIM)).astype(np.float32))
+    fetch = min(shortlist * (SAMPLES + 1), len(gallery))
+
+    def raw(q):
+        scores = gallery @ q
+        top = np.argpartition(-scores, fetch - 1)[:fetch]
+        return aggregate_per_person((owners[i], scores[i]) for i in top)[:shortlist]
+
+    start = time.perf_counter()
+    ranked = [raw(q) for q in probes]
+    raw_ms = (time.perf_counter() - start) * 1000.0 / queries
+
+    start = time.perf_counter()
+    for q, r in zip(probes, ranked):
+        asnorm.normalize(q, r)
+    norm_ms = (time.perf_counter() - start) * 1000.0 / queries
+
+    return {"fit_ms": fit_ms, "raw_ms": raw_ms, "asnorm_ms": norm_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--speakers", default="100,1000,10000")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-n", type=int, default=100)
+    parser.add_argument("--shortlist", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'speakers':>9} {'fit_ms':>10} {'raw_ms':>9} {'+asnorm_ms':>11}")
+    for speakers in (int(s) for s in args.speakers.split(",")):
+        r = run(speakers, args.queries, args.top_n, args.shortlist, rng)
+        print(f"{speakers:>9} {r['fit_ms']:>10.2f} {r['raw_ms']:>9.3f} {r['asnorm_ms']:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Identification latency of the in-process SpeakerIndex.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_speaker_index --speakers 100,1000,10000
+
+Builds a synthetic gallery of 192-d embeddings (3 samples + 1 centroid per
+speaker) and times top-1 and top-20 search for noisy queries.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.speaker_index import SpeakerIndex, DIM
+
+
+def build(num_speakers: int, rng) -> tuple:
+    centers = rng.standard_normal((num_speakers, DIM)).astype(np.float32)
+    items = []
+    for s, center in enumerate(centers):
+        samples = center + 0.3 * rng.standard_normal((3, DIM)).astype(np.float32)
+        for j, vec in enumerate(samples):
+            items.append((f"{s}-{j}", f"speaker{s}", vec))
+        items.append((f"speaker{s}_centroid", f"speaker{s}", samples.mean(axis=0)))
+    index = SpeakerIndex()
+    index.replace_all(items)
+    return index, centers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--speakers", default="100,1000,10000")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'speakers':>8} {'vectors':>8} {'top1_us':>8} {'top20_us':>9} {'acc@1':>6}")
+    for n in (int(x) for x in args.speakers.split(",")):
+        index, centers = build(n, rng)
+        truth = rng.integers(0, n, size=args.queries)
+        queries = centers[truth] + 0.3 * rng.standard_normal((args.queries, DIM)).astype(np.float32)
+
+        start = time.perf_counter()
+        hits = [index.search(q, k=1)[0] for q in queries]
+        top1 = (time.perf_counter() - start) * 1e6 / args.queries
+
+        start = time.perf_counter()
+        for q in queries:
+            index.search(q, k=20)
+        top20 = (time.perf_counter() - start) * 1e6 / args.queries
+
+        acc = np.mean([name == f"speaker{t}" for (_, name, _), t in zip(hits, truth)])
+        print(f"{n:>8} {len(index):>8} {top1:>8.1f} {top20:>9.1f} {acc:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
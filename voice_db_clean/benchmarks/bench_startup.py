@@ -0,0 +1,105 @@
+"""
+Cold-start measurement: import time, time to live (/healthz) and time to ready (/readyz).
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_startup --runs 3
+    python -m benchmarks.bench_startup --runs 3 --importtime   # also list the slowest imports
+
+Each run starts a fresh `uvicorn app.main:app` process and polls both probes.
+The breakdown reported by /readyz (import, store_init, model_load, warmup,
+startup) is printed next to the externally measured times. The same .env is
+used as for the real server, so point it at the backend you want to measure
+(e.g. VECTOR_BACKEND=faiss for a network-free run).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def _get(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as r:
+            return r.status, json.loads(r.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+    except Exception:
+        return None, None
+
+
+def import_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def slowest_imports(limit: int) -> list:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True).stderr
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def boot(port: int, timeout: float) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ.copy()
+    )
+    base = f"http://127.0.0.1:{port}"
+    result = {"live": None, "ready": None, "report": None}
+    try:
+        while time.perf_counter() - start < timeout:
+            if result["live"] is None and _get(base + "/healthz")[0] == 200:
+                result["live"] = time.perf_counter() - start
+            if result["live"] is not None:
+                status, body = _get(base + "/readyz")
+                # Stop once ready, or once startup finished without becoming ready
+                if status == 200 or (body and "startup" in body.get("timings_s", {})):
+                    result["ready"] = time.perf_counter() - start if status == 200 else None
+                    result["report"] = body
+                    break
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports of app.main")
+    args = parser.parse_args()
+
+    print(f"import app.main: {import_seconds():.2f}s (fresh interpreter)")
+    if args.importtime:
+        for micros, name in slowest_imports(15):
+            print(f"  {micros / 1e6:>7.3f}s  {name}")
+
+    print(f"\n{'run':>3} {'live_s':>7} {'ready_s':>8}  /readyz timings_s")
+    for run in range(args.runs):
+        r = boot(args.port, args.timeout)
+        live = f"{r['live']:.2f}" if r["live"] is not None else "-"
+        ready = f"{r['ready']:.2f}" if r["ready"] is not None else "-"
+        report = r["report"] or {}
+        print(f"{run + 1:>3} {live:>7} {ready:>8}  {report.get('timings_s', {})}")
+        if report.get("errors"):
+            print(f"    errors: {report['errors']}")
+
+
+if __name__ == "__main__":
+    main()
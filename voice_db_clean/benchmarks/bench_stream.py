@@ -0,0 +1,98 @@
+"""
+Time-to-decision of /voice/stream versus uploading the finished clip to /voice/match.
+
+Start the app (uvicorn app.main:app --port 8000), then from voice_db_clean/:
+
+    python -m benchmarks.bench_stream --audio sample.wav
+    python -m benchmarks.bench_stream --audio sample.wav --person-name rahul --speed 4
+
+The clip is sent in 20 ms PCM messages paced like a live microphone (--speed
+N plays N times faster), followed by 1 s of silence so the server's
+end-of-speech detection can fire. Reported per run:
+
+    decided_at   seconds after the first audio message until the final result
+    after_audio  decided_at minus the clip's playback time (negative = decided
+                 while the speaker was still talking)
+    upload       wall time of POSTing the same clip to /voice/match once
+                 recording is over; its perceived latency is clip + upload
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import requests
+
+from app.services.audio import DecodedAudio, TARGET_SR
+
+MESSAGE_MS = 20
+
+
+def stream_once(url: str, samples: np.ndarray, person_name: str, speed: float) -> tuple:
+    from websockets.sync.client import connect
+
+    query = f"?person_name={person_name}" if person_name else ""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    tail = np.zeros(TARGET_SR, dtype="<i2")
+    pcm = np.concatenate([pcm, tail])
+    step = TARGET_SR * MESSAGE_MS // 1000
+
+    interims = 0
+    with connect(f"{url}/voice/stream{query}") as ws:
+        json.loads(ws.recv())  # ready
+        start = time.perf_counter()
+        for i in range(0, len(pcm), step):
+            ws.send(pcm[i:i + step].tobytes())
+            target = start + (i + step) / TARGET_SR / speed
+            # Drain server messages while waiting for the next frame time
+            while True:
+                remaining = target - time.perf_counter()
+                try:
+                    message = json.loads(ws.recv(timeout=max(remaining, 0)))
+                except TimeoutError:
+                    break
+                if message["type"] == "interim":
+                    interims += 1
+                elif message["type"] in ("final", "error"):
+                    return message, time.perf_counter() - start, interims
+        ws.send(json.dumps({"event": "end"}))
+        while True:
+            message = json.loads(ws.recv())
+            if message["type"] in ("final", "error"):
+                return message, time.perf_counter() - start, interims
+            interims += 1
+
+
+def upload_once(url: str, audio_bytes: bytes) -> float:
+    start = time.perf_counter()
+    requests.post(f"{url}/voice/match", files={"audio": ("audio.wav", audio_bytes, "audio/wav")}, timeout=120)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--audio", nargs="+", required=True)
+    parser.add_argument("--person-name", default=None)
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed (1 = real time)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    ws_url = args.url.replace("http", "ws", 1)
+
+    print(f"{'clip':<24} {'clip_s':>7} {'decision':<15} {'reason':<17} {'conf':>7} {'interims':>8} "
+          f"{'decided_at':>10} {'after_audio':>11} {'upload':>7}")
+    for path in args.audio:
+        with open(path, "rb") as f:
+            audio_bytes = f.read()
+        samples = DecodedAudio.from_bytes(audio_bytes).samples
+        clip_s = len(samples) / TARGET_SR
+        for _ in range(args.runs):
+            final, decided_at, interims = stream_once(ws_url, samples, args.person_name, args.speed)
+            upload_s = upload_once(args.url, audio_bytes)
+            print(f"{path[-24:]:<24} {clip_s:>7.2f} {final.get('match', final.get('error', '')):<15} "
+                  f"{final.get('reason') or '':<17} {final.get('confidence', 0.0):>7.3f} {interims:>8} "
+                  f"{decided_at:>10.2f} {decided_at - clip_s / args.speed:>11.2f} {upload_s:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
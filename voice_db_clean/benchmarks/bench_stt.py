@@ -0,0 +1,149 @@
+"""
+Tail latency and success rate of the STT client's retry and hedging policies.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.bench_stt                                   # offline, simulated server
+    python -m benchmarks.bench_stt --median-ms 500 --sigma 0.8 --error-rate 0.05 --hedge-ms 900
+    python -m benchmarks.bench_stt --live --audio sample.wav         # real Sarvam (SARVAM_API_KEY)
+
+Offline, SarvamSTT talks to an in-process httpx.MockTransport standing in for
+the Sarvam endpoint: lognormal latency (--median-ms, --sigma) with a share of
+503 and 429 answers. Each policy serves --requests transcriptions with
+--concurrency in flight and reports success rate, latency percentiles and
+HTTP attempts per request:
+
+    single       one attempt, no retry (the previous behaviour, minus pooling)
+    retry        jittered retries on 429/5xx within the deadline
+    retry+hedge  retries plus a hedged copy after --hedge-ms
+
+--live compares a fresh requests.post per call (new TCP + TLS handshake
+each time, as before) with the pooled keep-alive client, sequentially.
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+
+import numpy as np
+
+from app.services.stt import SarvamSTT, STT_DEADLINE, SARVAM_URL, SARVAM_API_KEY
+
+
+def fake_sarvam(median_ms: float, sigma: float, error_rate: float, throttle_rate: float, seed: int = 0):
+    import httpx
+    rng = random.Random(seed)
+
+    async def handler(request):
+        await asyncio.sleep(median_ms / 1000.0 * math.exp(rng.gauss(0.0, sigma)))
+        roll = rng.random()
+        if roll < error_rate:
+            return httpx.Response(503, text="upstream unavailable")
+        if roll < error_rate + throttle_rate:
+            return httpx.Response(429, text="rate limited")
+        return httpx.Response(200, json={"transcript": "send 500 to rahul"})
+
+    return httpx.MockTransport(handler)
+
+
+async def run_policy(client: SarvamSTT, requests: int, concurrency: int, payload: bytes) -> dict:
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await client.transcribe(payload, time.monotonic() + STT_DEADLINE)
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            except Exception:
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    await client.aclose()
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "ok": len(latencies) / requests,
+        "p50": float(np.percentile(lat, 50)),
+        "p95": float(np.percentile(lat, 95)),
+        "p99": float(np.percentile(lat, 99)),
+        "attempts": client.counters["attempts"] / requests,
+        "hedges": client.counters["hedges"],
+        "hedge_wins": client.counters["hedge_wins"],
+    }
+
+
+def offline(args) -> None:
+    payload = b"RIFF" + bytes(32000)
+    policies = {
+        "single":      dict(max_retries=0, hedge_after_ms=0),
+        "retry":       dict(max_retries=args.retries, hedge_after_ms=0),
+        "retry+hedge": dict(max_retries=args.retries, hedge_after_ms=args.hedge_ms),
+    }
+    print(f"simulated server: median {args.median_ms:.0f} ms, sigma {args.sigma}, "
+          f"{args.error_rate:.0%} 503, {args.throttle_rate:.0%} 429; "
+          f"{args.requests} requests, {args.concurrency} in flight\n")
+    print(f"{'policy':<12} {'ok':>7} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'att/req':>8} {'hedges':>7} {'won':>5}")
+    for name, options in policies.items():
+        transport = fake_sarvam(args.median_ms, args.sigma, args.error_rate, args.throttle_rate)
+        client = SarvamSTT(api_key="offline", transport=transport, max_concurrency=args.concurrency * 2, **options)
+        r = asyncio.run(run_policy(client, args.requests, args.concurrency, payload))
+        print(f"{name:<12} {r['ok']:>7.1%} {r['p50']:>8.0f} {r['p95']:>8.0f} {r['p99']:>8.0f} "
+              f"{r['attempts']:>8.2f} {r['hedges']:>7} {r['hedge_wins']:>5}")
+
+
+def live(args) -> None:
+    import requests
+    from app.services.audio import DecodedAudio
+
+    with open(args.audio, "rb") as f:
+        wav_bytes = DecodedAudio.from_bytes(f.read()).wav_bytes()
+    data = {"model": "saaras:v3", "language_code": "en-IN", "mode": "transcribe"}
+
+    fresh = []
+    for _ in range(args.live_runs):
+        start = time.perf_counter()
+        requests.post(SARVAM_URL, headers={"api-subscription-key": SARVAM_API_KEY},
+                      files={"file": ("audio.wav", wav_bytes, "audio/wav")}, data=data, timeout=15)
+        fresh.append((time.perf_counter() - start) * 1000.0)
+
+    async def pooled_runs():
+        client = SarvamSTT()
+        out = []
+        for _ in range(args.live_runs):
+            start = time.perf_counter()
+            await client.transcribe(wav_bytes, time.monotonic() + STT_DEADLINE)
+            out.append((time.perf_counter() - start) * 1000.0)
+        await client.aclose()
+        return out
+
+    pooled = asyncio.run(pooled_runs())
+    for label, lat in (("requests.post", fresh), ("pooled httpx", pooled)):
+        print(f"{label:<14} first {lat[0]:>7.0f} ms   median of rest {np.median(lat[1:] or lat):>7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--median-ms", type=float, default=300.0)
+    parser.add_argument("--sigma", type=float, default=0.7, help="lognormal spread of the simulated latency")
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    parser.add_argument("--throttle-rate", type=float, default=0.02)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--hedge-ms", type=float, default=600.0)
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--audio", default=None)
+    parser.add_argument("--live-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.live:
+        live(args)
+    else:
+        offline(args)
+
+
+if __name__ == "__main__":
+    main()
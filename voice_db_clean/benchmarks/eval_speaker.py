@@ -0,0 +1,170 @@
+"""
+EER and identification accuracy of raw vs AS-norm scoring on a labeled dataset.
+
+Run from inside voice_db_clean/:
+
+    python -m benchmarks.eval_speaker --dir corpus/                   # corpus/<person_name>/*.wav
+    python -m benchmarks.eval_speaker --manifest speakers.csv --enroll 3
+    python -m benchmarks.eval_speaker --embeddings cache.npz          # skip decoding/encoding
+
+The first --enroll clips of every speaker are enrolled the way the API does it
+(normalized samples + their centroid); the remaining clips are probes. A
+--unknown fraction of speakers is never enrolled and only used as impostor
+probes, to measure the open-set decision.
+
+Reported for each scoring mode (raw cosine, AS-norm against the enrolled
+gallery or an --cohort .npy):
+    EER            — verification trials, every probe against every enrolled speaker
+    top-1 accuracy — closed-set identification of enrolled speakers' probes
+    open-set       — accept/reject at the threshold (--threshold / --asnorm-threshold):
+                     detect-and-identify rate for enrolled probes, false-accept rate
+                     for unknown speakers
+
+Embeddings computed from audio are saved with --save-embeddings so threshold
+sweeps can be rerun with --embeddings.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.scoring import ASNorm, reduce_scores, RAW_THRESHOLD, ASNORM_THRESHOLD, ASNORM_TOP_N
+
+
+def _unit(rows: np.ndarray) -> np.ndarray:
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows / np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12)
+
+
+def embed_dataset(groups: dict, batch_size: int, max_seconds: float) -> tuple:
+    from app.models.speaker import SpeakerEncoder
+    from scripts.bulk_enroll import decode_file, encode_chunk
+
+    encoder = SpeakerEncoder()
+    clips = []
+    for name, paths in groups.items():
+        for path in paths:
+            samples = decode_file(path, max_seconds)
+            if samples is not None:
+                clips.append((name, samples))
+    start = time.perf_counter()
+    embeddings = encode_chunk(encoder, clips, batch_size)
+    print(f"[OK] Encoded {len(clips)} clip(s) in {time.perf_counter() - start:.1f}s")
+    return np.asarray(embeddings, dtype=np.float32), np.asarray([name for name, _ in clips])
+
+
+def eer(genuine: np.ndarray, impostor: np.ndarray) -> tuple:
+    """(equal error rate, threshold at the EER)."""
+    scores = np.concatenate([genuine, impostor])
+    labels = np.concatenate([np.ones(len(genuine)), np.zeros(len(impostor))])
+    order = np.argsort(scores)
+    labels = labels[order]
+    # Rejecting everything up to and including position i
+    frr = np.cumsum(labels) / max(len(genuine), 1)
+    far = 1.0 - np.cumsum(1 - labels) / max(len(impostor), 1)
+    i = int(np.argmin(np.abs(frr - far)))
+    return float((frr[i] + far[i]) / 2.0), float(scores[order][i])
+
+
+def split(embeddings, labels, enroll: int, unknown: float, rng) -> tuple:
+    speakers = sorted(set(labels))
+    rng.shuffle(speakers)
+    n_unknown = int(round(len(speakers) * unknown))
+    unknown_set = set(speakers[:n_unknown])
+
+    models, probes = {}, []
+    for name in speakers:
+        rows = np.flatnonzero(labels == name)
+        if name in unknown_set:
+            probes.extend((name, embeddings[r], False) for r in rows)
+        elif len(rows) > enroll:
+            models[name] = _unit(embeddings[rows[:enroll]])
+            probes.extend((name, embeddings[r], True) for r in rows[enroll:])
+    return models, probes
+
+
+def evaluate(models: dict, probes: list, asnorm: ASNorm, mode: str, threshold: float) -> dict:
+    names = sorted(models)
+    profiles = [np.vstack([m, _unit(m.mean(axis=0, keepdims=True))]) for m in (models[n] for n in names)]
+
+    genuine, impostor = [], []
+    correct = total_known = detected = false_accepts = total_unknown = 0
+    for truth, embedding, enrolled in probes:
+        q = _unit(embedding[np.newaxis, :])[0]
+        raw = [(name, reduce_scores(profile @ q, mode)) for name, profile in zip(names, profiles)]
+        scored = asnorm.normalize(q, raw) if asnorm is not None else raw
+        for name, score in scored:
+            (genuine if enrolled and name == truth else impostor).append(score)
+
+        best_name, best_score = max(scored, key=lambda item: item[1])
+        if enrolled:
+            total_known += 1
+            correct += best_name == truth
+            detected += best_name == truth and best_score >= threshold
+        else:
+            total_unknown += 1
+            false_accepts += best_score >= threshold
+
+    rate, at = eer(np.asarray(genuine), np.asarray(impostor))
+    return {
+        "eer": rate,
+        "eer_threshold": at,
+        "top1": correct / max(total_known, 1),
+        "dir": detected / max(total_known, 1),
+        "far": false_accepts / max(total_unknown, 1) if total_unknown else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="directory with one sub-directory of clips per person")
+    source.add_argument("--manifest", help="CSV (person_name,audio_path) or JSONL manifest")
+    source.add_argument("--embeddings", help=".npz with 'embeddings' (N, 192) and 'labels' (N,)")
+    parser.add_argument("--save-embeddings", help="write the computed embeddings to this .npz")
+    parser.add_argument("--enroll", type=int, default=3, help="clips per speaker used for enrollment")
+    parser.add_argument("--unknown", type=float, default=0.2, help="fraction of speakers never enrolled")
+    parser.add_argument("--aggregate", default="max", choices=["max", "mean"])
+    parser.add_argument("--cohort", help="optional .npy cohort for AS-norm (default: enrolled gallery)")
+    parser.add_argument("--top-n", type=int, default=ASNORM_TOP_N)
+    parser.add_argument("--threshold", type=float, default=RAW_THRESHOLD)
+    parser.add_argument("--asnorm-threshold", type=float, default=ASNORM_THRESHOLD)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        data = np.load(args.embeddings)
+        embeddings, labels = data["embeddings"], data["labels"]
+    else:
+        from scripts.bulk_enroll import read_dir, read_manifest
+        groups = read_dir(args.dir) if args.dir else read_manifest(args.manifest)
+        embeddings, labels = embed_dataset(groups, args.batch_size, args.max_seconds)
+        if args.save_embeddings:
+            np.savez(args.save_embeddings, embeddings=embeddings, labels=labels)
+            print(f"[OK] Embeddings saved to {args.save_embeddings}")
+
+    models, probes = split(embeddings, labels, args.enroll, args.unknown, np.random.default_rng(args.seed))
+    print(f"[OK] {len(models)} enrolled speaker(s), {len(probes)} probe(s)")
+
+    names = sorted(models)
+    centroids = np.asarray([models[n].mean(axis=0) for n in names])
+    cohort = np.load(args.cohort) if args.cohort else None
+    start = time.perf_counter()
+    asnorm = ASNorm(args.top_n, cohort).fit(names, centroids)
+    fit_ms = (time.perf_counter() - start) * 1000.0
+
+    results = {
+        "raw": evaluate(models, probes, None, args.aggregate, args.threshold),
+        "asnorm": evaluate(models, probes, asnorm, args.aggregate, args.asnorm_threshold),
+    }
+    print(f"[OK] AS-norm cohort stats fitted in {fit_ms:.1f} ms")
+    print(f"\n{'scoring':<8} {'EER':>7} {'@score':>8} {'top-1':>7} {'DIR':>7} {'FAR':>7}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['eer'] * 100:>6.2f}% {r['eer_threshold']:>8.3f} {r['top1'] * 100:>6.1f}% "
+              f"{r['dir'] * 100:>6.1f}% {r['far'] * 100:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
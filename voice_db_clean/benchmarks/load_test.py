@@ -0,0 +1,90 @@
+"""
+Closed-loop load test against a running server.
+
+Start the app (uvicorn app.main:app --port 8000), then from voice_db_clean/:
+
+    python -m benchmarks.load_test --audio sample.wav --clients 1,8,32 --requests 20
+
+Each of N client threads posts the clip back to back. Reports latency
+percentiles and the share of requests shed with 429/503 at each level.
+"""
+import argparse
+import collections
+import threading
+import time
+
+import numpy as np
+import requests
+
+
+def run_level(url, audio_bytes, endpoint, clients, requests_per_client, person_name=None):
+    latencies = []
+    statuses = collections.Counter()
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        for _ in range(requests_per_client):
+            data = {"person_name": person_name} if person_name else None
+            t0 = time.perf_counter()
+            try:
+                resp = session.post(
+                    f"{url}{endpoint}",
+                    files={"audio": ("audio.wav", audio_bytes, "audio/wav")},
+                    data=data,
+                    timeout=120,
+                )
+                status = resp.status_code
+            except requests.RequestException:
+                status = "error"
+            dt = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(dt)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    lat = np.asarray(latencies) if latencies else np.zeros(1)
+    total = sum(statuses.values())
+    shed = statuses.get(429, 0) + statuses.get(503, 0)
+    return {
+        "clients": clients,
+        "rps": statuses.get(200, 0) / elapsed,
+        "p50": float(np.percentile(lat, 50)),
+        "p95": float(np.percentile(lat, 95)),
+        "p99": float(np.percentile(lat, 99)),
+        "shed_pct": 100.0 * shed / total if total else 0.0,
+        "statuses": dict(statuses),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/voice/match")
+    parser.add_argument("--audio", required=True, help="path to a WAV clip to upload")
+    parser.add_argument("--person-name", default=None,
+                        help="sent as person_name (for /voice/verify-transaction)")
+    parser.add_argument("--clients", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as f:
+        audio_bytes = f.read()
+
+    print(f"{'clients':>7} {'req/s':>7} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'shed%':>6}  statuses")
+    for n in (int(c) for c in args.clients.split(",")):
+        r = run_level(args.url, audio_bytes, args.endpoint, n, args.requests, args.person_name)
+        print(f"{r['clients']:>7} {r['rps']:>7.2f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+              f"{r['p99']:>8.1f} {r['shed_pct']:>6.1f}  {r['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Bulk speaker enrollment from a directory or manifest.
+
+Run from inside voice_db_clean/:
+
+    python -m scripts.bulk_enroll --dir corpus/               # corpus/<person_name>/*.wav
+    python -m scripts.bulk_enroll --manifest speakers.csv     # person_name,audio_path rows
+    python -m scripts.bulk_enroll --manifest speakers.jsonl   # {"person_name": ..., "audio_paths": [...]}
+
+Pipeline, per chunk of speakers:
+    parallel decode (process pool) → length-sorted batched SpeakerEncoder
+    inference → per-speaker Firestore transactions (samples + centroid) → Vertex upserts.
+The next chunk is already decoding while the current one is encoded and
+written. Completed speakers are appended to a checkpoint file after every
+chunk, so an interrupted run resumes where it stopped. Sample IDs are derived
+from the speaker and the clip's path relative to the corpus, so re-running a
+chunk that was partly written before a crash overwrites its samples instead
+of adding them (and their centroid contribution) a second time.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.audio import DecodedAudio, TARGET_SR
+from app.utils.logs import configure_logging
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".mp3", ".ogg", ".m4a", ".webm"}
+
+
+def read_dir(root: str) -> dict:
+    groups = {}
+    for person in sorted(os.listdir(root)):
+        folder = os.path.join(root, person)
+        if not os.path.isdir(folder):
+            continue
+        paths = sorted(
+            os.path.join(folder, f) for f in os.listdir(folder)
+            if os.path.splitext(f)[1].lower() in AUDIO_EXTENSIONS
+        )
+        if paths:
+            groups[person.lower()] = paths
+    return groups
+
+
+def read_manifest(path: str) -> dict:
+    groups = {}
+    base = os.path.dirname(os.path.abspath(path))
+
+    def add(name, audio_path):
+        if not os.path.isabs(audio_path):
+            audio_path = os.path.join(base, audio_path)
+        groups.setdefault(name.strip().lower(), []).append(audio_path)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                for audio_path in row.get("audio_paths") or [row["audio_path"]]:
+                    add(row["person_name"], audio_path)
+        else:
+            for row in csv.DictReader(f):
+                add(row["person_name"], row["audio_path"])
+    return groups
+
+
+def load_checkpoint(path: str) -> set:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def decode_file(path: str, max_seconds: float):
+    try:
+        with open(path, "rb") as f:
+            samples = DecodedAudio.from_bytes(f.read()).samples
+    except Exception as e:
+        print(f"[WARN] Skipping undecodable file {path}: {e}")
+        return None
+    if max_seconds:
+        samples = samples[:int(max_seconds * TARGET_SR)]
+    return samples if len(samples) else None
+
+
+def encode_chunk(encoder, clips: list, batch_size: int) -> list:
+    """Encode (person_name, samples) clips; sorting by length keeps padding small."""
+    order = sorted(range(len(clips)), key=lambda i: len(clips[i][1]))
+    embeddings = [None] * len(clips)
+    for start in range(0, len(order), batch_size):
+        idx = order[start:start + batch_size]
+        batch = encoder.encode_batch([clips[i][1] for i in idx])
+        for i, emb in zip(idx, batch):
+            embeddings[i] = emb
+    return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--dir", help="directory with one sub-directory of clips per person")
+    source.add_argument("--manifest", help="CSV (person_name,audio_path) or JSONL manifest")
+    parser.add_argument("--checkpoint", default="bulk_enroll.checkpoint",
+                        help="file listing completed speakers (appended as the run progresses)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="decode processes")
+    parser.add_argument("--batch-size", type=int, default=16, help="clips per encoder forward pass")
+    parser.add_argument("--chunk-speakers", type=int, default=64, help="speakers per write chunk")
+    parser.add_argument("--max-seconds", type=float, default=30.0, help="truncate clips longer than this")
+    parser.add_argument("--no-write", action="store_true", help="decode and encode only (benchmarking)")
+    args = parser.parse_args()
+    configure_logging()
+
+    groups = read_dir(args.dir) if args.dir else read_manifest(args.manifest)
+    # Paths are made relative to this root for the sample IDs, so they do not depend on the cwd
+    root = os.path.abspath(args.dir) if args.dir else os.path.dirname(os.path.abspath(args.manifest))
+    done = load_checkpoint(args.checkpoint)
+    pending = [(name, paths) for name, paths in groups.items() if name not in done]
+    total_clips = sum(len(p) for _, p in pending)
+    print(f"[OK] {len(groups)} speaker(s) in input, {len(done)} already done, "
+          f"{len(pending)} to enroll ({total_clips} clip(s))")
+    if not pending:
+        return
+
+    from app.models.speaker import SpeakerEncoder
+    encoder = SpeakerEncoder()
+
+    if not args.no_write:
+        from app.services import gcp_vector_store
+        gcp_vector_store.init_gcp(warm=False)
+
+    chunks = [pending[i:i + args.chunk_speakers] for i in range(0, len(pending), args.chunk_speakers)]
+    start = time.perf_counter()
+    processed = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, \
+            open(args.checkpoint, "a", encoding="utf-8") as checkpoint:
+
+        def submit(chunk):
+            return [
+                (name, os.path.relpath(os.path.abspath(path), root), pool.submit(decode_file, path, args.max_seconds))
+                for name, paths in chunk for path in paths
+            ]
+
+        in_flight = submit(chunks[0])
+        for n, chunk in enumerate(chunks):
+            futures = in_flight
+            # Start decoding the next chunk while this one is encoded and written
+            in_flight = submit(chunks[n + 1]) if n + 1 < len(chunks) else []
+
+            clips = [(name, source, f.result()) for name, source, f in futures]
+            clips = [(name, source, samples) for name, source, samples in clips if samples is not None]
+            embeddings = encode_chunk(encoder, [(name, samples) for name, _, samples in clips],
+                                      args.batch_size) if clips else []
+
+            by_person = {}
+            for (name, source, _), emb in zip(clips, embeddings):
+                by_person.setdefault(name, []).append((source, emb))
+
+            if not args.no_write:
+                if by_person:
+                    gcp_vector_store.add_embeddings_bulk(by_person)
+                for name, _ in chunk:
+                    checkpoint.write(name + "\n")
+                checkpoint.flush()
+
+            processed += len(futures)
+            elapsed = time.perf_counter() - start
+            print(f"[OK] Chunk {n + 1}/{len(chunks)}: {processed}/{total_clips} clip(s), "
+                  f"{processed / elapsed:.1f} clips/s")
+
+    elapsed = time.perf_counter() - start
+    print(f"[OK] Enrolled {len(pending)} speaker(s), {processed} clip(s) in {elapsed:.1f}s "
+          f"({processed / elapsed:.1f} clips/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Export the ECAPA speaker encoder to TorchScript and ONNX.
+
+Run from inside voice_db_clean/:
+
+    python -m scripts.export_encoder                        # torchscript + onnx + onnx int8
+    python -m scripts.export_encoder --formats torchscript --out exported_models/ecapa
+
+Writes to --out (default SPEAKER_EXPORT_DIR):
+    encoder.ts           traced Fbank → mean norm → ECAPA graph (SPEAKER_ENCODER_BACKEND=torchscript)
+    features.ts          traced Fbank frontend, used by the ONNX backend
+    embedding.onnx       mean norm → ECAPA network, dynamic batch/frames (SPEAKER_ENCODER_BACKEND=onnx)
+    embedding.int8.onnx  the same with dynamic int8 weights (SPEAKER_ENCODER_INT8=true)
+
+The ONNX files need `onnx` and `onnxruntime` installed. Check parity against
+the eager model and measure speed with `python -m benchmarks.bench_encoder`.
+"""
+import argparse
+import os
+import time
+
+import torch
+
+from app.models.speaker import SpeakerEncoder, EmbeddingPipeline, export_paths, SPEAKER_EXPORT_DIR, TORCH_NUM_THREADS
+from app.utils.logs import configure_logging
+
+SAMPLE_RATE = 16000
+
+
+def export_torchscript(classifier, wav, wav_lens, paths: dict) -> None:
+    pipeline = EmbeddingPipeline(classifier).eval()
+    # Traced with batch size 1: shape-dependent constants (e.g. the arange in
+    # SpeechBrain's length masks) then broadcast to any batch size.
+    with torch.no_grad():
+        traced = torch.jit.trace(pipeline, (wav, wav_lens), check_trace=False)
+        traced = torch.jit.freeze(traced)
+    traced.save(paths["torchscript"])
+    print(f"[OK] TorchScript encoder → {paths['torchscript']}")
+
+
+def export_features(classifier, wav, paths: dict) -> None:
+    with torch.no_grad():
+        traced = torch.jit.trace(classifier.mods.compute_features.eval(), (wav,), check_trace=False)
+    traced.save(paths["features"])
+    print(f"[OK] TorchScript Fbank frontend → {paths['features']}")
+
+
+def export_onnx(classifier, wav, wav_lens, paths: dict, opset: int) -> None:
+    network = EmbeddingPipeline(classifier, features=False).eval()
+    with torch.no_grad():
+        feats = classifier.mods.compute_features(wav)
+        torch.onnx.export(
+            network, (feats, wav_lens), paths["onnx"],
+            input_names=["feats", "wav_lens"],
+            output_names=["embedding"],
+            dynamic_axes={"feats": {0: "batch", 1: "frames"}, "wav_lens": {0: "batch"}, "embedding": {0: "batch"}},
+            opset_version=opset,
+            do_constant_folding=True,
+        )
+    print(f"[OK] ONNX network → {paths['onnx']}")
+
+
+def quantize_onnx(paths: dict) -> None:
+    # PyTorch dynamic quantization only covers nn.Linear, which ECAPA barely
+    # uses; ONNX Runtime's dynamic quantization also handles its Conv1d layers.
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    quantize_dynamic(paths["onnx"], paths["onnx-int8"], weight_type=QuantType.QInt8)
+    print(f"[OK] ONNX int8 network → {paths['onnx-int8']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=SPEAKER_EXPORT_DIR)
+    parser.add_argument("--formats", default="torchscript,onnx")
+    parser.add_argument("--no-int8", action="store_true", help="skip the quantized ONNX model")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--example-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    configure_logging()
+
+    if TORCH_NUM_THREADS:
+        torch.set_num_threads(TORCH_NUM_THREADS)
+    os.makedirs(args.out, exist_ok=True)
+    paths = export_paths(args.out)
+    formats = {f.strip() for f in args.formats.split(",") if f.strip()}
+
+    start = time.perf_counter()
+    classifier = SpeakerEncoder().model
+    classifier.eval()
+
+    wav = 0.05 * torch.randn(1, int(args.example_seconds * SAMPLE_RATE))
+    wav_lens = torch.ones(1)
+
+    if "torchscript" in formats:
+        export_torchscript(classifier, wav, wav_lens, paths)
+    if "onnx" in formats:
+        export_features(classifier, wav, paths)
+        export_onnx(classifier, wav, wav_lens, paths, args.opset)
+        if not args.no_int8:
+            quantize_onnx(paths)
+
+    print(f"[OK] Export finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
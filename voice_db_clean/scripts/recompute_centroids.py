@@ -0,0 +1,141 @@
+"""
+Offline job: rebuild every speaker centroid from its samples.
+
+Run from inside voice_db_clean/:
+
+    python -m scripts.recompute_centroids --page-size 500 [--dry-run]
+
+Streams voice_speakers in document-ID pages (embeddings only), accumulates
+per-speaker sums with vectorized np.add.at, then rewrites the centroid
+documents (running sum + count) in Firestore batches and upserts the
+normalized centroids to Vertex AI in chunks. Centroids whose speaker has no
+samples left are deleted.
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+from google.cloud import firestore
+from google.cloud.aiplatform_v1.types import IndexDatapoint
+
+from app.services import gcp_vector_store as store
+from app.utils.logs import configure_logging
+
+FIRESTORE_BATCH_LIMIT = 500
+
+
+def accumulate(page_size: int) -> tuple:
+    collection = store._db.collection(store.FIRESTORE_COLLECTION)
+    codes = {}
+    sums = np.zeros((0, store.DIM), dtype=np.float64)
+    counts = np.zeros(0, dtype=np.int64)
+    centroid_names = set()
+    last = None
+    scanned = 0
+
+    while True:
+        query = collection.order_by(firestore.FieldPath.document_id()) \
+                          .select(["person_name", "embedding", "is_centroid"]) \
+                          .limit(page_size)
+        if last is not None:
+            query = query.start_after(last)
+        docs = list(query.stream())
+        if not docs:
+            break
+        last = docs[-1]
+        scanned += len(docs)
+
+        rows, row_codes = [], []
+        for doc in docs:
+            data = doc.to_dict() or {}
+            name = (data.get("person_name") or "").lower()
+            if not name:
+                continue
+            if data.get("is_centroid", False):
+                centroid_names.add(name)
+                continue
+            if not data.get("embedding"):
+                continue
+            if name not in codes:
+                codes[name] = len(codes)
+            rows.append(data["embedding"])
+            row_codes.append(codes[name])
+
+        if len(codes) > len(counts):
+            grow = len(codes) - len(counts)
+            sums = np.vstack([sums, np.zeros((grow, store.DIM))])
+            counts = np.concatenate([counts, np.zeros(grow, dtype=np.int64)])
+
+        if rows:
+            matrix = np.asarray(rows, dtype=np.float64)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            idx = np.asarray(row_codes)
+            np.add.at(sums, idx, matrix)
+            np.add.at(counts, idx, 1)
+
+        print(f"[OK] Scanned {scanned} document(s), {len(codes)} speaker(s)")
+
+    return codes, sums, counts, centroid_names
+
+
+def write(codes: dict, sums: np.ndarray, counts: np.ndarray, centroid_names: set, dry_run: bool) -> None:
+    collection = store._db.collection(store.FIRESTORE_COLLECTION)
+    names = list(codes)
+    norms = np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    centroids = (sums / norms).astype(np.float32)
+    stale = sorted(centroid_names - set(names))
+
+    print(f"[OK] {len(names)} centroid(s) to write, {len(stale)} stale centroid(s) to delete")
+    if dry_run:
+        return
+
+    now = datetime.now(timezone.utc)
+    for start in range(0, len(names), FIRESTORE_BATCH_LIMIT):
+        chunk = names[start:start + FIRESTORE_BATCH_LIMIT]
+        batch = store._db.batch()
+        datapoints = []
+        for name in chunk:
+            i = codes[name]
+            centroid_id = f"{name}_centroid"
+            batch.set(collection.document(centroid_id), {
+                "person_name": name,
+                "is_centroid": True,
+                "sample_count": int(counts[i]),
+                "embedding_sum": sums[i].tolist(),
+                "updated_at": now
+            })
+            datapoints.append(IndexDatapoint(datapoint_id=centroid_id, feature_vector=centroids[i].tolist()))
+        batch.commit()
+        store._index.upsert_datapoints(datapoints=datapoints)
+        print(f"[OK] Wrote centroids {start + 1}-{start + len(chunk)}")
+
+    for start in range(0, len(stale), FIRESTORE_BATCH_LIMIT):
+        chunk = stale[start:start + FIRESTORE_BATCH_LIMIT]
+        batch = store._db.batch()
+        for name in chunk:
+            batch.delete(collection.document(f"{name}_centroid"))
+        batch.commit()
+        store._index.remove_datapoints(datapoint_ids=[f"{name}_centroid" for name in chunk])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    configure_logging()
+
+    store.init_gcp(warm=False)
+    start = time.perf_counter()
+    codes, sums, counts, centroid_names = accumulate(args.page_size)
+    write(codes, sums, counts, centroid_names, args.dry_run)
+    print(f"[OK] Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()